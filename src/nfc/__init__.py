@@ -25,6 +25,7 @@ from . import llcp                                                 # noqa: F401
 from . import snep                                                 # noqa: F401
 from . import handover                                             # noqa: F401
 from .clf import ContactlessFrontend                               # noqa: F401
+from .clf.pool import ContactlessFrontendPool                      # noqa: F401
 
 import logging
 logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,245 @@
+# -*- coding: latin-1 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2017 Stephen Tiedemann <stephen.tiedemann@gmail.com>
+#
+# Licensed under the EUPL, Version 1.1 or - as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+#
+# https://joinup.ec.europa.eu/software/page/eupl
+#
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# -----------------------------------------------------------------------------
+"""The :mod:`nfc.aio` module provides an :mod:`asyncio` interface to
+the :class:`nfc.clf.ContactlessFrontend`. All methods that would
+block on device input/output return an awaitable future instead and
+run the blocking call in an executor, by default the event loop's
+default executor. This allows to multiplex many readers and sessions
+within a single event loop while the number of threads stays bounded
+by the executor.
+
+.. sourcecode:: python
+
+   import asyncio
+   import nfc.aio
+
+   async def main():
+       clf = await nfc.aio.open('usb')
+       async for tag in clf.tags(targets=['106A', '212F']):
+           records = await clf.run(lambda: tag.ndef and tag.ndef.records)
+           print(tag, records)
+       await clf.close()
+
+   asyncio.get_event_loop().run_until_complete(main())
+
+The module does not use the ``async`` and ``await`` keywords itself
+and can be imported with Python 2.7 when the `trollius
+<https://pypi.python.org/pypi/trollius>`_ backport is installed.
+
+"""
+import nfc.clf
+import nfc.tag
+
+import threading
+
+try:
+    import asyncio
+except ImportError:  # pragma: no cover
+    try:
+        import trollius as asyncio
+    except ImportError:
+        raise ImportError("missing asyncio module, try 'pip install trollius'")
+
+try:
+    StopAsyncIteration = StopAsyncIteration
+except NameError:  # pragma: no cover
+    StopAsyncIteration = StopIteration
+
+import logging
+log = logging.getLogger(__name__)
+
+
+def open(path, loop=None, executor=None):
+    """Open the contactless device identified by *path* without blocking
+    the event *loop*. The *path* argument is documented at
+    :meth:`nfc.clf.ContactlessFrontend.open`. The returned future
+    resolves to a :class:`ContactlessFrontend` or fails with
+    :exc:`~exceptions.IOError` if no device was found.
+
+    """
+    loop = loop if loop is not None else asyncio.get_event_loop()
+    future = loop.run_in_executor(executor, nfc.clf.ContactlessFrontend, path)
+    result = asyncio.Future(loop=loop)
+
+    def done(future):
+        if result.cancelled():
+            # The caller gave up while the device was opened.
+            if not future.cancelled() and future.exception() is None:
+                future.result().close()
+        elif future.cancelled():
+            result.cancel()
+        elif future.exception() is not None:
+            result.set_exception(future.exception())
+        else:
+            result.set_result(ContactlessFrontend(
+                future.result(), loop=loop, executor=executor))
+
+    future.add_done_callback(done)
+    return result
+
+
+class ContactlessFrontend(object):
+    """Wraps an opened :class:`nfc.clf.ContactlessFrontend` *clf* for use
+    with an :mod:`asyncio` event *loop*. The methods have the same
+    arguments as the synchronous versions but return awaitable
+    futures that are resolved when the blocking call has been
+    completed in the *executor*. Note that calls on the same frontend
+    are still serialized by the frontend's lock.
+
+    """
+    def __init__(self, clf, loop=None, executor=None):
+        self.clf = clf
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self.executor = executor
+
+    def __str__(self):
+        return str(self.clf)
+
+    def run(self, func, *args):
+        """Run the blocking callable *func* with positional *args* in the
+        executor and return an awaitable future for the result. This
+        is useful for tag read and write operations, for example
+        ``await clf.run(lambda: tag.ndef.records)``.
+
+        """
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        """Close the contactless device."""
+        return self.run(self.clf.close)
+
+    def connect(self, **options):
+        """Run :meth:`nfc.clf.ContactlessFrontend.connect` in the executor.
+
+        Note that the 'on-startup', 'on-connect' and 'on-release'
+        callback functions are then called from an executor thread,
+        not the event loop.
+
+        """
+        return self.run(lambda: self.clf.connect(**options))
+
+    def sense(self, *targets, **options):
+        """Run :meth:`nfc.clf.ContactlessFrontend.sense` in the executor."""
+        return self.run(lambda: self.clf.sense(*targets, **options))
+
+    def listen(self, target, timeout):
+        """Run :meth:`nfc.clf.ContactlessFrontend.listen` in the executor."""
+        return self.run(self.clf.listen, target, timeout)
+
+    def exchange(self, send_data, timeout):
+        """Run :meth:`nfc.clf.ContactlessFrontend.exchange` in the executor."""
+        return self.run(self.clf.exchange, send_data, timeout)
+
+    def tags(self, **options):
+        """Return an asynchronous iterator over activated tags.
+
+        The *options* are the reader/writer options documented at
+        :meth:`nfc.clf.ContactlessFrontend.connect`, except for the
+        'on-connect' function that is always replaced to return the
+        activated tag. Each iteration searches for and activates the
+        next tag, presence checking and release of the tag is left to
+        the application. The iteration stops when the device reports
+        an error or the iterator's :meth:`TagIterator.close` method was
+        called.
+
+        """
+        return TagIterator(self, options)
+
+
+class TagIterator(object):
+    """The asynchronous iterator returned by
+    :meth:`ContactlessFrontend.tags`. Instead of ``async for`` the
+    :meth:`next` method may be awaited directly (or with ``yield
+    From()`` under trollius) and returns :const:`None` when there are
+    no more tags.
+
+    """
+    def __init__(self, frontend, options):
+        self._frontend = frontend
+        self._options = dict(options)
+        self._options['on-connect'] = lambda tag: False
+        self._closed = threading.Event()
+
+    def close(self):
+        """Stop the iteration, a pending search returns within the time
+        of one sense cycle (see the 'iterations' and 'interval'
+        options). This is also done when a future returned by
+        :meth:`next` is cancelled, for example by a timeout.
+
+        """
+        self._closed.set()
+
+    def next(self):
+        """Return an awaitable future for the next activated tag."""
+        return self._next(lambda result: result)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        def stop_iteration(result):
+            if result is None:
+                raise StopAsyncIteration()
+            return result
+        return self._next(stop_iteration)
+
+    def _next(self, convert):
+        loop = self._frontend.loop
+        result = asyncio.Future(loop=loop)
+
+        def done(future):
+            if future.cancelled():
+                self.close()
+                if not result.done():
+                    result.cancel()
+                return
+            try:
+                tag = future.result()
+                if not isinstance(tag, nfc.tag.Tag):
+                    self.close()
+                    tag = None
+                if not result.done():
+                    result.set_result(convert(tag))
+            except Exception as error:
+                self.close()
+                if not result.done():
+                    result.set_exception(error)
+
+        def cancelled(result):
+            # Stop the search in the executor when the caller gave up.
+            if result.cancelled():
+                self.close()
+
+        result.add_done_callback(cancelled)
+        if self._closed.is_set():
+            done(_completed(loop, None))
+        else:
+            self._frontend.connect(
+                rdwr=self._options, terminate=self._closed.is_set
+            ).add_done_callback(done)
+        return result
+
+
+def _completed(loop, value):
+    future = asyncio.Future(loop=loop)
+    future.set_result(value)
+    return future
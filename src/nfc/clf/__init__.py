@@ -71,6 +71,7 @@ class ContactlessFrontend(object):
         self.device = None
         self.target = None
         self.lock = threading.Lock()
+        self._path = None
         if path and not self.open(path):
             raise IOError(errno.ENODEV, os.strerror(errno.ENODEV))
 
@@ -145,6 +146,7 @@ class ContactlessFrontend(object):
         # Acquire the lock and search for a device on *path*
         with self.lock:
             log.info("searching for reader on path " + path)
+            self._path = path
             self.device = device.connect(path)
             if self.device:
                 log.info("using {0}".format(self.device))
@@ -182,6 +184,7 @@ class ContactlessFrontend(object):
         * ``rdwr={key: value, ...}`` - options for reader/writer
         * ``llcp={key: value, ...}`` - options for peer to peer
         * ``card={key: value, ...}`` - options for card emulation
+        * ``recover=Recovery()`` - reopen the device after I/O errors
 
         **Reader/Writer Options**
 
@@ -252,6 +255,47 @@ class ContactlessFrontend(object):
             perform this functionality when a tag is successfully detected.
             Defaults to True.
 
+        'presence-check' : nfc.tag.PresenceCheck
+           The :class:`~nfc.tag.PresenceCheck` object that runs the
+           presence check loop after 'on-connect' returned a true
+           value. The default checks every 0.1 seconds. A custom
+           object allows to adjust the interval and to read the tag
+           removal latency statistics, for example
+           ``PresenceCheck(interval=0.02, max_interval=0.2)`` checks
+           fast at first and then backs off to five checks per
+           second.
+
+        'schedule' : nfc.clf.SenseScheduler
+           A :class:`SenseScheduler` object that is given to
+           :meth:`sense` to poll the most frequently discovered
+           technology first and less relevant technologies at a lower
+           rate, for example ``SenseScheduler(intervals={'106B': 2})``.
+           It also provides the time to detect for each technology.
+           The default is None for the fixed order of 'targets'.
+
+        'ndef-cache' : nfc.tag.NdefCache
+           An :class:`~nfc.tag.NdefCache` object that is assigned to
+           the :attr:`~nfc.tag.Tag.ndef_cache` attribute of every
+           activated tag. NDEF data of a tag seen again is then
+           validated with a short probe instead of being read
+           completely. The default is None for no caching.
+
+        'iso-dep-bitrate' : integer
+           The maximum bitrate in kbps (106, 212, 424 or 848) that is
+           negotiated with a Type 4A Tag by PPS and with a Type 4B
+           Tag by ATTRIB. The highest bitrate supported by both the
+           tag and this value is used and reported as the
+           :attr:`~nfc.tag.tt4.Type4Tag.bitrate` attribute. Not all
+           devices support all bitrates for Type A and B, the default
+           is 106 to stay at the discovery bitrate.
+
+        'product-cache' : nfc.tag.ProductCache
+           A :class:`~nfc.tag.ProductCache` object that remembers the
+           product identified for a tag, so that a tag seen again is
+           activated without the identification commands. This is
+           effective for the NXP Type 2 Tag family. The default is
+           None for no caching.
+
         .. sourcecode:: python
 
            import nfc
@@ -333,6 +377,15 @@ class ContactlessFrontend(object):
            Aggregation is disabled with a false value. The default
            is to use aggregation.
 
+        'symm-backoff' : :class:`nfc.llcp.llc.SymmetryBackoff`
+           The policy for how long the LLC run loop waits for
+           outbound data before it sends a Symmetry PDU. The wait
+           ends as soon as a socket has data to send. The default
+           waits 1 ms and after 10 consecutive exchanges of Symmetry
+           PDUs backs off to at most 50 ms. The object counts the
+           time spent waiting and may thus also be given to evaluate
+           the default policy.
+
         'brs' : integer
            For the local device in Initiator role the bit rate
            selector determines the the bitrate to negotiate with the
@@ -473,6 +526,31 @@ class ContactlessFrontend(object):
            with nfc.ContactlessFrontend('usb') as clf:
                clf.connect(card=card_options)
 
+        **Recovery Option**
+
+        Without the ``recover`` option an :exc:`~exceptions.IOError`
+        from the device makes :meth:`connect` return :const:`False`
+        and the application must :meth:`open` the device again. With
+        a :class:`Recovery` object given as the ``recover`` option,
+        an :exc:`~exceptions.IOError` with one of the
+        :attr:`Recovery.errors` numbers instead closes the device and
+        then reopens it with the *path* used for :meth:`open`, until
+        this succeeds or the 'terminate' function returns a true
+        value. The connect loop then continues with the same options,
+        'on-startup' functions are not called again. The
+        :class:`Recovery` object records the number of recoveries and
+        the time the device was unavailable.
+
+        .. sourcecode:: python
+
+           import nfc
+
+           recovery = nfc.clf.Recovery()
+           with nfc.ContactlessFrontend('usb') as clf:
+               while clf.connect(rdwr={}, recover=recovery):
+                   pass
+           print(recovery)
+
         **Return Value**
 
         The :meth:`connect` method returns :const:`None` if there were
@@ -480,7 +558,10 @@ class ContactlessFrontend(object):
         executed or when the 'terminate' function returned a true
         value. It returns :const:`False` when terminated by any of the
         following exceptions: :exc:`~exceptions.KeyboardInterrupt`,
-        :exc:`~exceptions.IOError`, :exc:`UnsupportedTargetError`.
+        :exc:`~exceptions.IOError`, :exc:`UnsupportedTargetError`. An
+        :exc:`~exceptions.IOError` that was handled by the ``recover``
+        option terminates :meth:`connect` only if the device could not
+        be reopened.
 
         The :meth:`connect` method returns a :class:`~nfc.tag.Tag`,
         :class:`~nfc.llcp.llc.LogicalLinkController`, or
@@ -497,6 +578,7 @@ class ContactlessFrontend(object):
             tuple([k for k in options if options[k]])))
 
         terminate = options.get('terminate', lambda: False)
+        recovery = options.get('recover')
         rdwr_options = options.get('rdwr')
         llcp_options = options.get('llcp')
         card_options = options.get('card')
@@ -540,6 +622,11 @@ class ContactlessFrontend(object):
             rdwr_options.setdefault('iterations', 5)
             rdwr_options.setdefault('interval', 0.5)
             rdwr_options.setdefault('beep-on-connect', True)
+            rdwr_options.setdefault('presence-check', nfc.tag.PresenceCheck())
+            rdwr_options.setdefault('schedule', None)
+            rdwr_options.setdefault('ndef-cache', None)
+            rdwr_options.setdefault('iso-dep-bitrate', 106)
+            rdwr_options.setdefault('product-cache', None)
 
             targets = [RemoteTarget(brty) for brty in rdwr_options['targets']]
             targets = rdwr_options['on-startup'](targets)
@@ -574,22 +661,16 @@ class ContactlessFrontend(object):
                                           "card" if card_options else None])))
 
         try:
-            while not terminate():
-                if rdwr_options:
-                    result = self._rdwr_connect(rdwr_options, terminate)
-                    if bool(result) is True:
-                        return result
-                if llcp_options:
-                    result = self._llcp_connect(llcp_options, terminate)
-                    if bool(result) is True:
-                        return result
-                if card_options:
-                    result = self._card_connect(card_options, terminate)
-                    if bool(result) is True:
-                        return result
-        except IOError as error:
-            log.error(error)
-            return False
+            while True:
+                try:
+                    return self._connect_loop(
+                        rdwr_options, llcp_options, card_options, terminate)
+                except IOError as error:
+                    log.error(error)
+                    if recovery is None:
+                        return False
+                    if not self._recover(recovery, error, terminate):
+                        return False
         except UnsupportedTargetError as error:
             log.info(error)
             return False
@@ -597,21 +678,74 @@ class ContactlessFrontend(object):
             log.debug("terminated by keyboard interrupt")
             return False
 
+    def _connect_loop(self, rdwr_options, llcp_options, card_options,
+                      terminate):
+        while not terminate():
+            if rdwr_options:
+                result = self._rdwr_connect(rdwr_options, terminate)
+                if bool(result) is True:
+                    return result
+            if llcp_options:
+                result = self._llcp_connect(llcp_options, terminate)
+                if bool(result) is True:
+                    return result
+            if card_options:
+                result = self._card_connect(card_options, terminate)
+                if bool(result) is True:
+                    return result
+
+    def _recover(self, recovery, error, terminate):
+        # Reopen the device after an I/O error that is expected to go
+        # away, like a reader that was reset or re-enumerated on USB.
+        # The discovery cache of nfc.clf.device makes the reopen try
+        # the previous address and driver first.
+        if error.errno not in recovery.errors or self._path is None:
+            return False
+        log.warning("trying to recover from %s", error)
+        started = time.time()
+        interval = recovery.interval
+        attempts = 0
+        while not terminate():
+            attempts += 1
+            try:
+                if self.open(self._path):
+                    downtime = time.time() - started
+                    recovery.recovered(downtime, attempts)
+                    log.info("recovered after %d attempt(s) in %.3f seconds",
+                             attempts, downtime)
+                    return True
+            except IOError as error:
+                log.debug("reopen failed: %s", error)
+            if recovery.retries is not None and attempts > recovery.retries:
+                break
+            deadline = time.time() + interval
+            while not terminate():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 0.01))
+            interval = min(interval * 2, recovery.max_interval)
+        recovery.failed(time.time() - started, attempts)
+        return False
+
     def _rdwr_connect(self, options, terminate):
         target = self.sense(*options['targets'],
                             iterations=options['iterations'],
-                            interval=options['interval'])
+                            interval=options['interval'],
+                            schedule=options['schedule'])
         if target is not None:
             log.debug("discovered target {0}".format(target))
             if options['on-discover'](target):
-                tag = nfc.tag.activate(self, target)
+                tag = nfc.tag.activate(
+                    self, target, product_cache=options['product-cache'],
+                    max_bitrate=options['iso-dep-bitrate'])
                 if tag is not None:
                     log.debug("connected to {0}".format(tag))
+                    tag.ndef_cache = options['ndef-cache']
                     if options['beep-on-connect']:
                         self.device.turn_on_led_and_buzzer()
                     if options['on-connect'](tag):
-                        while not terminate() and tag.is_present:
-                            time.sleep(0.1)
+                        options['presence-check'].wait(tag, terminate)
                         self.device.turn_off_led_and_buzzer()
                         return options['on-release'](tag)
                     else:
@@ -673,7 +807,10 @@ class ContactlessFrontend(object):
         argument *options* may be the number of ``iterations`` of the
         sense loop set by *targets* and the ``interval`` between
         iterations. The return value is either a :class:`RemoteTarget`
-        instance or :const:`None`.
+        instance or :const:`None`. A :class:`SenseScheduler` given as
+        the ``schedule`` option reorders the *targets* in every
+        iteration by recent discovery success, skips targets that are
+        polled less often, and records the time to detect.
 
         >>> import nfc, nfc.clf
         >>> clf = nfc.ContactlessFrontend("usb")
@@ -830,6 +967,8 @@ class ContactlessFrontend(object):
             if not isinstance(target, RemoteTarget):
                 raise ValueError("invalid target argument type: %r" % target)
 
+        schedule = options.get('schedule')
+
         with self.lock:
             if self.device is None:
                 raise IOError(errno.ENODEV, os.strerror(errno.ENODEV))
@@ -837,10 +976,16 @@ class ContactlessFrontend(object):
             self.target = None  # forget captured target
             self.device.mute()  # deactivate the rf field
 
+            sense_started = time.time()
             for i in xrange(max(1, options.get('iterations', 1))):
                 started = time.time()
-                for target in targets:
+                if schedule is not None:
+                    ordered = schedule.order(targets, started)
+                else:
+                    ordered = targets
+                for target in ordered:
                     log.debug("sense {0}".format(target))
+                    polled = time.time()
                     try:
                         if target.atr_req is not None:
                             self.target = sense_dep(target)
@@ -863,7 +1008,12 @@ class ContactlessFrontend(object):
                     else:
                         if self.target is not None:
                             log.debug("found {0}".format(self.target))
+                            if schedule is not None:
+                                schedule.polled(target, polled, sense_started,
+                                                found=True)
                             return self.target
+                    if schedule is not None:
+                        schedule.polled(target, polled, sense_started)
                 if len(targets) > 0:
                     self.device.mute()  # deactivate the rf field
                 if i < options.get('iterations', 1) - 1:
@@ -1097,6 +1247,158 @@ class ContactlessFrontend(object):
 # Targets
 #
 ###############################################################################
+class SenseScheduler(object):
+    """Adapt the polling order of :meth:`ContactlessFrontend.sense`
+    to the targets that are actually found (the ``schedule`` option).
+
+    Every discovery adds a hit to the score of the target's bitrate and
+    technology type (the :attr:`RemoteTarget.brty` string), while the
+    scores of all types are multiplied with *decay*. Each iteration of
+    the sense loop then polls the targets in order of decreasing score,
+    targets with equal scores keep the order given to :meth:`sense`.
+    The dominant card type of a location is thus found with the first
+    poll, and the order follows when that changes.
+
+    The *intervals* dictionary may set a minimum time in seconds
+    between polls of a type, for example ``{'106B': 2.0}`` to look
+    for Type B cards only every two seconds. A type is skipped in
+    sense iterations that start before its interval has passed.
+
+    Per type statistics are available from :meth:`statistics`. The
+    time to detect is measured from the start of the :meth:`sense`
+    call to the response of the successful poll.
+
+    """
+    class Statistics(object):
+        def __init__(self):
+            self.polls = 0
+            self.poll_time = 0.0
+            self.hits = 0
+            self.detect_time = 0.0
+            self.score = 0.0
+            self.last_poll = None
+
+        @property
+        def mean_poll_time(self):
+            return self.poll_time / self.polls if self.polls else 0.0
+
+        @property
+        def mean_time_to_detect(self):
+            return self.detect_time / self.hits if self.hits else 0.0
+
+        def __str__(self):
+            return ("hits {0}/{1} poll {2:.1f} ms detect {3:.1f} ms"
+                    .format(self.hits, self.polls, 1E3 * self.mean_poll_time,
+                            1E3 * self.mean_time_to_detect))
+
+    def __init__(self, intervals=None, decay=0.9):
+        self.intervals = dict(intervals or {})
+        self.decay = decay
+        self.lock = threading.Lock()
+        self._statistics = dict()
+
+    def _get(self, brty):
+        if brty not in self._statistics:
+            self._statistics[brty] = self.Statistics()
+        return self._statistics[brty]
+
+    def statistics(self, brty=None):
+        """Return the :class:`SenseScheduler.Statistics` for the bitrate
+        and technology type *brty*, or a dictionary of all statistics
+        if *brty* is None.
+
+        """
+        with self.lock:
+            if brty is None:
+                return dict(self._statistics)
+            return self._get(brty)
+
+    def order(self, targets, now):
+        """Return the *targets* that are due for polling at time *now*
+        in order of decreasing score."""
+        with self.lock:
+            due = []
+            for target in targets:
+                last_poll = self._get(target.brty).last_poll
+                interval = self.intervals.get(target.brty)
+                if interval and last_poll is not None \
+                   and now - last_poll < interval:
+                    continue
+                due.append(target)
+            return sorted(due, key=lambda t: -self._get(t.brty).score)
+
+    def polled(self, target, started, sense_started, found=False):
+        """Record a poll for *target* that started at time *started*
+        within a sense loop that started at *sense_started*."""
+        finished = time.time()
+        with self.lock:
+            stats = self._get(target.brty)
+            stats.polls += 1
+            stats.poll_time += finished - started
+            stats.last_poll = started
+            if found:
+                for other in self._statistics.values():
+                    other.score *= self.decay
+                stats.score += 1.0
+                stats.hits += 1
+                stats.detect_time += finished - sense_started
+
+    def __str__(self):
+        with self.lock:
+            return ', '.join(["{0} {1}".format(brty, self._statistics[brty])
+                              for brty in sorted(self._statistics)])
+
+
+class Recovery(object):
+    """Configure and count the device recovery of
+    :meth:`ContactlessFrontend.connect` (the ``recover`` option).
+
+    An :exc:`~exceptions.IOError` with an errno in *errors* closes and
+    reopens the device. The first reopen is tried immediately, further
+    attempts follow after *interval* seconds that double up to
+    *max_interval* seconds. With *retries* not None the recovery gives
+    up after that many further attempts, otherwise it is tried until
+    the 'terminate' function returns a true value.
+
+    The downtime of a recovery is the time from the I/O error until
+    the device was reopened.
+
+    """
+    def __init__(self, errors=(errno.ENODEV, errno.EIO, errno.ETIMEDOUT),
+                 retries=None, interval=0.1, max_interval=5.0):
+        self.errors = frozenset(errors)
+        self.retries = retries
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.lock = threading.Lock()
+        self.recoveries = 0
+        self.failures = 0
+        self.attempts = 0
+        self.downtime = 0.0
+        self.downtime_max = 0.0
+
+    def recovered(self, downtime, attempts):
+        with self.lock:
+            self.recoveries += 1
+            self._count(downtime, attempts)
+
+    def failed(self, downtime, attempts):
+        with self.lock:
+            self.failures += 1
+            self._count(downtime, attempts)
+
+    def _count(self, downtime, attempts):
+        self.attempts += attempts
+        self.downtime += downtime
+        self.downtime_max = max(self.downtime_max, downtime)
+
+    def __str__(self):
+        return ("recoveries {0} failures {1} attempts {2} downtime "
+                "{3:.3f} s max {4:.3f} s").format(
+                    self.recoveries, self.failures, self.attempts,
+                    self.downtime, self.downtime_max)
+
+
 class Target(object):
     def __init__(self, **kwargs):
         for name in kwargs:
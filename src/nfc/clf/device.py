@@ -53,6 +53,27 @@ usb_device_map = {
 
 tty_driver_list = ["arygon", "pn532"]
 
+# The discovery cache maps a *path* given to connect() to the
+# transport type, transport address and driver module of the device
+# that was found for it, so that a later connect() with the same
+# path, for example to reopen a reader after an error, first tries
+# that device before enumerating the USB bus or probing every serial
+# port with every driver. An entry is removed when the device can
+# not be connected through it.
+discovery_cache = dict()
+
+
+def forget(path=None):
+    """Remove *path*, or all paths if *path* is None, from the
+    discovery cache that :func:`connect` uses to locate a device
+    again without full enumeration.
+
+    """
+    if path is None:
+        discovery_cache.clear()
+    else:
+        discovery_cache.pop(path, None)
+
 
 def connect(path):
     """Connect to a local device identified by *path* and load the
@@ -65,6 +86,13 @@ def connect(path):
     """
     assert isinstance(path, str) and len(path) > 0
 
+    if path in discovery_cache:
+        device = _connect_cached(*discovery_cache[path])
+        if device is not None:
+            return device
+        log.debug("discarding cached device for path %r", path)
+        del discovery_cache[path]
+
     found = transport.USB.find(path)
     if found is not None:
         for vid, pid, bus, dev in found:
@@ -95,6 +123,7 @@ def connect(path):
                     raise error
 
             device._path = "usb:{0:03}:{1:03}".format(int(bus), int(dev))
+            discovery_cache[path] = ("usb", (bus, dev), module)
             return device
 
     found = transport.TTY.find(path)
@@ -110,6 +139,7 @@ def connect(path):
                     tty = transport.TTY(dev)
                     device = driver.init(tty)
                     device._path = dev
+                    discovery_cache[path] = ("tty", dev, drv)
                     return device
                 except IOError as error:
                     log.debug(error)
@@ -127,6 +157,68 @@ def connect(path):
         return device
 
 
+def _connect_cached(kind, address, module):
+    # Connect the device at transport *address* with the driver
+    # *module* that was found before. Returns None on any error.
+    log.debug("trying cached {0} driver for {1} {2}"
+              .format(module, kind, address))
+    driver = importlib.import_module("nfc.clf." + module)
+    try:
+        if kind == "usb":
+            bus, dev = address
+            device = driver.init(transport.USB(bus, dev))
+            device._path = "usb:{0:03}:{1:03}".format(int(bus), int(dev))
+        else:
+            tty = transport.TTY(address)
+            try:
+                device = driver.init(tty)
+            except IOError:
+                tty.close()
+                raise
+            device._path = address
+        return device
+    except IOError as error:
+        log.debug(error)
+
+
+def find(path):
+    """Return the list of fully qualified device paths that match the
+    search *path*. The *path* argument is the same as for
+    :func:`connect` but while :func:`connect` opens only the first
+    device found, :func:`find` returns all candidate paths, each of
+    which may be given to :func:`connect` to open exactly that
+    device. USB devices are only listed when a driver is known for
+    the vendor and product ID. Serial devices are listed when the
+    port is physically present, whether it has an NFC device attached
+    can only be determined by :func:`connect`.
+
+    """
+    assert isinstance(path, str) and len(path) > 0
+
+    found = transport.USB.find(path)
+    if found is not None:
+        return ["usb:{0:03d}:{1:03d}".format(int(bus), int(dev))
+                for vid, pid, bus, dev in found
+                if (vid, pid) in usb_device_map]
+
+    found = transport.TTY.find(path)
+    if found is not None:
+        paths = []
+        for dev in found[0]:
+            if dev.startswith("/dev/tty"):
+                paths.append("tty:" + dev[8:])
+            else:
+                paths.append("com:" + dev)
+            if found[1]:
+                paths[-1] += ":" + found[1]
+        return paths
+
+    if path.startswith("udp"):
+        return [path]
+
+    return []
+
+
 class Device(object):
     """All device drivers inherit from the :class:`Device` class and must
     implement it's methods.
@@ -647,12 +739,51 @@ class Device(object):
         crc = ~calculate_crc(data, len(data)-2, 0xFFFF) & 0xFFFF
         return (data[-2], data[-1]) == (crc & 0xff, crc >> 8)
 
+    @staticmethod
+    def check_crc_a_frames(frames):
+        # Return a list with the CRC-A check result for each bytearray
+        # in *frames*, same as calling check_crc_a() for each frame.
+        return check_crc_frames(frames, 0x6363, 0x0000)
+
+    @staticmethod
+    def check_crc_b_frames(frames):
+        # Return a list with the CRC-B check result for each bytearray
+        # in *frames*, same as calling check_crc_b() for each frame.
+        return check_crc_frames(frames, 0xFFFF, 0xFFFF)
+
+
+def _make_crc_table(poly=0x8408):
+    # Precompute the register update for all 256 octet values of the
+    # reflected CRC-16/CCITT polynomial used by ISO/IEC 14443 A and B.
+    table = []
+    for octet in range(256):
+        reg = octet
+        for pos in range(8):
+            reg = (reg >> 1) ^ poly if reg & 1 else reg >> 1
+        table.append(reg)
+    return tuple(table)
+
+
+crc_table = _make_crc_table()
+
 
 def calculate_crc(data, size, reg):
+    table = crc_table
     for octet in data[:size]:
-        for pos in range(8):
-            bit = (reg ^ ((octet >> pos) & 1)) & 1
-            reg = reg >> 1
-            if bit:
-                reg = reg ^ 0x8408
+        reg = (reg >> 8) ^ table[(reg ^ octet) & 0xFF]
     return reg
+
+
+def check_crc_frames(frames, reg, xor):
+    # Verify the trailing two CRC bytes of all bytearrays in *frames*
+    # with initial register value *reg* and final *xor* mask. Frames
+    # shorter than two bytes can not carry a CRC and yield False.
+    result = []
+    for frame in frames:
+        size = len(frame) - 2
+        if size < 0:
+            result.append(False)
+            continue
+        crc = calculate_crc(frame, size, reg) ^ xor
+        result.append(frame[size] == crc & 0xff and frame[-1] == crc >> 8)
+    return result
@@ -38,6 +38,10 @@ listen_ttf  yes      Maximimum frame size is 64 byte
 listen_dep  yes
 ==========  =======  ============
 
+The driver uses asynchronous USB transfers, see
+:meth:`nfc.clf.transport.USB.start_async`, when the module attribute
+``usb_async`` is set to :const:`True` before the device is opened.
+
 """
 import nfc.clf
 from . import pn53x
@@ -47,6 +51,9 @@ import time
 import logging
 log = logging.getLogger(__name__)
 
+# Set to True to open devices with asynchronous USB transfers.
+usb_async = False
+
 
 class Chipset(pn53x.Chipset):
     CMD = {
@@ -372,6 +379,9 @@ class Device(pn53x.Device):
 
 
 def init(transport):
+    if usb_async:
+        transport.start_async()
+
     # write ack to perform a soft reset, raises IOError(EACCES) if
     # someone else has already claimed the USB device.
     transport.write(Chipset.ACK)
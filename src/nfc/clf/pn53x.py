@@ -32,7 +32,7 @@ import os
 import time
 import errno
 from binascii import hexlify
-from struct import pack, unpack
+from struct import pack
 
 import logging
 log = logging.getLogger(__name__)
@@ -40,6 +40,7 @@ log = logging.getLogger(__name__)
 
 class Chipset(object):
     SOF = bytearray.fromhex('0000FF')
+    SOF_EXT = bytearray.fromhex('0000FFFFFF')
     ACK = bytearray.fromhex('0000FF00FF00')
     REG = {
         0x6331: "CIU_Command",
@@ -138,9 +139,12 @@ class Chipset(object):
         is sent with :meth:`write_frame` and the chip acknowledgement
         and response is received with :meth:`read_frame`, those
         methods are used by some drivers for additional framing. The
-        implementation waits 100 ms for the command acknowledgement
-        and then polls every 100 ms for a response frame until
-        *timeout* seconds have elapsed. If the response frame is
+        implementation waits at most 100 ms for the command
+        acknowledgement and then at most *timeout* seconds for the
+        response frame, both reads return as soon as the frame is
+        received. The time to acknowledgement, which is the host side
+        overhead of the command, and the time to response are logged
+        with the command response. If the response frame is
         correct and the response code matches *cmd_code* the data
         bytes that follow the response code are returned as a
         bytearray (without the trailing checksum and postamble).
@@ -162,18 +166,34 @@ class Chipset(object):
             self.log.log(logging.DEBUG-1, "%s %s %.3fs", self.CMD[cmd_code],
                          hexlify(cmd_data), timeout)
 
-            if len(cmd_data) < 254:
-                head = self.SOF + chr(len(cmd_data)+2) + chr(254-len(cmd_data))
+            # The command frame is built in a single bytearray. The
+            # header bytes sum up to 0xFF (normal frame) or 0xFD
+            # (extended frame) modulo 256, so the data checksum is
+            # found from the sum of the whole frame without slicing.
+            size = len(cmd_data) + 2
+            if size < 256:
+                frame = bytearray(size + 7)
+                frame[0:3] = self.SOF
+                frame[3] = size
+                frame[4] = (256 - size) & 0xFF
+                offset, header_sum = 5, 0xFF
             else:
-                head = self.SOF + b'\xFF\xFF' + pack(">H", len(cmd_data)+2)
-                head.append((256 - sum(head[-2:])) & 0xFF)
-
-            data = bytearray([0xD4, cmd_code]) + cmd_data
-            tail = bytearray([(256 - sum(data)) & 0xFF, 0])
+                frame = bytearray(size + 10)
+                frame[0:5] = self.SOF_EXT
+                frame[5] = size >> 8
+                frame[6] = size & 0xFF
+                frame[7] = (512 - frame[5] - frame[6]) & 0xFF
+                offset, header_sum = 8, 0xFD
+            frame[offset] = 0xD4
+            frame[offset+1] = cmd_code
+            frame[offset+2:offset+size] = cmd_data
+            frame[-2] = (header_sum - sum(frame)) & 0xFF
 
             try:
-                self.write_frame(head + data + tail)
+                started = time.time()
+                self.write_frame(frame)
                 frame = self.read_frame(timeout=100)
+                acked = time.time()
             except IOError as error:
                 self.log.error("input/output error while waiting for ack")
                 raise IOError(errno.EIO, os.strerror(errno.EIO))
@@ -182,10 +202,11 @@ class Chipset(object):
                 self.log.error("invalid frame start sequence")
                 raise IOError(errno.EIO, os.strerror(errno.EIO))
 
-            if frame[0:len(self.ACK)] != self.ACK:
+            if not frame.startswith(self.ACK):
                 self.log.warning("missing ack frame")
         else:
             frame = self.ACK
+            started = acked = time.time()
 
         if timeout is not None and timeout <= 0:
             return
@@ -199,44 +220,50 @@ class Chipset(object):
                     time.sleep(0.001)
                 raise error
 
-        if frame.startswith(self.SOF + b'\xFF\xFF'):
+        self.log.log(logging.DEBUG-1, "%s ack %.1f ms, response %.1f ms",
+                     self.CMD[cmd_code], 1E3 * (acked - started),
+                     1E3 * (time.time() - started))
+
+        # The response frame is verified in place, only the response
+        # data is copied into the bytearray that is returned.
+        if frame.startswith(self.SOF_EXT):
             # extended frame
-            if sum(frame[5:8]) & 0xFF != 0:
+            if (frame[5] + frame[6] + frame[7]) & 0xFF != 0:
                 self.log.error("frame lenght checksum error")
                 raise IOError(errno.EIO, os.strerror(errno.EIO))
-            if unpack(">H", buffer(frame[5:7]))[0] != len(frame) - 10:
+            if frame[5] << 8 | frame[6] != len(frame) - 10:
                 self.log.error("frame lenght value mismatch")
                 raise IOError(errno.EIO, os.strerror(errno.EIO))
-            del frame[0:8]
+            offset, header_sum = 8, 0xFD
         elif frame.startswith(self.SOF):
             # normal frame
-            if sum(frame[3:5]) & 0xFF != 0:
+            if (frame[3] + frame[4]) & 0xFF != 0:
                 self.log.error("frame lenght checksum error")
                 raise IOError(errno.EIO, os.strerror(errno.EIO))
             if frame[3] != len(frame) - 7:
                 self.log.error("frame lenght value mismatch")
                 raise IOError(errno.EIO, os.strerror(errno.EIO))
-            del frame[0:5]
+            offset, header_sum = 5, 0xFF
         else:
             self.log.debug("invalid frame start sequence")
             raise IOError(errno.EIO, os.strerror(errno.EIO))
 
-        if not sum(frame) & 0xFF == 0:
+        if not (sum(frame) - header_sum) & 0xFF == 0:
             self.log.error("frame data checksum error")
             raise IOError(errno.EIO, os.strerror(errno.EIO))
 
-        if frame[0] == 0x7F:  # error frame
+        if frame[offset] == 0x7F:  # error frame
             self.chipset_error(0x7F)
 
-        if not frame[0] == 0xD5:
+        if not frame[offset] == 0xD5:
             self.log.error("invalid frame identifier")
             raise IOError(errno.EIO, os.strerror(errno.EIO))
 
-        if not frame[1] == cmd_code + 1:
+        if not frame[offset+1] == cmd_code + 1:
             self.log.error("unexpected response code")
             raise IOError(errno.EIO, os.strerror(errno.EIO))
 
-        return frame[2:-2]
+        return frame[offset+2:-2]
 
     def write_frame(self, frame):
         """Write a command *frame* to the chipset."""
@@ -0,0 +1,308 @@
+# -*- coding: latin-1 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2017 Stephen Tiedemann <stephen.tiedemann@gmail.com>
+#
+# Licensed under the EUPL, Version 1.1 or - as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+#
+# https://joinup.ec.europa.eu/software/page/eupl
+#
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# -----------------------------------------------------------------------------
+"""The :class:`ContactlessFrontendPool` manages a number of locally
+connected contactless devices, each with its own
+:class:`~nfc.clf.ContactlessFrontend`, and runs the discovery and
+activation loops of all devices concurrently.
+
+"""
+from . import device
+from . import ContactlessFrontend
+from ..tag import Tag, PresenceCheck
+
+import time
+import threading
+import collections
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class ContactlessFrontendPool(object):
+    """A pool of contactless frontends driven in parallel.
+
+    All devices that match any of the search *paths* are opened and
+    become available through the :attr:`frontends` list. The *paths*
+    are constructed as described in
+    :meth:`nfc.clf.ContactlessFrontend.open`, but other than for a
+    single frontend a path like ``usb`` or ``tty:USB`` opens all
+    matching devices and not just the first one.
+
+    >>> import nfc
+    >>> pool = nfc.ContactlessFrontendPool('usb', 'tty:USB:pn532')
+    >>> print(len(pool.frontends))
+    8
+
+    The :meth:`connect` method then runs the
+    :meth:`~nfc.clf.ContactlessFrontend.connect` loop of all
+    frontends in separate threads until the *terminate* function
+    returns true. The methods of the :class:`ContactlessFrontendPool`
+    class are thread-safe.
+
+    """
+    class Counter(object):
+        def __init__(self):
+            self.started = None
+            self.elapsed = 0.0
+            self.connect = collections.defaultdict(int)
+            self.release = collections.defaultdict(int)
+            self.errors = 0
+
+        @property
+        def connect_count(self):
+            return sum(self.connect.values())
+
+        @property
+        def connect_rate(self):
+            elapsed = self.elapsed
+            if self.started is not None:
+                elapsed += time.time() - self.started
+            return self.connect_count / elapsed if elapsed > 0 else 0.0
+
+        def __str__(self):
+            s = "connect {0} ({1:.2f}/s) errors {2}".format(
+                self.connect_count, self.connect_rate, self.errors)
+            for name in sorted(self.connect.keys()):
+                s += " {name} {connect}/{release}".format(
+                    name=name, connect=self.connect[name],
+                    release=self.release[name])
+            return s
+
+    def __init__(self, *paths):
+        self._frontends = collections.OrderedDict()
+        self._counters = dict()
+        self.lock = threading.Lock()
+        for path in paths:
+            self.open(path)
+
+    def open(self, path):
+        """Open all contactless devices found for the search *path*.
+
+        Devices that are already open in the pool are not opened
+        again. Devices that are found but can not be opened, for
+        example because they are used by another process, are logged
+        and skipped. The return value is the number of devices that
+        were added to the pool.
+
+        """
+        if not isinstance(path, str):
+            raise TypeError("expecting a string type argument *path*")
+        if not len(path) > 0:
+            raise ValueError("argument *path* must not be empty")
+
+        opened = 0
+        for device_path in device.find(path):
+            with self.lock:
+                if device_path in self._frontends:
+                    continue
+            clf = ContactlessFrontend()
+            try:
+                if not clf.open(device_path):
+                    continue
+            except IOError as error:
+                log.warning("can not open %s: %s", device_path, error)
+                continue
+            with self.lock:
+                self._frontends[device_path] = clf
+                self._counters[device_path] = self.Counter()
+            opened += 1
+        log.info("opened {0} reader(s) for path {1}".format(opened, path))
+        return opened
+
+    def close(self):
+        """Close all contactless devices in the pool."""
+        with self.lock:
+            frontends = list(self._frontends.values())
+            self._frontends.clear()
+            self._counters.clear()
+        for clf in frontends:
+            clf.close()
+
+    @property
+    def frontends(self):
+        """The list of :class:`~nfc.clf.ContactlessFrontend` objects."""
+        with self.lock:
+            return list(self._frontends.values())
+
+    @property
+    def paths(self):
+        """The list of device paths, same order as :attr:`frontends`."""
+        with self.lock:
+            return list(self._frontends.keys())
+
+    def counters(self, path=None):
+        """Return the throughput counters for the device at *path*, or a
+        dictionary of counters for all devices if *path* is None. The
+        counters are reset with every call to :meth:`connect`.
+
+        """
+        with self.lock:
+            if path is None:
+                return dict(self._counters)
+            return self._counters[path]
+
+    def connect(self, **options):
+        """Run :meth:`nfc.clf.ContactlessFrontend.connect` for all frontends.
+
+        The *options* are the same as for a single frontend, each
+        frontend receives its own copy of the ``rdwr``, ``llcp`` and
+        ``card`` option dictionaries. The 'on-startup', 'on-connect'
+        and 'on-release' callback functions are called from the
+        frontend's own thread, for example, the *tag* given to a
+        reader/writer 'on-connect' function tells through the
+        :attr:`nfc.tag.Tag.clf` attribute where it was found. Note
+        that a new LLC object is created for every connect loop, so
+        the 'llcp' option is only useful with an 'on-startup'
+        function that binds the services to each new LLC.
+
+        The option dictionaries are copied but not their values. An
+        object given as option value, like a
+        :class:`nfc.tag.PresenceCheck`, :class:`nfc.tag.NdefCache`,
+        :class:`nfc.tag.ProductCache`, :class:`nfc.clf.SenseScheduler`
+        or :class:`nfc.clf.Recovery`, is thus used by all frontend
+        threads at the same time. These classes are thread-safe and
+        their statistics then sum up over all frontends.
+
+        After a single activation and deactivation on a frontend, the
+        connect loop is restarted on that frontend. It finishes when
+        the ``terminate`` function returns a true value (it is called
+        from all frontend threads) or the frontend reported an error.
+        The :meth:`connect` method returns the dictionary of
+        :meth:`counters` when all frontend loops have finished.
+
+        An additional ``queue`` option may provide an object with a
+        ``put()`` method, like :class:`Queue.Queue`, that then
+        receives a ``(path, event, obj)`` tuple for every activation
+        and deactivation. The *event* is a string composed of the
+        option name and callback name, i.e. ``'rdwr.on-connect'``
+        when a tag was activated and ``'rdwr.on-release'`` when it
+        was removed, and *obj* the object given to the callback.
+
+        If a reader/writer 'on-connect' function returns a false
+        value, the application takes over the tag but the pool still
+        waits, using the 'presence-check' option, until the tag is
+        removed before the frontend searches again. The removal is
+        then counted and reported as ``'rdwr.on-release'`` event
+        without calling the 'on-release' function. This avoids that a
+        tag that stays in the field is activated again and again.
+
+        The connect loops are also stopped when :meth:`connect` is
+        interrupted, for example by a :exc:`KeyboardInterrupt`, and
+        the exception is raised when all frontend threads have
+        finished.
+
+        """
+        with self.lock:
+            frontends = list(self._frontends.items())
+            for path in self._counters:
+                self._counters[path] = self.Counter()
+
+        stop = threading.Event()
+        terminate = options.get('terminate', lambda: False)
+        options = dict(options)
+        options['terminate'] = lambda: stop.is_set() or terminate()
+
+        threads = []
+        try:
+            for path, clf in frontends:
+                thread = threading.Thread(
+                    name=path, target=self._run, args=(path, clf, options))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+
+            while any([t.is_alive() for t in threads]):
+                for thread in threads:
+                    thread.join(0.1)  # short to allow KeyboardInterrupt
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        return self.counters()
+
+    def _run(self, path, clf, options):
+        counter = self._counters[path]
+        queue = options.get('queue')
+        options = self._wrap_options(path, counter, options)
+        terminate = options.get('terminate', lambda: False)
+        counter.started = time.time()
+        try:
+            while not terminate():
+                result = clf.connect(**options)
+                if result is False:
+                    counter.errors += 1
+                    log.error("connect loop aborted on %s", path)
+                    break
+                if result is None:
+                    break
+                if isinstance(result, Tag):
+                    # The 'on-connect' function returned false and the
+                    # tag is handled by the application. Do not
+                    # activate the same tag again while it is present.
+                    presence = (options['rdwr'].get('presence-check')
+                                or PresenceCheck())
+                    if presence.wait(result, terminate):
+                        counter.release['rdwr'] += 1
+                        if queue is not None:
+                            queue.put((path, 'rdwr.on-release', result))
+        finally:
+            counter.elapsed += time.time() - counter.started
+            counter.started = None
+
+    @staticmethod
+    def _wrap_options(path, counter, options):
+        queue = options.get('queue')
+
+        def wrap(mode, event, func):
+            counts = counter.connect if event == 'on-connect' \
+                else counter.release
+
+            def callback(obj):
+                counts[mode] += 1
+                if queue is not None:
+                    queue.put((path, mode + '.' + event, obj))
+                return func(obj)
+            return callback
+
+        defaults = {'on-connect': lambda obj: True,
+                    'on-release': lambda obj: True}
+
+        options = dict(options)
+        options.pop('queue', None)
+        for mode in ('rdwr', 'llcp', 'card'):
+            if options.get(mode) is not None:
+                mode_options = dict(options[mode])
+                for event in ('on-connect', 'on-release'):
+                    func = mode_options.get(event, defaults[event])
+                    mode_options[event] = wrap(mode, event, func)
+                options[mode] = mode_options
+        return options
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return "ContactlessFrontendPool({0})".format(', '.join(self.paths))
@@ -43,6 +43,10 @@ listen_ttf  yes
 listen_dep  yes      Only passive communication mode
 ==========  =======  ============
 
+The driver uses asynchronous USB transfers, see
+:meth:`nfc.clf.transport.USB.start_async`, when the module attribute
+``usb_async`` is set to :const:`True` before the device is opened.
+
 """
 import nfc.clf
 from . import device
@@ -55,6 +59,9 @@ from binascii import hexlify
 import logging
 log = logging.getLogger(__name__)
 
+# Set to True to open devices with asynchronous USB transfers.
+usb_async = False
+
 
 class Frame(object):
     def __init__(self, data):
@@ -958,6 +965,8 @@ class Device(device.Device):
 
 
 def init(transport):
+    if usb_async:
+        transport.start_async()
     chipset = Chipset(transport, logger=log)
     device = Device(chipset, logger=log)
     device._vendor_name = transport.manufacturer_name
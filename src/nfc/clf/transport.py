@@ -24,8 +24,10 @@
 #
 import os
 import re
+import time
 import errno
 import termios
+import collections
 from binascii import hexlify
 
 try:
@@ -136,14 +138,19 @@ class TTY(object):
             self.tty.baudrate = value
 
     def read(self, timeout):
+        # Wait *timeout* milliseconds for the start of a frame. The
+        # remaining bytes follow back-to-back and are read with a
+        # timeout that covers the longest frame at the current
+        # baudrate plus the latency of USB serial converters.
         if self.tty is not None:
-            self.tty.timeout = max(timeout/1E3, 0.05)
+            self._set_timeout(max(timeout, 1) / 1E3)
             frame = bytearray(self.tty.read(6))
             if frame is None or len(frame) == 0:
                 raise IOError(errno.ETIMEDOUT, os.strerror(errno.ETIMEDOUT))
             if frame.startswith(b"\x00\x00\xff\x00\xff\x00"):
                 log.log(logging.DEBUG-1, "<<< %s", str(frame).encode("hex"))
                 return frame
+            self._set_timeout(0.05 + 2650.0 / self.tty.baudrate)
             LEN = frame[3]
             if LEN == 0xFF:
                 frame += self.tty.read(3)
@@ -152,6 +159,12 @@ class TTY(object):
             log.log(logging.DEBUG-1, "<<< %s", hexlify(frame))
             return frame
 
+    def _set_timeout(self, timeout):
+        # Changing the timeout reconfigures the serial port with
+        # pyserial, so it is only done when the value changes.
+        if self.tty.timeout != timeout:
+            self.tty.timeout = timeout
+
     def write(self, frame):
         if self.tty is not None:
             log.log(logging.DEBUG-1, ">>> %s", hexlify(frame))
@@ -170,6 +183,19 @@ class TTY(object):
 
 class USB(object):
     TYPE = "USB"
+    transfers = None
+
+    class Transfers(object):
+        # State of the asynchronous transfers. The *frames* deque
+        # holds received frames or IOError instances in arrival
+        # order, *idle* has OUT transfers for reuse and *busy* those
+        # currently submitted, *error* is a failed OUT transfer.
+        def __init__(self):
+            self.inp = None
+            self.frames = collections.deque()
+            self.idle = []
+            self.busy = []
+            self.error = None
 
     @classmethod
     def find(cls, path):
@@ -227,6 +253,7 @@ class USB(object):
         self.usb_dev = None
         self.usb_out = None
         self.usb_inp = None
+        self.transfers = None
 
         for dev in self.context.getDeviceList(skip_on_error=True):
             if ((dev.getBusNumber() == usb_bus and
@@ -282,6 +309,7 @@ class USB(object):
             raise IOError(errno.ENODEV, os.strerror(errno.ENODEV))
 
     def close(self):
+        self.stop_async()
         if self.usb_dev:
             self.usb_dev.close()
         self.usb_dev = None
@@ -296,7 +324,151 @@ class USB(object):
     def product_name(self):
         return self._product_name
 
+    def start_async(self):
+        """Switch to asynchronous transfers. An IN transfer is then kept
+        submitted all the time, so that a response frame is received
+        by libusb as soon as the device sends it, and :meth:`write`
+        queues an OUT transfer and returns without waiting for its
+        completion. The :meth:`read` and :meth:`write` methods keep
+        their arguments and return values, drivers that use only
+        those methods, like the PN533 and RC-S380 drivers, work
+        unchanged. Errors of a queued write are raised by the next
+        :meth:`read` or :meth:`write` call. The PN533 and RC-S380
+        drivers call this method when their module attribute
+        ``usb_async`` is set.
+
+        """
+        if self.usb_dev is not None and self.transfers is None:
+            self.transfers = USB.Transfers()
+            transfer = self.usb_dev.getTransfer()
+            transfer.setBulk(self.usb_inp.getAddress(), 300,
+                             callback=self._read_complete)
+            transfer.submit()
+            self.transfers.inp = transfer
+
+    def stop_async(self):
+        """Cancel all pending transfers and return to synchronous
+        transfers."""
+        if self.transfers is not None:
+            transfers, self.transfers = self.transfers, None
+            pending = [t for t in transfers.busy if t.isSubmitted()]
+            if transfers.inp.isSubmitted():
+                pending.append(transfers.inp)
+            for transfer in pending:
+                try:
+                    transfer.cancel()
+                except libusb.USBError as error:
+                    log.debug("cancel transfer: %r", error)
+            deadline = time.time() + 1.0
+            while any([t.isSubmitted() for t in pending]):
+                if time.time() > deadline:
+                    log.warning("transfers not cancelled within 1 second")
+                    break
+                self.context.handleEventsTimeout(0.1)
+
+    def _read_complete(self, transfer):
+        transfers = self.transfers
+        if transfers is None:
+            return
+        status = transfer.getStatus()
+        if status == libusb.TRANSFER_COMPLETED:
+            if transfer.getActualLength() > 0:
+                frame = bytearray(transfer.getBuffer()
+                                  [:transfer.getActualLength()])
+                log.log(logging.DEBUG-1, "<<< %s", hexlify(frame))
+                transfers.frames.append(frame)
+            else:
+                log.error("bulk read returned zero data")
+                transfers.frames.append(
+                    IOError(errno.EIO, os.strerror(errno.EIO)))
+        elif status == libusb.TRANSFER_NO_DEVICE:
+            transfers.frames.append(
+                IOError(errno.ENODEV, os.strerror(errno.ENODEV)))
+            return
+        elif status == libusb.TRANSFER_CANCELLED:
+            return
+        else:
+            log.error("bulk read transfer status %d", status)
+            transfers.frames.append(
+                IOError(errno.EIO, os.strerror(errno.EIO)))
+        transfer.submit()
+
+    def _write_complete(self, transfer):
+        transfers = self.transfers
+        if transfers is None:
+            return
+        transfers.busy.remove(transfer)
+        transfers.idle.append(transfer)
+        status = transfer.getStatus()
+        if status == libusb.TRANSFER_COMPLETED:
+            return
+        if status == libusb.TRANSFER_TIMED_OUT:
+            error = errno.ETIMEDOUT
+        elif status == libusb.TRANSFER_NO_DEVICE:
+            error = errno.ENODEV
+        elif status == libusb.TRANSFER_CANCELLED:
+            return
+        else:
+            log.error("bulk write transfer status %d", status)
+            error = errno.EIO
+        if transfers.error is None:
+            transfers.error = IOError(error, os.strerror(error))
+
+    def _raise_write_error(self):
+        if self.transfers.error is not None:
+            error, self.transfers.error = self.transfers.error, None
+            raise error
+
+    def _read_async(self, timeout):
+        # Handle libusb events until a frame was received or
+        # *timeout* milliseconds have passed, zero waits forever.
+        transfers = self.transfers
+        deadline = time.time() + timeout / 1E3
+        while not transfers.frames:
+            self._raise_write_error()
+            if timeout:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise IOError(errno.ETIMEDOUT,
+                                  os.strerror(errno.ETIMEDOUT))
+                self.context.handleEventsTimeout(remaining)
+            else:
+                self.context.handleEvents()
+        frame = transfers.frames.popleft()
+        if isinstance(frame, IOError):
+            raise frame
+        return frame
+
+    def _write_async(self, frame, timeout):
+        transfers = self.transfers
+        self._raise_write_error()
+        ep_addr = self.usb_out.getAddress()
+        frames = [bytes(frame)]
+        if len(frame) % self.usb_out.getMaxPacketSize() == 0:
+            frames.append(b'')
+        for data in frames:
+            if transfers.idle:
+                transfer = transfers.idle.pop()
+            else:
+                transfer = self.usb_dev.getTransfer()
+            transfer.setBulk(ep_addr, data, callback=self._write_complete,
+                             timeout=timeout)
+            try:
+                transfer.submit()
+            except libusb.USBErrorNoDevice:
+                transfers.idle.append(transfer)
+                raise IOError(errno.ENODEV, os.strerror(errno.ENODEV))
+            except libusb.USBError as error:
+                transfers.idle.append(transfer)
+                log.error("%r", error)
+                raise IOError(errno.EIO, os.strerror(errno.EIO))
+            transfers.busy.append(transfer)
+        # Let libusb process completed transfers without blocking.
+        self.context.handleEventsTimeout(0)
+
     def read(self, timeout=0):
+        if self.usb_inp is not None and self.transfers is not None:
+            return self._read_async(timeout)
         if self.usb_inp is not None:
             try:
                 ep_addr = self.usb_inp.getAddress()
@@ -318,6 +490,9 @@ class USB(object):
             return frame
 
     def write(self, frame, timeout=0):
+        if self.usb_out is not None and self.transfers is not None:
+            log.log(logging.DEBUG-1, ">>> %s", hexlify(frame))
+            return self._write_async(frame, timeout)
         if self.usb_out is not None:
             log.log(logging.DEBUG-1, ">>> %s", hexlify(frame))
             try:
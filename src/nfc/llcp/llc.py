@@ -43,6 +43,78 @@ wks_map = {
     b"urn:nfc:sn:snep": 4,
 }
 
+# A Symmetry PDU has no variable fields, the run loops send and receive
+# one instance and compare frames with its encoding instead of decoding.
+symm_pdu = pdu.Symmetry()
+symm_data = pdu.encode(symm_pdu)
+
+
+class SymmetryBackoff(object):
+    """The policy for how long the run loop of a
+    :class:`LogicalLinkController` waits for outbound data before it
+    sends a Symmetry PDU.
+
+    After each PDU exchange the run loop waits up to :meth:`update`
+    seconds for a socket to queue a PDU, the wait ends immediately
+    when that happens. While data is exchanged the wait time is the
+    *initial* value. After *threshold* consecutive exchanges of only
+    Symmetry PDUs the link is considered idle and the wait time is
+    doubled with every further idle exchange up to the *maximum*
+    value. This reduces the host load of an idle link while the first
+    PDU sent by the local side is never delayed. Data that the remote
+    side wants to send is, however, delayed by up to *maximum*
+    seconds on an idle link.
+
+    A :class:`SymmetryBackoff` object may be set as the 'symm-backoff'
+    option of :meth:`nfc.clf.ContactlessFrontend.connect` to change
+    the policy or evaluate it. The :attr:`waits` counter accumulates
+    the number of times the run loop waited, :attr:`wakeups` how many
+    of those ended because outbound data was queued and
+    :attr:`idle_time` the total seconds spent waiting.
+
+    """
+    def __init__(self, initial=0.001, maximum=0.05, threshold=10):
+        self.initial = initial
+        self.maximum = maximum
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.waits = 0
+        self.wakeups = 0
+        self.idle_time = 0.0
+        self._symm = 0
+
+    def __str__(self):
+        return "waits {0} wakeups {1} idle {2:.3f} sec".format(
+            self.waits, self.wakeups, self.idle_time)
+
+    def reset(self):
+        """Start over with the *initial* wait time."""
+        with self.lock:
+            self._symm = 0
+
+    def update(self, send_pdu, rcvd_pdu):
+        """Register the exchange of *send_pdu* and *rcvd_pdu* and return
+        the time to wait for outbound data. A *send_pdu* of None, as
+        for the first receive in Target role, counts as Symmetry PDU.
+
+        """
+        with self.lock:
+            if (((send_pdu is None or send_pdu.name == "SYMM") and
+                 rcvd_pdu.name == "SYMM")):
+                self._symm += 1
+            else:
+                self._symm = 0
+            if self._symm < self.threshold:
+                return self.initial
+            exponent = min(self._symm - self.threshold + 1, 32)
+            return min(self.initial * 2 ** exponent, self.maximum)
+
+    def count(self, idle_time, woken):
+        with self.lock:
+            self.waits += 1
+            self.wakeups += int(bool(woken))
+            self.idle_time += idle_time
+
 
 class ServiceAccessPoint(object):
     def __init__(self, addr, llc):
@@ -50,10 +122,27 @@ class ServiceAccessPoint(object):
         self.addr = addr
         self.sock_list = collections.deque()
         self.send_list = collections.deque()
+        self.scheduled = False
+        self.max_queue_depth = 0
 
     def __str__(self):
         return "SAP {0:>2}".format(self.addr)
 
+    @property
+    def queue_depth(self):
+        # The number of outbound PDUs queued on this SAP.
+        with self.llc.lock:
+            depth = len(self.send_list)
+            for socket in self.sock_list:
+                depth += len(socket.send_queue)
+            return depth
+
+    @property
+    def send_pending(self):
+        with self.llc.lock:
+            return (len(self.send_list) > 0 or
+                    any(socket.send_pending for socket in self.sock_list))
+
     @property
     def mode(self):
         with self.llc.lock:
@@ -75,6 +164,7 @@ class ServiceAccessPoint(object):
                 insertable = True
             if insertable:
                 socket.bind(self.addr)
+                socket.send_notify = self.schedule
                 self.sock_list.appendleft(socket)
             else:
                 log.error("can't insert socket of different type")
@@ -94,6 +184,10 @@ class ServiceAccessPoint(object):
 
     def send(self, send_pdu):
         self.send_list.append(send_pdu)
+        self.schedule()
+
+    def schedule(self):
+        self.llc.schedule(self)
 
     def shutdown(self):
         while True:
@@ -153,6 +247,7 @@ class ServiceAccessPoint(object):
 class ServiceDiscovery(object):
     def __init__(self, llc):
         self.llc = llc
+        self.addr = 1
         self.snl = dict()
         self.tids = range(256)
         self.resp = threading.Condition(self.llc.lock)
@@ -160,6 +255,8 @@ class ServiceDiscovery(object):
         self.sdreq = collections.deque()
         self.sdres = collections.deque()
         self.dmpdu = collections.deque()
+        self.scheduled = False
+        self.max_queue_depth = 0
 
     def __str__(self):
         return "SAP  1"
@@ -168,6 +265,15 @@ class ServiceDiscovery(object):
     def mode(self):
         return LOGICAL_DATA_LINK
 
+    @property
+    def queue_depth(self):
+        with self.llc.lock:
+            return len(self.sdres) + len(self.sdreq) + len(self.dmpdu)
+
+    @property
+    def send_pending(self):
+        return self.queue_depth > 0
+
     def resolve(self, name):
         with self.resp:
             if self.snl is None:
@@ -180,6 +286,7 @@ class ServiceDiscovery(object):
             tid = random.choice(self.tids)
             self.tids.remove(tid)
             self.sdreq.append((tid, name))
+            self.llc.schedule(self)
             while self.snl is not None and name not in self.snl:
                 self.resp.wait()
             return None if self.snl is None else self.snl[name]
@@ -262,29 +369,40 @@ class LogicalLinkController(object):
             parent.__setattr__(name, value)
 
     class Counter(object):
+        # Number of sent and received PDUs indexed by the PDU type.
+        __slots__ = ('sent', 'rcvd')
+
         def __init__(self):
-            self.sent = collections.defaultdict(int)
-            self.rcvd = collections.defaultdict(int)
+            self.sent = 16 * [0]
+            self.rcvd = 16 * [0]
 
         @property
         def sent_count(self):
-            return sum(self.sent.values())
+            return sum(self.sent)
 
         @property
         def rcvd_count(self):
-            return sum(self.rcvd.values())
+            return sum(self.rcvd)
 
         def __str__(self):
             s = "sent/rcvd {0}/{1}".format(self.sent_count, self.rcvd_count)
-            for name in set(self.sent.keys() + self.rcvd.keys()):
-                s += " {name} {sent}/{rcvd}".format(
-                    name=name, sent=self.sent[name], rcvd=self.rcvd[name])
+            for ptype in range(16):
+                if self.sent[ptype] or self.rcvd[ptype]:
+                    pdu_type = pdu.pdu_type_map.get(ptype)
+                    name = pdu_type.name if pdu_type else format(ptype, '04b')
+                    s += " {name} {sent}/{rcvd}".format(
+                        name=name, sent=self.sent[ptype],
+                        rcvd=self.rcvd[ptype])
             return s
 
     def __init__(self, **options):
         self.pcnt = LogicalLinkController.Counter()
         self.link = LogicalLinkController.LinkState()
         self.lock = threading.RLock()
+        self.send_event = threading.Event()
+        self.ready_lock = threading.Lock()
+        self.ready = collections.deque()
+        self.backoff = options.get('symm-backoff') or SymmetryBackoff()
         self.cfg = dict()
         self.cfg['recv-miu'] = options.get('miu', 248)
         self.cfg['send-lto'] = options.get('lto', 500)
@@ -403,6 +521,8 @@ class LogicalLinkController(object):
                 log.debug("closing service access point %d" % i)
                 self.sap[i].shutdown()
                 self.sap[i] = None
+        with self.ready_lock:
+            self.ready.clear()
         self.link.SHUTDOWN = True
 
     def exchange(self, send_pdu, timeout):
@@ -413,29 +533,41 @@ class LogicalLinkController(object):
         # it must be explicitely enabled. The return value is either a
         # PDU instance or None.
         try:
-            if send_pdu:
+            if send_pdu is not None:
                 loglevel = logging.DEBUG - bool(send_pdu.name == "SYMM")
                 log.log(loglevel, "SEND %s", send_pdu)
-                send_data = pdu.encode(send_pdu)
-                self.pcnt.sent[send_pdu.name] += 1
+                if send_pdu is symm_pdu:
+                    send_data = symm_data
+                else:
+                    send_data = pdu.encode(send_pdu)
+                self.pcnt.sent[send_pdu.ptype] += 1
                 rcvd_data = self.mac.exchange(send_data, timeout)
             else:
                 rcvd_data = self.mac.exchange(None, timeout)
             if rcvd_data is not None:
-                rcvd_pdu = pdu.decode(rcvd_data)
-                self.pcnt.rcvd[rcvd_pdu.name] += 1
+                if rcvd_data == symm_data:
+                    rcvd_pdu = symm_pdu
+                else:
+                    rcvd_pdu = pdu.decode(rcvd_data)
+                self.pcnt.rcvd[rcvd_pdu.ptype] += 1
                 loglevel = logging.DEBUG - bool(rcvd_pdu.name == "SYMM")
                 log.log(loglevel, "RECV %s", rcvd_pdu)
                 return rcvd_pdu
         except (nfc.clf.CommunicationError, pdu.Error) as error:
             log.warning("{0!r}".format(error))
 
+    @staticmethod
+    def is_link_disconnect(rcvd_pdu):
+        # A DISC PDU from and to SAP 0 deactivates the LLCP link.
+        return (isinstance(rcvd_pdu, pdu.Disconnect) and
+                rcvd_pdu.dsap == 0 and rcvd_pdu.ssap == 0)
+
     def run_as_initiator(self, terminate=lambda: False):
         recv_timeout = 1E-3 * (self.cfg['recv-lto'] + 10)
         msg = "starting initiator run loop with a receive timeout of %.3f sec"
         log.debug(msg, recv_timeout)
 
-        symm = 0  # counts the number of consecutive SYMM PDUs
+        self.backoff.reset()
         try:
             if self.cfg['llcp-dpc'] == 1:
                 cipher = sec.cipher_suite("ECDH_anon_WITH_AEAD_AES_128_CCM_4")
@@ -459,18 +591,16 @@ class LogicalLinkController(object):
             self.link.ESTABLISHED = True
             while not terminate():
                 if send_pdu is None:
-                    send_pdu = pdu.Symmetry()
+                    send_pdu = symm_pdu
                 rcvd_pdu = self.exchange(send_pdu, recv_timeout)
                 if rcvd_pdu is None:
                     return self.terminate(reason="link disruption")
-                if rcvd_pdu == pdu.Disconnect(0, 0):
+                if self.is_link_disconnect(rcvd_pdu):
                     self.link.CLOSED = True
                     return self.terminate(reason="remote choice")
-                symm += 1 if rcvd_pdu.name == "SYMM" else 0
+                delay = self.backoff.update(send_pdu, rcvd_pdu)
                 self.dispatch(rcvd_pdu)
-                send_pdu = self.collect(delay=0.001)
-                if send_pdu is None and symm >= 10:
-                    send_pdu = self.collect(delay=0.05)
+                send_pdu = self.collect(delay)
             else:
                 self.link.DISCONNECT = True
                 self.terminate(reason="local choice")
@@ -492,6 +622,7 @@ class LogicalLinkController(object):
             self.terminate(reason="encryption error")
             raise SystemExit
         finally:
+            log.debug("llc symm backoff %s", self.backoff)
             log.debug("llc run loop terminated on initiator")
 
     def run_as_target(self, terminate=lambda: False):
@@ -499,7 +630,8 @@ class LogicalLinkController(object):
         msg = "starting target run loop with a receive timeout of %.3f sec"
         log.debug(msg, recv_timeout)
 
-        symm = 0  # counts the number of consecutive SYMM PDUs
+        self.backoff.reset()
+        send_pdu = None
         try:
             if self.cfg['llcp-dpc'] == 1:
                 cipher = sec.cipher_suite("ECDH_anon_WITH_AEAD_AES_128_CCM_4")
@@ -526,16 +658,14 @@ class LogicalLinkController(object):
             while not terminate():
                 if rcvd_pdu is None:
                     return self.terminate(reason="link disruption")
-                if rcvd_pdu == pdu.Disconnect(0, 0):
+                if self.is_link_disconnect(rcvd_pdu):
                     self.link.CLOSED = True
                     return self.terminate(reason="remote choice")
-                symm += 1 if isinstance(rcvd_pdu, pdu.Symmetry) else 0
+                delay = self.backoff.update(send_pdu, rcvd_pdu)
                 self.dispatch(rcvd_pdu)
-                send_pdu = self.collect(delay=0.001)
-                if send_pdu is None and symm >= 10:
-                    send_pdu = self.collect(delay=0.05)
+                send_pdu = self.collect(delay)
                 if send_pdu is None:
-                    send_pdu = pdu.Symmetry()
+                    send_pdu = symm_pdu
                 rcvd_pdu = self.exchange(send_pdu, recv_timeout)
             else:
                 self.link.DISCONNECT = True
@@ -558,28 +688,97 @@ class LogicalLinkController(object):
             self.terminate(reason="encryption error")
             raise SystemExit
         finally:
+            log.debug("llc symm backoff %s", self.backoff)
             log.debug("llc run loop terminated on target")
 
     def collect(self, delay=None):
-        # Collect a single PDU or multiple PDUs if aggregation is enabled.
-        if delay:
-            time.sleep(delay)
+        # Collect a single PDU or multiple PDUs if aggregation is
+        # enabled. If no PDU is queued, wait up to delay seconds for
+        # a socket to queue one before voluntary acknowledgements are
+        # sent. Sockets set the send_event when they queue a PDU, the
+        # event is cleared before looking at the queues so that a PDU
+        # queued in between can not be missed.
+        self.send_event.clear()
+        send_pdu = self._collect(sendack=False)
+        if send_pdu is None and delay:
+            started = time.time()
+            timeout = delay
+            while timeout > 0 and self.send_event.wait(timeout):
+                self.send_event.clear()
+                send_pdu = self._collect(sendack=False)
+                if send_pdu is not None:
+                    break
+                timeout = started + delay - time.time()
+            self.backoff.count(time.time() - started, send_pdu is not None)
+        if send_pdu is None:
+            send_pdu = self._collect(sendack=True)
+        return send_pdu
+
+    def schedule(self, sap):
+        # Put the sap on the ready queue of SAPs that have outbound
+        # PDUs and wake up the run loop. This is called from socket
+        # methods that hold the socket lock, so the ready_lock must
+        # never be held while acquiring any other lock.
+        with self.ready_lock:
+            if not sap.scheduled:
+                sap.scheduled = True
+                self.ready.append(sap)
+        self.send_event.set()
 
+    @property
+    def queue_depth(self):
+        # The current and maximum number of queued outbound PDUs per
+        # SAP address, for all SAPs that had PDUs to send.
+        with self.lock:
+            return dict((sap.addr, (sap.queue_depth, sap.max_queue_depth))
+                        for sap in self.sap
+                        if sap is not None and sap.max_queue_depth > 0)
+
+    def _collect(self, sendack):
+        # Collect from the SAPs on the ready queue. Raw access points
+        # are served first, then all others in the order they became
+        # ready. A SAP that contributed the first PDU is moved to the
+        # end of the queue for round-robin service. SAPs that have no
+        # more PDUs to send are then removed from the queue.
+        with self.ready_lock:
+            saps = [sap for sap in self.ready if self.sap[sap.addr] is sap]
+            if len(saps) < len(self.ready):
+                for sap in self.ready:
+                    sap.scheduled = sap in saps
+                self.ready = collections.deque(saps)
+        with self.lock:
+            for sap in saps:
+                depth = sap.queue_depth
+                if depth > sap.max_queue_depth:
+                    sap.max_queue_depth = depth
+            saps.sort(key=lambda sap: sap.mode == RAW_ACCESS_POINT,
+                      reverse=True)
+        try:
+            return self._collect_from(saps, sendack)
+        finally:
+            for sap in saps:
+                if not sap.send_pending:
+                    with self.ready_lock:
+                        if sap.scheduled:
+                            sap.scheduled = False
+                            self.ready.remove(sap)
+                    # a socket may have queued a PDU in between
+                    if sap.send_pending:
+                        self.schedule(sap)
+
+    def _rotate(self, sap):
+        with self.ready_lock:
+            if sap.scheduled and self.ready[-1] is not sap:
+                self.ready.remove(sap)
+                self.ready.append(sap)
+
+    def _collect_from(self, saps, sendack):
         def encrypt(send_pdu):
             pdu_type = type(send_pdu)
             a = send_pdu.encode_header()
             c = self.sec.encrypt(a, send_pdu.data)
             return pdu_type(*pdu_type.decode_header(a), data=c)
 
-        def is_sap(sap):
-            return sap is not None
-
-        def is_raw(sap):
-            return sap and sap.mode == RAW_ACCESS_POINT
-
-        def is_ldl(sap):
-            return sap and sap.mode == LOGICAL_DATA_LINK
-
         def is_dlc(sap):
             return sap and sap.mode == DATA_LINK_CONNECTION
 
@@ -588,7 +787,7 @@ class LogicalLinkController(object):
         send_pdu = None
 
         with self.lock:
-            # Dequeue from the list of active SAP until a first PDU is
+            # Dequeue from the list of ready SAP until a first PDU is
             # returned. The list is sorted to first iterate the raw
             # SAPs (raw SAPs do not respect the miu_size value and we
             # must avoid them to return PDUs in aggregation). The PDU
@@ -597,9 +796,10 @@ class LogicalLinkController(object):
             # sap.dequeue method is called with icv_size=0 because for
             # encrypted but not aggregated UI and I PDUs the receiver
             # must accept them with complete MIU plus ICV size.
-            for sap in sorted(filter(is_sap, self.sap), key=is_raw, reverse=1):
+            for sap in saps:
                 send_pdu = sap.dequeue(miu_size, icv_size=0)
                 if send_pdu:
+                    self._rotate(sap)
                     if self.sec and send_pdu.name in ("UI", "I"):
                         send_pdu = encrypt(send_pdu)
                     if len(send_pdu) - send_pdu.header_size >= miu_size:
@@ -609,8 +809,8 @@ class LogicalLinkController(object):
             # Data Link Connection endpoints do not dequeue RR/RNR PDUs until
             # the receive window is exhausted. If there is not yet a PDU to
             # send, this loop allows voluntary acknowledgement.
-            if send_pdu is None:
-                for sap in filter(is_dlc, self.sap):
+            if send_pdu is None and sendack:
+                for sap in filter(is_dlc, saps):
                     send_pdu = sap.sendack()
                     if send_pdu:
                         break
@@ -628,7 +828,7 @@ class LogicalLinkController(object):
                 # The first loop will dequeue PDUs until the reamining miu_size
                 # is exhausted or all active SAP did not return a PDU.
                 deq_none = True
-                for sap in filter(is_sap, self.sap):
+                for sap in saps:
                     send_pdu = sap.dequeue(miu_size, icv_size)
                     if send_pdu:
                         deq_none = False
@@ -643,7 +843,7 @@ class LogicalLinkController(object):
             # If the miu_size is not yet exhausted we query all data link
             # connection endpoints once for voluntary acknowledgements.
             if miu_size >= 0:
-                for sap in filter(is_dlc, self.sap):
+                for sap in filter(is_dlc, saps):
                     send_pdu = sap.sendack()
                     if send_pdu:
                         agf_pdu.append(send_pdu)
@@ -672,6 +872,7 @@ class LogicalLinkController(object):
                 dm_reason = 0x10 if rcvd_pdu.sn is None else 0x02
                 dm_pdu = pdu.DisconnectedMode(rcvd_pdu.ssap, 1, dm_reason)
                 self.sap[1].dmpdu.append(dm_pdu)
+                self.schedule(self.sap[1])
                 log.debug("could not find service %r", rcvd_pdu.sn)
                 return
             # service found, rewrite CONNECT PDU to its DSAP
@@ -688,6 +889,7 @@ class LogicalLinkController(object):
             sap = self.sap[rcvd_pdu.dsap]
             if sap:
                 sap.enqueue(rcvd_pdu)
+                self.schedule(sap)
             else:
                 log.debug("can't dispatch PDU %s", rcvd_pdu)
 
@@ -851,6 +1053,15 @@ class LogicalLinkController(object):
         if isinstance(socket, tco.DataLinkConnection):
             return socket.send(message, flags)
 
+    def sendall(self, socket, message):
+        if not isinstance(socket, tco.TransmissionControlObject):
+            raise err.Error(errno.ENOTSOCK)
+        if not isinstance(socket, tco.DataLinkConnection):
+            raise err.Error(errno.EOPNOTSUPP)
+        if not isinstance(message, bytes):
+            raise TypeError("sendall() argument *message* must be a string")
+        return socket.sendall(message)
+
     def recv(self, socket):
         message, sender = self.recvfrom(socket)
         return message
@@ -26,5 +26,6 @@ SO_SNDBUF = 3
 SO_RCVBUF = 4
 SO_SNDBSY = 5
 SO_RCVBSY = 6
+SO_SNDRATE = 7
 
 MSG_DONTWAIT = 0b00000001
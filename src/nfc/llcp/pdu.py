@@ -25,6 +25,15 @@ from binascii import hexlify
 import logging
 log = logging.getLogger(__name__)
 
+# Precompiled structures for the fields that are packed and unpacked
+# for every frame, including the SYMM PDUs of an idle link.
+_uint8 = struct.Struct('!B')
+_uint16 = struct.Struct('!H')
+_uint8x2 = struct.Struct('!BB')
+_uint8x3 = struct.Struct('!BBB')
+_uint8x4 = struct.Struct('!BBBB')
+_tlv_uint16 = struct.Struct('!BBH')
+
 
 class Error(Exception):
     pass
@@ -41,38 +50,45 @@ class EncodeError(Error):
 class Parameter:
     VERSION, MIUX, WKS, LTO, RW, SN, OPT, SDREQ, SDRES, ECPK, RN = range(1, 12)
 
+    # Allowed value length range for the parameters with restricted size.
+    length = {VERSION: (1, 1), MIUX: (2, 2), WKS: (2, 2), LTO: (1, 1),
+              RW: (1, 1), OPT: (1, 1), SDREQ: (1, 255), SDRES: (2, 2)}
+
     @staticmethod
     def decode(data, offset):
         try:
-            T, L = struct.unpack_from('BB', data, offset)
-            V = struct.unpack_from('%ds' % L, data, offset+2)[0]
+            T, L = _uint8x2.unpack_from(data, offset)
         except struct.error as error:
             msg = " while decoding TLV %r" % hexlify(data[offset:])
             raise DecodeError(str(error) + msg)
+        V = bytes(data[offset+2:offset+2+L])
+        if len(V) != L:
+            msg = "TLV length exceeds data while decoding TLV %r"
+            raise DecodeError(msg % hexlify(data[offset:]))
 
         if T == Parameter.VERSION:
             if L != 1:
                 raise DecodeError("VERSION TLV length error")
-            V = struct.unpack('B', V)[0]
+            V = _uint8.unpack(V)[0]
         elif T == Parameter.MIUX:
             if L != 2:
                 raise DecodeError("MIUX TLV length error")
-            V = struct.unpack('>H', V)[0]
+            V = _uint16.unpack(V)[0]
             if V & 0xF800:
                 log.warn("MIUX TLV reserved bits set")
                 V = V & 0x07FF
         elif T == Parameter.WKS:
             if L != 2:
                 raise DecodeError("WKS TLV length error")
-            V = struct.unpack('>H', V)[0]
+            V = _uint16.unpack(V)[0]
         elif T == Parameter.LTO:
             if L != 1:
                 raise DecodeError("LTO TLV length error")
-            V = struct.unpack('B', V)[0]
+            V = _uint8.unpack(V)[0]
         elif T == Parameter.RW:
             if L != 1:
                 raise DecodeError("RW TLV length error")
-            V = struct.unpack('B', V)[0]
+            V = _uint8.unpack(V)[0]
             if V & 0xF0:
                 log.warn("RW TLV reserved bits set")
                 V = V & 0x0F
@@ -81,7 +97,7 @@ class Parameter:
         elif T == Parameter.OPT:
             if L != 1:
                 raise DecodeError("OPT TLV length error")
-            V = struct.unpack_from('B', V)[0]
+            V = _uint8.unpack(V)[0]
             if V & 0xF8:
                 log.warn("OPT TLV reserved bits set")
                 V = V & 0x07
@@ -90,11 +106,11 @@ class Parameter:
                 raise DecodeError("SDREQ TLV length error")
             if L == 1:
                 log.warn("SDREQ TLV with zero-length service name")
-            V = struct.unpack('B%ds' % (L-1), V)
+            V = (_uint8.unpack_from(V)[0], V[1:])
         elif T == Parameter.SDRES:
             if L != 2:
                 raise DecodeError("SDRES TLV length error")
-            V = struct.unpack('BB', V)
+            V = _uint8x2.unpack(V)
         elif T == Parameter.ECPK:
             if L == 0:
                 log.warn("ECPK TLV with zero-length value")
@@ -106,26 +122,43 @@ class Parameter:
 
         return (T, L, V)
 
+    @staticmethod
+    def check(data, offset, size):
+        # Verify the TLV structure and value lengths of the parameter
+        # bytes without decoding the values. Returns the parameter
+        # bytes for a later Parameter.decode() that can not fail.
+        start, end = offset, offset + size
+        while end - offset >= 2:
+            T, L = _uint8x2.unpack_from(data, offset)
+            if offset + 2 + L > end:
+                msg = "TLV length exceeds pdu size while decoding TLV %r"
+                raise DecodeError(msg % hexlify(data[offset:end]))
+            lmin, lmax = Parameter.length.get(T, (0, 255))
+            if not lmin <= L <= lmax:
+                Parameter.decode(data, offset)
+            offset = offset + 2 + L
+        return bytes(data[start:end])
+
     @staticmethod
     def encode(T, V):
         try:
             if T in (Parameter.VERSION, Parameter.LTO,
                      Parameter.RW, Parameter.OPT):
-                return struct.pack('BBB', T, 1, V)
+                return _uint8x3.pack(T, 1, V)
             if T in (Parameter.MIUX, Parameter.WKS):
-                return struct.pack('>BBH', T, 2, V)
+                return _tlv_uint16.pack(T, 2, V)
             if T in (Parameter.SN, Parameter.ECPK, Parameter.RN):
                 if len(V) > 255:
                     raise EncodeError("can't encode TLV T=%d, V=%r" % (T, V))
-                return struct.pack('BB', T, len(V)) + bytes(V)
+                return _uint8x2.pack(T, len(V)) + bytes(V)
             if T == Parameter.SDREQ:
                 tid, sn = V[0], V[1]
                 if len(sn) > 254:
                     raise EncodeError("can't encode TLV T=%d, V=%r" % (T, V))
-                return struct.pack('>BBB', T, 1+len(sn), tid) + bytes(sn)
+                return _uint8x3.pack(T, 1+len(sn), tid) + bytes(sn)
             if T == Parameter.SDRES:
                 tid, sap = V[0], V[1]
-                return struct.pack('>BBBB', T, 2, tid, sap)
+                return _uint8x4.pack(T, 2, tid, sap)
             raise EncodeError("unknown TLV T=%d, V=%r" % (T, V))
         except struct.error as error:
             msg = " for TLV T=%d, V=%r" % (T, V)
@@ -136,6 +169,7 @@ class Parameter:
 #                                                   ProtocolDataUnit Base Class
 # -----------------------------------------------------------------------------
 class ProtocolDataUnit(object):
+    __slots__ = ('ptype', 'dsap', 'ssap')
     header_size = 2
 
     def __init__(self, ptype, dsap, ssap):
@@ -149,7 +183,7 @@ class ProtocolDataUnit(object):
             size = len(data)
         if size < 2:
             raise DecodeError("insufficient pdu header bytes")
-        (dsap, ssap) = struct.unpack_from('!BB', data, offset)
+        (dsap, ssap) = _uint8x2.unpack_from(data, offset)
         return (dsap >> 2, ssap & 63)
 
     def encode_header(self):
@@ -159,7 +193,7 @@ class ProtocolDataUnit(object):
             raise EncodeError("pdu dsap and ssap field can not be < 0")
         if self.dsap > 63 or self.ssap > 63:
             raise EncodeError("pdu dsap and ssap field can not be > 63")
-        return struct.pack('!H', self.dsap << 10 | self.ptype << 6 | self.ssap)
+        return _uint16.pack(self.dsap << 10 | self.ptype << 6 | self.ssap)
 
     def __eq__(self, other):
         return self.encode() == other.encode()
@@ -173,6 +207,7 @@ class ProtocolDataUnit(object):
 #                                           NumberedProtocolDataUnit Base Class
 # -----------------------------------------------------------------------------
 class NumberedProtocolDataUnit(ProtocolDataUnit):
+    __slots__ = ('ns', 'nr')
     header_size = 3
 
     def __init__(self, ptype, dsap, ssap, ns, nr):
@@ -185,7 +220,7 @@ class NumberedProtocolDataUnit(ProtocolDataUnit):
             size = len(data)
         if size < 3:
             raise DecodeError("numbered pdu header length error")
-        (dsap, ssap, sequence) = struct.unpack_from('!BBB', data, offset)
+        (dsap, ssap, sequence) = _uint8x3.unpack_from(data, offset)
         return (dsap >> 2, ssap & 63, sequence >> 4, sequence & 15)
 
     def encode_header(self):
@@ -196,7 +231,7 @@ class NumberedProtocolDataUnit(ProtocolDataUnit):
             raise EncodeError("pdu ns and nr field can not be < 0")
         if self.ns > 15 or self.nr > 15:
             raise EncodeError("pdu ns and nr field can not be > 15")
-        return data + struct.pack('!B', self.ns << 4 | self.nr)
+        return data + _uint8.pack(self.ns << 4 | self.nr)
 
     def __len__(self):
         return 3
@@ -206,10 +241,59 @@ class NumberedProtocolDataUnit(ProtocolDataUnit):
         return super(NumberedProtocolDataUnit, self).__str__()+f.format(p=self)
 
 
+# -----------------------------------------------------------------------------
+#                                      ParameterizedProtocolDataUnit Base Class
+# -----------------------------------------------------------------------------
+class ParameterizedProtocolDataUnit(ProtocolDataUnit):
+    # A PDU with TLV parameters. The decode_parameters() method only
+    # checks the TLVs, the attributes listed in `parameters` are left
+    # unset and the TLVs decoded when one of them is first accessed.
+    __slots__ = ('_tlv',)
+    parameters = ()
+
+    def __init__(self, ptype, dsap, ssap):
+        super(ParameterizedProtocolDataUnit, self).__init__(ptype, dsap, ssap)
+        self._tlv = None
+
+    @classmethod
+    def decode_parameters(cls, data, offset, size):
+        if size < 2:
+            raise DecodeError("insufficient pdu header bytes")
+        (header,) = _uint16.unpack_from(data, offset)
+        pdu = cls.__new__(cls)
+        pdu.dsap, pdu.ssap = header >> 10, header & 63
+        pdu.ptype = header >> 6 & 15
+        pdu._tlv = Parameter.check(data, offset + 2, size - 2)
+        return pdu
+
+    def __getattr__(self, name):
+        # Only called for unset attributes, which is how a parameter of
+        # a decoded PDU is found to be read the first time.
+        if name not in self.parameters or self._tlv is None:
+            raise AttributeError("{0!r} object has no attribute {1!r}"
+                                 .format(type(self).__name__, name))
+        preset = dict()
+        for attr in self.parameters:
+            try:
+                preset[attr] = getattr(type(self), attr).__get__(self)
+            except AttributeError:
+                pass
+        tlv, offset = self._tlv, 0
+        type(self).__init__(self, self.dsap, self.ssap)
+        while len(tlv) - offset >= 2:
+            T, L, V = Parameter.decode(tlv, offset)
+            self.decode_parameter(T, L, V)
+            offset = offset + 2 + L
+        for attr, value in preset.items():
+            setattr(self, attr, value)
+        return getattr(self, name)
+
+
 # -----------------------------------------------------------------------------
 #                                                                  Symmetry PDU
 # -----------------------------------------------------------------------------
 class Symmetry(ProtocolDataUnit):
+    __slots__ = ()
     name = "SYMM"
 
     def __init__(self, dsap=0, ssap=0):
@@ -239,7 +323,9 @@ class Symmetry(ProtocolDataUnit):
 # -----------------------------------------------------------------------------
 #                                                        Parameter Exchange PDU
 # -----------------------------------------------------------------------------
-class ParameterExchange(ProtocolDataUnit):
+class ParameterExchange(ParameterizedProtocolDataUnit):
+    __slots__ = ('_version', '_miux', '_wks', '_lto', '_opt')
+    parameters = __slots__
     name = "PAX"
 
     def __init__(self, dsap=0, ssap=0, version=None, miux=None,
@@ -256,24 +342,21 @@ class ParameterExchange(ProtocolDataUnit):
         dsap, ssap = cls.decode_header(data, offset, size)
         if dsap != 0 or ssap != 0:
             raise DecodeError("SSAP and DSAP must be 0 in PAX PDU")
-        pax_pdu = ParameterExchange(dsap, ssap)
-        offset, size = offset + 2, size - 2
-        while size >= 2:
-            T, L, V = Parameter.decode(data, offset)
-            if T == Parameter.VERSION:
-                pax_pdu._version = V
-            elif T == Parameter.MIUX:
-                pax_pdu._miux = V
-            elif T == Parameter.WKS:
-                pax_pdu._wks = V
-            elif T == Parameter.LTO:
-                pax_pdu._lto = V
-            elif T == Parameter.OPT:
-                pax_pdu._opt = V
-            else:
-                log.warn("invalid TLV %r in PAX PDU", (T, L, V))
-            offset, size = offset + 2 + L, size - 2 - L
-        return pax_pdu
+        return cls.decode_parameters(data, offset, size)
+
+    def decode_parameter(self, T, L, V):
+        if T == Parameter.VERSION:
+            self._version = V
+        elif T == Parameter.MIUX:
+            self._miux = V
+        elif T == Parameter.WKS:
+            self._wks = V
+        elif T == Parameter.LTO:
+            self._lto = V
+        elif T == Parameter.OPT:
+            self._opt = V
+        else:
+            log.warn("invalid TLV %r in PAX PDU", (T, L, V))
 
     def encode(self):
         if self.dsap != 0 or self.ssap != 0:
@@ -389,6 +472,7 @@ class ParameterExchange(ProtocolDataUnit):
 #                                                          Aggregated Frame PDU
 # -----------------------------------------------------------------------------
 class AggregatedFrame(ProtocolDataUnit):
+    __slots__ = ('_aggregate',)
     name = "AGF"
 
     def __init__(self, dsap=0, ssap=0, aggregate=[]):
@@ -404,7 +488,7 @@ class AggregatedFrame(ProtocolDataUnit):
         offset, size = offset + 2, size - 2
         while size > 0:
             try:
-                (pdu_size,) = struct.unpack_from('!H', data, offset)
+                (pdu_size,) = _uint16.unpack_from(data, offset)
             except struct.error:
                 raise DecodeError("aggregated PDU length field error in AGF")
             agf_pdu.append(decode(data, offset+2, pdu_size))
@@ -416,7 +500,7 @@ class AggregatedFrame(ProtocolDataUnit):
             raise EncodeError("SSAP and DSAP must be 0 in AGF PDU")
         data = self.encode_header()
         for encoded_pdu in [pdu.encode() for pdu in self._aggregate]:
-            data += struct.pack('!H', len(encoded_pdu)) + encoded_pdu
+            data += _uint16.pack(len(encoded_pdu)) + encoded_pdu
         return data
 
     def append(self, pdu):
@@ -446,6 +530,8 @@ class AggregatedFrame(ProtocolDataUnit):
 
 
 class AggregatedFrameIterator(object):
+    __slots__ = ('_aggregate', '_current')
+
     def __init__(self, aggregate):
         self._aggregate = aggregate
         self._current = 0
@@ -461,6 +547,7 @@ class AggregatedFrameIterator(object):
 #                                                    Unnumbered Information PDU
 # -----------------------------------------------------------------------------
 class UnnumberedInformation(ProtocolDataUnit):
+    __slots__ = ('data',)
     name = "UI"
 
     def __init__(self, dsap, ssap, data=None):
@@ -487,7 +574,9 @@ class UnnumberedInformation(ProtocolDataUnit):
 # -----------------------------------------------------------------------------
 #                                                                   Connect PDU
 # -----------------------------------------------------------------------------
-class Connect(ProtocolDataUnit):
+class Connect(ParameterizedProtocolDataUnit):
+    __slots__ = ('miu', 'rw', 'sn')
+    parameters = __slots__
     name = "CONNECT"
 
     def __init__(self, dsap, ssap, miu=128, rw=1, sn=None):
@@ -498,21 +587,17 @@ class Connect(ProtocolDataUnit):
 
     @classmethod
     def decode(cls, data, offset, size):
-        dsap, ssap = cls.decode_header(data, offset, size)
-        connect_pdu = Connect(dsap, ssap)
-        offset, size = offset + 2, size - 2
-        while size >= 2:
-            T, L, V = Parameter.decode(data, offset)
-            if T == Parameter.MIUX:
-                connect_pdu.miu = 128 + V
-            elif T == Parameter.RW:
-                connect_pdu.rw = V
-            elif T == Parameter.SN:
-                connect_pdu.sn = str(V)
-            else:
-                log.warn("invalid TLV %r in CONNECT PDU", (T, L, V))
-            offset, size = offset + 2 + L, size - 2 - L
-        return connect_pdu
+        return cls.decode_parameters(data, offset, size)
+
+    def decode_parameter(self, T, L, V):
+        if T == Parameter.MIUX:
+            self.miu = 128 + V
+        elif T == Parameter.RW:
+            self.rw = V
+        elif T == Parameter.SN:
+            self.sn = str(V)
+        else:
+            log.warn("invalid TLV %r in CONNECT PDU", (T, L, V))
 
     def encode(self):
         data = self.encode_header()
@@ -539,6 +624,7 @@ class Connect(ProtocolDataUnit):
 #                                                                Disconnect PDU
 # -----------------------------------------------------------------------------
 class Disconnect(ProtocolDataUnit):
+    __slots__ = ()
     name = "DISC"
 
     def __init__(self, dsap, ssap):
@@ -562,7 +648,9 @@ class Disconnect(ProtocolDataUnit):
 # -----------------------------------------------------------------------------
 #                                                       Connection Complete PDU
 # -----------------------------------------------------------------------------
-class ConnectionComplete(ProtocolDataUnit):
+class ConnectionComplete(ParameterizedProtocolDataUnit):
+    __slots__ = ('miu', 'rw')
+    parameters = __slots__
     name = "CC"
 
     def __init__(self, dsap, ssap, miu=128, rw=1):
@@ -572,19 +660,15 @@ class ConnectionComplete(ProtocolDataUnit):
 
     @classmethod
     def decode(cls, data, offset, size):
-        dsap, ssap = cls.decode_header(data, offset, size)
-        cc_pdu = ConnectionComplete(dsap, ssap)
-        offset, size = offset + 2, size - 2
-        while size >= 2:
-            T, L, V = Parameter.decode(data, offset)
-            if T == Parameter.MIUX:
-                cc_pdu.miu = 128 + V
-            elif T == Parameter.RW:
-                cc_pdu.rw = V
-            else:
-                log.warn("invalid TLV %r in CC PDU", (T, L, V))
-            offset, size = offset + 2 + L, size - 2 - L
-        return cc_pdu
+        return cls.decode_parameters(data, offset, size)
+
+    def decode_parameter(self, T, L, V):
+        if T == Parameter.MIUX:
+            self.miu = 128 + V
+        elif T == Parameter.RW:
+            self.rw = V
+        else:
+            log.warn("invalid TLV %r in CC PDU", (T, L, V))
 
     def encode(self):
         data = self.encode_header()
@@ -608,6 +692,7 @@ class ConnectionComplete(ProtocolDataUnit):
 #                                                         Disconnected Mode PDU
 # -----------------------------------------------------------------------------
 class DisconnectedMode(ProtocolDataUnit):
+    __slots__ = ('reason',)
     name = "DM"
 
     def __init__(self, dsap, ssap, reason=0):
@@ -619,11 +704,11 @@ class DisconnectedMode(ProtocolDataUnit):
         if size != 3:
             raise DecodeError("DM PDU length error")
         dsap, ssap = cls.decode_header(data, offset, size)
-        (reason,) = struct.unpack_from('!B', data, offset+2)
+        (reason,) = _uint8.unpack_from(data, offset+2)
         return DisconnectedMode(dsap, ssap, reason)
 
     def encode(self):
-        return self.encode_header() + struct.pack('!B', self.reason)
+        return self.encode_header() + _uint8.pack(self.reason)
 
     def __len__(self):
         return 3
@@ -650,6 +735,8 @@ class DisconnectedMode(ProtocolDataUnit):
 #                                                              Frame Reject PDU
 # -----------------------------------------------------------------------------
 class FrameReject(ProtocolDataUnit):
+    __slots__ = ('rej_flags', 'rej_ptype', 'ns', 'nr',
+                 'vs', 'vr', 'vsa', 'vra')
     name = "FRMR"
 
     def __init__(self, dsap, ssap, flags=0, ptype=0,
@@ -669,7 +756,7 @@ class FrameReject(ProtocolDataUnit):
         if size != 6:
             raise DecodeError("FRMR PDU length error")
         dsap, ssap = cls.decode_header(data, offset, size)
-        (b0, b1, b2, b3) = struct.unpack_from('!BBBB', data, offset+2)
+        (b0, b1, b2, b3) = _uint8x4.unpack_from(data, offset+2)
         flags, ptype = b0 >> 4, b0 & 15
         ns, nr = b1 >> 4, b1 & 15
         vs, vr = b2 >> 4, b2 & 15
@@ -690,8 +777,8 @@ class FrameReject(ProtocolDataUnit):
         return frmr
 
     def encode(self):
-        return self.encode_header() + struct.pack(
-            '!BBBB', self.rej_flags << 4 | self.rej_ptype,
+        return self.encode_header() + _uint8x4.pack(
+            self.rej_flags << 4 | self.rej_ptype,
             self.ns << 4 | self.nr, self.vs << 4 | self.vr,
             self.vsa << 4 | self.vra)
 
@@ -710,7 +797,9 @@ class FrameReject(ProtocolDataUnit):
 # -----------------------------------------------------------------------------
 #                                                       Service Name Lookup PDU
 # -----------------------------------------------------------------------------
-class ServiceNameLookup(ProtocolDataUnit):
+class ServiceNameLookup(ParameterizedProtocolDataUnit):
+    __slots__ = ('sdreq', 'sdres')
+    parameters = __slots__
     name = "SNL"
 
     def __init__(self, dsap, ssap, sdreq=None, sdres=None):
@@ -723,18 +812,15 @@ class ServiceNameLookup(ProtocolDataUnit):
         dsap, ssap = cls.decode_header(data, offset, size)
         if dsap != 1 or ssap != 1:
             raise DecodeError("SSAP and DSAP must be 1 in SNL PDU")
-        snl_pdu = ServiceNameLookup(dsap, ssap)
-        offset, size = offset + 2, size - 2
-        while size >= 2:
-            T, L, V = Parameter.decode(data, offset)
-            if T == Parameter.SDREQ:
-                snl_pdu.sdreq.append(V)
-            elif T == Parameter.SDRES:
-                snl_pdu.sdres.append(V)
-            else:
-                log.warn("invalid TLV %r in SNL PDU", (T, L, V))
-            offset, size = offset + 2 + L, size - 2 - L
-        return snl_pdu
+        return cls.decode_parameters(data, offset, size)
+
+    def decode_parameter(self, T, L, V):
+        if T == Parameter.SDREQ:
+            self.sdreq.append(V)
+        elif T == Parameter.SDRES:
+            self.sdres.append(V)
+        else:
+            log.warn("invalid TLV %r in SNL PDU", (T, L, V))
 
     def encode(self):
         data = self.encode_header()
@@ -756,7 +842,9 @@ class ServiceNameLookup(ProtocolDataUnit):
 # -----------------------------------------------------------------------------
 #                                                     Data Protection Setup PDU
 # -----------------------------------------------------------------------------
-class DataProtectionSetup(ProtocolDataUnit):
+class DataProtectionSetup(ParameterizedProtocolDataUnit):
+    __slots__ = ('ecpk', 'rn')
+    parameters = __slots__
     name = "DPS"
 
     def __init__(self, dsap, ssap, ecpk=None, rn=None):
@@ -769,18 +857,15 @@ class DataProtectionSetup(ProtocolDataUnit):
         dsap, ssap = cls.decode_header(data, offset, size)
         if dsap != 0 or ssap != 0:
             raise DecodeError("SSAP and DSAP must be 0 in DPS PDU")
-        dps_pdu = DataProtectionSetup(dsap, ssap)
-        offset, size = offset + 2, size - 2
-        while size >= 2:
-            T, L, V = Parameter.decode(data, offset)
-            if T == Parameter.ECPK:
-                dps_pdu.ecpk = V
-            elif T == Parameter.RN:
-                dps_pdu.rn = V
-            else:
-                log.debug("unknown TLV %r in DPS PDU", (T, L, V))
-            offset, size = offset + 2 + L, size - 2 - L
-        return dps_pdu
+        return cls.decode_parameters(data, offset, size)
+
+    def decode_parameter(self, T, L, V):
+        if T == Parameter.ECPK:
+            self.ecpk = V
+        elif T == Parameter.RN:
+            self.rn = V
+        else:
+            log.debug("unknown TLV %r in DPS PDU", (T, L, V))
 
     def encode(self):
         if self.dsap != 0 or self.ssap != 0:
@@ -808,6 +893,7 @@ class DataProtectionSetup(ProtocolDataUnit):
 #                                                               Information PDU
 # -----------------------------------------------------------------------------
 class Information(NumberedProtocolDataUnit):
+    __slots__ = ('data',)
     name = "I"
 
     def __init__(self, dsap, ssap, ns=None, nr=None, data=None):
@@ -835,6 +921,7 @@ class Information(NumberedProtocolDataUnit):
 #                                                             Receive Ready PDU
 # -----------------------------------------------------------------------------
 class ReceiveReady(NumberedProtocolDataUnit):
+    __slots__ = ()
     name = "RR"
 
     def __init__(self, dsap, ssap, nr=None):
@@ -855,6 +942,7 @@ class ReceiveReady(NumberedProtocolDataUnit):
 #                                                         Receive Not Ready PDU
 # -----------------------------------------------------------------------------
 class ReceiveNotReady(NumberedProtocolDataUnit):
+    __slots__ = ()
     name = "RNR"
 
     def __init__(self, dsap, ssap, nr):
@@ -875,6 +963,8 @@ class ReceiveNotReady(NumberedProtocolDataUnit):
 #                                                       UnknownProtocolDataUnit
 # -----------------------------------------------------------------------------
 class UnknownProtocolDataUnit(ProtocolDataUnit):
+    __slots__ = ('name', 'payload')
+
     def __init__(self, ptype, dsap, ssap, payload):
         super(UnknownProtocolDataUnit, self).__init__(ptype, dsap, ssap)
         self.name = "{0:04b}".format(ptype)
@@ -918,6 +1008,10 @@ pdu_type_map = {
     0b1110: ReceiveNotReady,
 }
 
+# The decode methods indexed by the 4-bit PDU type field.
+_decoders = tuple(pdu_type_map.get(ptype, UnknownProtocolDataUnit).decode
+                  for ptype in range(16))
+
 
 def decode(data, offset=0, size=None):
     size = len(data) if size is None else size
@@ -927,9 +1021,8 @@ def decode(data, offset=0, size=None):
     if size < 2:
         raise DecodeError("less than two header bytes can't make a valid pdu")
 
-    ptype = (struct.unpack_from('>H', data, offset)[0] >> 6) & 0b1111
-    pdu_type = pdu_type_map.get(ptype, UnknownProtocolDataUnit)
-    return pdu_type.decode(data, offset, size)
+    ptype = (_uint16.unpack_from(data, offset)[0] >> 6) & 0b1111
+    return _decoders[ptype](data, offset, size)
 
 
 def encode(pdu):
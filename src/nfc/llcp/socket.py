@@ -117,6 +117,20 @@ class Socket(object):
         """
         return self.llc.send(self._tco, data, flags)
 
+    def sendall(self, data):
+        """Send all data on a connected data link connection socket.
+        The data is split into information PDUs of at most the
+        connection's send MIU size and as many of them are queued as
+        the remote receive window allows, so that a large buffer is
+        transferred at the rate that the link and the remote side
+        permit. The method returns when all data is sent or the
+        connection was closed, the return value is then false. The
+        achieved transfer rate in octets per second is available as
+        socket option :const:`nfc.llcp.SO_SNDRATE`.
+
+        """
+        return self.llc.sendall(self._tco, data)
+
     def sendto(self, data, addr, flags=0):
         """Send data to the socket. The socket should not be connected
         to a remote socket, since the destination socket is specified
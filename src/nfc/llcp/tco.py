@@ -23,6 +23,7 @@ from . import pdu
 from . import err
 from . import opt
 
+import time
 import errno
 import threading
 import collections
@@ -74,6 +75,7 @@ class TransmissionControlObject(object):
         self.send_buf = 1
         self.addr = None
         self.peer = None
+        self.send_notify = None
 
     @property
     def is_bound(self):
@@ -103,6 +105,17 @@ class TransmissionControlObject(object):
             log.warn("socket rebound from {0} to {1}".format(self.addr, addr))
         self.addr = addr
 
+    @property
+    def send_pending(self):
+        return len(self.send_queue) > 0
+
+    def wakeup(self):
+        # Tell the llc that this socket may have an outbound PDU. The
+        # send_notify function is set when the socket is inserted into
+        # a SAP and schedules the SAP for the llc run loop.
+        if self.send_notify is not None:
+            self.send_notify()
+
     def poll(self, event, timeout):
         if event == "recv":
             with self.recv_ready:
@@ -120,6 +133,7 @@ class TransmissionControlObject(object):
     def send(self, send_pdu, flags):
         with self.send_ready:
             self.send_queue.append(send_pdu)
+            self.wakeup()
             if not (flags & opt.MSG_DONTWAIT):
                 self.send_ready.wait()
 
@@ -360,6 +374,7 @@ class DataLinkConnection(TransmissionControlObject):
         self.recv_ack = 0         # V(RA)
         self.send_win = None      # RW(Remote)
         self.send_cnt = 0         # V(S)
+        self.send_rate = 0.0      # sendall() goodput
         self.send_ack = 0         # V(SA)
 
     def __str__(self):
@@ -386,6 +401,7 @@ class DataLinkConnection(TransmissionControlObject):
                 return
             if option == opt.SO_RCVBSY:
                 self.mode.RECV_BUSY = bool(value)
+                self.wakeup()
                 return
             super(DataLinkConnection, self).setsockopt(option, value)
 
@@ -396,6 +412,8 @@ class DataLinkConnection(TransmissionControlObject):
             return self.mode.SEND_BUSY
         if option == opt.SO_RCVBSY:
             return self.mode.RECV_BUSY
+        if option == opt.SO_SNDRATE:
+            return self.send_rate
         return super(DataLinkConnection, self).getsockopt(option)
 
     def listen(self, backlog):
@@ -432,6 +450,7 @@ class DataLinkConnection(TransmissionControlObject):
                 log.debug("accepting CONNECT from SAP %d" % dlc.peer)
                 dlc.state.ESTABLISHED = True
                 self.send_queue.append(send_pdu)
+                self.wakeup()
                 return dlc
             raise RuntimeError("only CONNECT expected, not " + rcvd_pdu.name)
 
@@ -455,6 +474,7 @@ class DataLinkConnection(TransmissionControlObject):
 
             self.state.CONNECT = True
             self.send_queue.append(send_pdu)
+            self.wakeup()
 
             try:
                 rcvd_pdu = super(DataLinkConnection, self).recv()
@@ -508,6 +528,40 @@ class DataLinkConnection(TransmissionControlObject):
                 super(DataLinkConnection, self).send(send_pdu, flags)
             return self.state.ESTABLISHED is True
 
+    def sendall(self, message):
+        # Send the message as a sequence of I PDUs with at most
+        # send_miu octets. Other than send() this queues as many I
+        # PDUs as the remote receive window allows and returns after
+        # the last one was dequeued by the llc.
+        with self.send_token:
+            if not self.state.ESTABLISHED:
+                self.err("sendall() in socket state {0}".format(self.state))
+                if self.state.CLOSE_WAIT:
+                    raise err.Error(errno.EPIPE)
+                raise err.Error(errno.ENOTCONN)
+            started = time.time()
+            offset = 0
+            while offset < len(message) and self.state.ESTABLISHED:
+                if self.send_window_slots == 0:
+                    self.send_token.wait()
+                    continue
+                while self.send_window_slots > 0 and offset < len(message):
+                    data = message[offset:offset+self.send_miu]
+                    send_pdu = pdu.Information(self.peer, self.addr, data=data)
+                    send_pdu.ns = self.send_cnt
+                    self.send_cnt = (self.send_cnt + 1) % 16
+                    self.send_queue.append(send_pdu)
+                    offset += len(data)
+                self.wakeup()
+            while len(self.send_queue) > 0 and self.state.ESTABLISHED:
+                self.send_ready.wait()
+            elapsed = time.time() - started
+            if self.state.ESTABLISHED and elapsed > 0:
+                self.send_rate = len(message) / elapsed
+            self.log("sendall {0} byte in {1:.3f} sec ({2:.0f} byte/s)"
+                     .format(len(message), elapsed, self.send_rate))
+            return self.state.ESTABLISHED is True
+
     def recv(self):
         with self.lock:
             if not (self.state.ESTABLISHED or self.state.CLOSE_WAIT):
@@ -520,6 +574,7 @@ class DataLinkConnection(TransmissionControlObject):
 
             if rcvd_pdu.name == "I":
                 self.recv_confs += 1
+                self.wakeup()
                 if self.recv_confs > self.recv_win:
                     self.err("recv_confs({0}) > recv_win({1})"
                              .format(self.recv_confs, self.recv_win))
@@ -568,6 +623,7 @@ class DataLinkConnection(TransmissionControlObject):
                 self.acks_ready.notify_all()
                 send_pdu = pdu.Disconnect(self.peer, self.addr)
                 self.send_queue.append(send_pdu)
+                self.wakeup()
                 try:
                     super(DataLinkConnection, self).recv()
                 except IndexError:
@@ -704,6 +760,18 @@ class DataLinkConnection(TransmissionControlObject):
 
             return send_pdu
 
+    @property
+    def send_pending(self):
+        # Besides queued PDUs there may be an acknowledgement to send.
+        with self.lock:
+            if len(self.send_queue) > 0:
+                return True
+            if self.state.ESTABLISHED:
+                if self.mode.RECV_BUSY_SENT != self.mode.RECV_BUSY:
+                    return True
+                return bool(self.recv_confs and self.recv_cnt != self.recv_ack)
+            return False
+
     def sendack(self):
         if self.state.ESTABLISHED:
             with self.lock:
@@ -19,9 +19,14 @@
 # See the Licence for the specific language governing
 # permissions and limitations under the Licence.
 # -----------------------------------------------------------------------------
+import io
+import copy
+import time
 import logging
+import threading
 import warnings
-from ndef import message_decoder, message_encoder
+import collections
+from ndef import message_decoder, message_encoder, DecodeError
 
 logging.captureWarnings(True)
 log = logging.getLogger(__name__)
@@ -72,6 +77,45 @@ class Tag(object):
             msg = "_write_ndef_data is not implemented for this tag type"
             raise NotImplementedError(msg)
 
+        def _iter_ndef_data(self):
+            # Return None if there is no ndef data, otherwise a tuple
+            # of the ndef data length and an iterator that yields the
+            # data in chunks as they are read from the tag. The
+            # iterator stops early if the rest can not be read. Tag
+            # types that do not read in chunks return all at once.
+            data = self._read_ndef_data()
+            return None if data is None else (len(data), iter([data]))
+
+        @staticmethod
+        def _join_ndef_data(ndef):
+            # Collect the result of _iter_ndef_data() into a single
+            # bytearray, or None if it was not completely readable.
+            if ndef is None:
+                return None
+            length, chunks = ndef
+            try:
+                data = bytearray().join(chunks)
+            except (IndexError, TagCommandError):
+                return None
+            return data if len(data) == length else None
+
+        def _cache_state(self):
+            # Return a (probe, state) tuple that allows an NdefCache
+            # to restore this object for the same tag, or None if the
+            # tag type does not support caching. The probe is what
+            # _probe_ndef_data() returns while the NDEF data is
+            # unchanged, the state holds copies of all attributes
+            # that _restore_state() needs.
+            return None
+
+        def _probe_ndef_data(self, state):
+            # Read the cache validity probe from the tag, the state
+            # is from _cache_state(). Return None if unsupported.
+            return None
+
+        def _restore_state(self, state):
+            self.__dict__.update(copy.deepcopy(state))
+
         @property
         def tag(self):
             """A readonly reference to the underlying tag object."""
@@ -132,6 +176,8 @@ class Tag(object):
             if ndef_data is None:
                 self._tag._ndef = None
             self._data = ndef_data
+            self._tag._update_ndef_cache(
+                self if ndef_data is not None else None)
             return different
 
         @property
@@ -233,11 +279,13 @@ class Tag(object):
                 raise ValueError("data length exceeds tag capacity")
             self._write_ndef_data(data)
             self._data = data
+            self._tag._update_ndef_cache(self)
 
     def __init__(self, clf, target):
         self._clf, self._target = (clf, target)
         self._ndef = None
         self._authenticated = False
+        self.ndef_cache = None
 
     def __str__(self):
         """x.__str__() <==> str(x)"""
@@ -270,13 +318,83 @@ class Tag(object):
 
     @property
     def ndef(self):
-        """An :class:`NDEF` object if found, otherwise :const:`None`."""
+        """An :class:`NDEF` object if found, otherwise :const:`None`.
+
+        If the :attr:`ndef_cache` attribute is set to an
+        :class:`NdefCache` object, the NDEF data of a tag that was
+        read before is taken from the cache if a short validity probe
+        confirms that it has not changed.
+
+        """
         if self._ndef is None:
             ndef = self.NDEF(self)
-            if ndef.has_changed:
+            cache = None if self.is_authenticated else self.ndef_cache
+            if cache is not None and cache._load(ndef):
+                self._ndef = ndef
+            elif ndef.has_changed:
                 self._ndef = ndef
         return self._ndef
 
+    def iter_ndef_records(self):
+        """Yield the NDEF records while the NDEF message is read.
+
+        Other than :attr:`Tag.ndef.records <Tag.NDEF.records>` this
+        generator decodes and yields each record as soon as its bytes
+        were read from the tag. An application that only needs the
+        first record, or looks for a specific record, may stop the
+        iteration early and save the time to read the rest. ::
+
+            for record in tag.iter_ndef_records():
+                if record.type == 'urn:nfc:wkt:U':
+                    print(record.iri)
+                    break
+
+        When the iteration is completed the NDEF data is also
+        available as :attr:`Tag.ndef` without reading it again. If
+        the NDEF data was already read, or an :attr:`ndef_cache` is
+        set, the records are decoded from :attr:`Tag.ndef`. Nothing
+        is yielded if there is no NDEF data on the tag, and the
+        iteration stops without error if the tag was removed while
+        reading. Records are decoded with the same relaxed error
+        handling as for :attr:`Tag.NDEF.records`.
+
+        """
+        if self._ndef is not None or self.ndef_cache is not None:
+            ndef = self.ndef
+            for record in (ndef.records if ndef is not None else ()):
+                yield record
+            return
+
+        ndef = self.NDEF(self)
+        ndef_data = ndef._iter_ndef_data()
+        if ndef_data is None:
+            return
+
+        stream = NdefDataStream(*ndef_data)
+        try:
+            for record in message_decoder(stream, errors='relax'):
+                yield record
+            stream.read()
+        except DecodeError:
+            if not stream.failed:
+                raise
+        if not stream.complete:
+            log.debug("ndef data could not be read completely")
+            return
+
+        ndef._data = stream.data
+        self._ndef = ndef
+        self._update_ndef_cache(ndef)
+
+    def _update_ndef_cache(self, ndef):
+        # Store the *ndef* object state in the cache or, if *ndef*
+        # is None, remove the cache entry for this tag.
+        if self.ndef_cache is not None and not self.is_authenticated:
+            if ndef is not None:
+                self.ndef_cache._save(ndef)
+            else:
+                self.ndef_cache._discard(self)
+
     @property
     def is_present(self):
         """True if the tag is within communication range."""
@@ -336,6 +454,7 @@ class Tag(object):
             status = self._format(version, wipe)
             if status is True:
                 self._ndef = None
+                self._update_ndef_cache(None)
             return status
         else:
             log.debug("this tag can not be formatted with nfcpy")
@@ -376,6 +495,7 @@ class Tag(object):
             status = self._protect(password, read_protect, protect_from)
             if status is True:
                 self._ndef = None
+                self._update_ndef_cache(None)
             return status
         else:
             log.error("this tag can not be protected with nfcpy")
@@ -399,12 +519,325 @@ class Tag(object):
             self._authenticated = self._authenticate(password)
             if self._authenticated is True:
                 self._ndef = None
+                self._update_ndef_cache(None)
             return self._authenticated
         else:
             log.error("this tag can not be authenticated with nfcpy")
             return None
 
 
+class PresenceCheck(object):
+    """Run the presence check loop for an activated tag.
+
+    A :class:`PresenceCheck` object is used by
+    :meth:`nfc.clf.ContactlessFrontend.connect` to wait until a tag is
+    removed (with the reader/writer 'presence-check' option). The tag
+    specific presence command, for example R(NAK) for a Type 4 Tag
+    or a READ of page 0 for a Type 2 Tag, is sent every *interval*
+    seconds. With *max_interval* greater than *interval* the waiting
+    time is multiplied by *backoff* after every successful check
+    until *max_interval* is reached, this reduces the RF activity
+    for tags that remain in the field for a long time. The
+    *terminate* function is evaluated every *granularity* seconds
+    while waiting, so that the loop returns early when asked to.
+
+    The object accumulates statistics over all tags checked. The
+    removal latency is the time between the end of the last
+    successful presence check and the detection of the tag removal,
+    it is the upper bound for the time that passed between the
+    physical removal and :meth:`wait` returning.
+
+    """
+    def __init__(self, interval=0.1, max_interval=None, backoff=2.0,
+                 granularity=0.01):
+        self.interval = interval
+        self.max_interval = max(interval, max_interval or interval)
+        self.backoff = backoff
+        self.granularity = granularity
+        self.lock = threading.Lock()
+        self.checks = 0
+        self.check_time = 0.0
+        self.removals = 0
+        self.removal_latency = None
+        self.removal_latency_sum = 0.0
+        self.removal_latency_max = 0.0
+
+    @property
+    def mean_check_time(self):
+        """The average time spent in a tag presence command."""
+        return self.check_time / self.checks if self.checks else 0.0
+
+    @property
+    def mean_removal_latency(self):
+        """The average removal latency over all removed tags."""
+        return (self.removal_latency_sum / self.removals
+                if self.removals else 0.0)
+
+    def __str__(self):
+        return ("checks {0} ({1:.1f} ms) removals {2} latency "
+                "mean {3:.1f} ms max {4:.1f} ms").format(
+                    self.checks, 1E3 * self.mean_check_time, self.removals,
+                    1E3 * self.mean_removal_latency,
+                    1E3 * self.removal_latency_max)
+
+    def wait(self, tag, terminate=lambda: False):
+        """Wait until *tag* is no longer present or *terminate* returns a
+        true value. Returns :const:`True` if the tag was removed and
+        :const:`False` if terminated.
+
+        """
+        interval = self.interval
+        if terminate():
+            return False
+        last_seen = time.time()
+        while True:
+            started = time.time()
+            present = tag.is_present
+            finished = time.time()
+            with self.lock:
+                self.checks += 1
+                self.check_time += finished - started
+                if not present:
+                    latency = finished - last_seen
+                    self.removals += 1
+                    self.removal_latency = latency
+                    self.removal_latency_sum += latency
+                    self.removal_latency_max = max(
+                        self.removal_latency_max, latency)
+            if not present:
+                log.debug("tag removal detected after %.3f seconds", latency)
+                return True
+            last_seen = finished
+            deadline = finished + interval
+            while not terminate():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, self.granularity))
+            else:
+                return False
+            interval = min(interval * self.backoff, self.max_interval)
+
+
+class NdefDataStream(io.RawIOBase):
+    # A readable stream of ndef data for the ndef.message_decoder
+    # that is fed from the chunks as they are read from the tag. All
+    # data read so far is kept in the data attribute. The stream is
+    # complete when the chunks were exhausted with the expected data
+    # length and has failed when reading stopped before.
+
+    def __init__(self, length, chunks):
+        super(NdefDataStream, self).__init__()
+        self._length = length
+        self._chunks = chunks
+        self._offset = 0
+        self._reading = True
+        self.data = bytearray()
+
+    @property
+    def complete(self):
+        return not self._reading and len(self.data) == self._length
+
+    @property
+    def failed(self):
+        return not self._reading and len(self.data) != self._length
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        end = self._offset + size if size >= 0 else None
+        while self._reading and (end is None or len(self.data) < end):
+            try:
+                self.data += next(self._chunks)
+            except StopIteration:
+                self._reading = False
+            except (IndexError, TagCommandError) as error:
+                log.debug("ndef data read error: {0!r}".format(error))
+                self._reading = False
+        data = bytes(self.data[self._offset:end])
+        self._offset += len(data)
+        return data
+
+
+class _LruCache(object):
+    # The bookkeeping of the tag caches. At most *size* entries are
+    # kept in least recently used order, lookups are counted as hits
+    # and misses by the subclass and evictions are counted here.
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        with self.lock:
+            return len(self._entries)
+
+    @property
+    def hit_ratio(self):
+        """The ratio of cache hits to all lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self.lock:
+            self._entries.clear()
+
+    def _get(self, key):
+        # Return the entry for *key* as the most recently used one or
+        # None if there is no entry. Must be called with the lock held.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._entries[key] = entry
+        return entry
+
+    def _put(self, key, entry):
+        with self.lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _remove(self, key, entry=None):
+        # Remove the entry for *key*, if *entry* is given only if that
+        # is still the cached one.
+        with self.lock:
+            if entry is None or self._entries.get(key) is entry:
+                self._entries.pop(key, None)
+
+
+class NdefCache(_LruCache):
+    """A cache of NDEF data for tags that are seen repeatedly.
+
+    An :class:`NdefCache` object may be set as the reader/writer
+    'ndef-cache' option of :meth:`nfc.clf.ContactlessFrontend.connect`
+    (or directly as the :attr:`Tag.ndef_cache` attribute). When
+    :attr:`Tag.ndef` is read for a tag with the same type and
+    identifier as before, only a short validity probe is read from the
+    tag instead of all NDEF management and message data. The probe is
+    tag type specific:
+
+    * Type 2 Tag: the capability container and the memory up to and
+      including the NDEF TLV length field
+    * Type 3 Tag: the NDEF attribute information block, which
+      includes the message length and the checksum
+    * Type 4 Tag: the NLEN field of the NDEF file
+
+    The cached data is used if the probe is unchanged, otherwise the
+    NDEF data is read again. Note that a message that was rewritten
+    with the same length by another device is not detected on a Type
+    2 or Type 4 Tag. The cache should thus only be used for tags
+    that are either read-only or only written with nfcpy using the
+    same cache. Type 1 Tags and authenticated tags are never cached.
+
+    At most *size* tags are remembered, the least recently used entry
+    is evicted when a new tag is added. The :attr:`hits`,
+    :attr:`misses`, :attr:`stale` and :attr:`evictions` counters
+    accumulate over the lifetime of the object, :attr:`stale` counts
+    the misses where a tag was found in the cache but the probe had
+    changed.
+
+    """
+    def __init__(self, size=100):
+        super(NdefCache, self).__init__(size)
+        self.stale = 0
+
+    def __str__(self):
+        return ("hits {0} misses {1} stale {2} evictions {3} "
+                "entries {4}/{5}").format(
+                    self.hits, self.misses, self.stale, self.evictions,
+                    len(self), self.size)
+
+    @staticmethod
+    def _key(tag):
+        return (tag.type, tag.identifier)
+
+    def _load(self, ndef):
+        # Restore the *ndef* object from the cache entry for its tag
+        # if the validity probe read from the tag is unchanged.
+        key = self._key(ndef.tag)
+        with self.lock:
+            entry = self._get(key)
+            if entry is None:
+                self.misses += 1
+        if entry is not None:
+            probe, state = entry
+            if ndef._probe_ndef_data(state) == probe:
+                ndef._restore_state(state)
+                log.debug("ndef data for %s taken from cache", ndef.tag)
+                with self.lock:
+                    self.hits += 1
+                return True
+            self._remove(key, entry)
+            with self.lock:
+                self.misses += 1
+                self.stale += 1
+        return False
+
+    def _save(self, ndef):
+        entry = ndef._cache_state()
+        if entry is None:
+            return self._discard(ndef.tag)
+        self._put(self._key(ndef.tag), entry)
+
+    def _discard(self, tag):
+        self._remove(self._key(tag))
+
+
+class ProductCache(_LruCache):
+    """A cache of product identifications for tags that are seen
+    repeatedly.
+
+    Most tags are identified from the responses received during
+    discovery: Type 1 Tags by the header ROM, Type 3 Tags by the IC
+    code in PMm and Type 4 Tags by SEL_RES or the ATQB. The products
+    of the NXP Type 2 Tag family are however only distinguished by
+    probe commands (AUTHENTICATE and GET_VERSION), and an unsupported
+    probe mutes the tag so that it must be discovered again.
+
+    A :class:`ProductCache` object may be set as the reader/writer
+    'product-cache' option of :meth:`nfc.clf.ContactlessFrontend.connect`
+    or given as *product_cache* to :func:`activate`. The product
+    class found for a tag identifier is then remembered and a tag
+    that is seen again is activated without any probe commands. Only
+    identified products are cached, a tag that fell back to the
+    generic :class:`~nfc.tag.tt2.Type2Tag` is probed again the next
+    time. Note that tags which clone the identifier of another
+    product are then not detected.
+
+    At most *size* tags are remembered, the least recently used entry
+    is evicted when a new tag is added.
+
+    """
+    def __init__(self, size=100):
+        super(ProductCache, self).__init__(size)
+
+    def __str__(self):
+        return "hits {0} misses {1} evictions {2} entries {3}/{4}".format(
+            self.hits, self.misses, self.evictions, len(self), self.size)
+
+    @staticmethod
+    def _key(target):
+        return (target.brty[-1:], bytes(target.sdd_res))
+
+    def _lookup(self, target):
+        with self.lock:
+            product = self._get(self._key(target))
+            if product is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return product
+
+    def _store(self, target, product):
+        self._put(self._key(target), product)
+
+
 TIMEOUT_ERROR = 0
 RECEIVE_ERROR = -1
 PROTOCOL_ERROR = -2
@@ -454,7 +887,7 @@ class TagCommandError(Exception):
         return self._errno
 
 
-def activate(clf, target):
+def activate(clf, target, product_cache=None, **options):
     import nfc.clf
     try:
         log.debug("trying to activate {0}".format(target))
@@ -462,11 +895,11 @@ def activate(clf, target):
             if target.sens_res[1] & 0x0F == 0x0C:
                 return activate_tt1(clf, target)
             elif target.sel_res[0] >> 5 & 3 == 0:
-                return activate_tt2(clf, target)
+                return activate_tt2(clf, target, product_cache)
             elif target.sel_res[0] >> 5 & 1 == 1:
-                return activate_tt4(clf, target)
+                return activate_tt4(clf, target, **options)
         elif target.brty.endswith('B'):
-            return activate_tt4(clf, target)
+            return activate_tt4(clf, target, **options)
         elif target.brty.endswith('F'):
             return activate_tt3(clf, target)
     except nfc.clf.CommunicationError:
@@ -479,10 +912,10 @@ def activate_tt1(clf, target):
     return nfc.tag.tt1.activate(clf, target)
 
 
-def activate_tt2(clf, target):
+def activate_tt2(clf, target, product_cache=None):
     log.debug("trying type 2 tag activation for {0}".format(target.brty))
     import nfc.tag.tt2
-    return nfc.tag.tt2.activate(clf, target)
+    return nfc.tag.tt2.activate(clf, target, product_cache)
 
 
 def activate_tt3(clf, target):
@@ -491,10 +924,10 @@ def activate_tt3(clf, target):
     return nfc.tag.tt3.activate(clf, target)
 
 
-def activate_tt4(clf, target):
+def activate_tt4(clf, target, **options):
     log.debug("trying type 4 tag activation for {0}".format(target.brty))
     import nfc.tag.tt4
-    return nfc.tag.tt4.activate(clf, target)
+    return nfc.tag.tt4.activate(clf, target, **options)
 
 
 class TagEmulation(object):
@@ -71,11 +71,20 @@ def read_tlv(memory, offset, skip_bytes):
     if tlv_l == 0xFF:
         tlv_l, offset = (unpack(">H", memory[offset:offset+2])[0], offset+2)
 
-    tlv_v = bytearray(tlv_l)
-    for i in xrange(tlv_l):
-        while (offset + i) in skip_bytes:
+    # The value is read in slices between skip bytes, this allows the
+    # memory reader to fetch a whole segment with a single command.
+    tlv_v = bytearray()
+    while len(tlv_v) < tlv_l:
+        while offset in skip_bytes:
             offset += 1
-        tlv_v[i] = memory[offset+i]
+        end = offset
+        while end < offset + tlv_l - len(tlv_v) and end not in skip_bytes:
+            end += 1
+        data = memory[offset:end]
+        if len(data) < end - offset:
+            raise IndexError("tlv value exceeds readable memory")
+        tlv_v += data
+        offset = end
 
     return (tlv_t, tlv_l, tlv_v)
 
@@ -206,45 +215,66 @@ class Type1Tag(Tag):
             return ndef
 
         def _write_ndef_data(self, data):
+            # All new data is written into the memory image and only
+            # what differs from the tag will be written. If that needs
+            # more than a single write command, the ndef message tlv
+            # length is first set to zero on the tag, then the other
+            # changed blocks are written and finally the new ndef
+            # message tlv length. A torn write then never leaves a
+            # corrupt message that looks valid.
             log.debug("write ndef data {0}{1}".format(
                 hexlify(data[:10]), '...' if len(data) > 10 else ''))
 
             tag_memory = self._tag_memory
             skip_bytes = self._skip_bytes
-            offset = self._ndef_tlv_offset
+            tlv_offset = self._ndef_tlv_offset
             tag_memory_size = (tag_memory[10] + 1) * 8
 
-            # Set the ndef message tlv length to 0.
-            tag_memory[offset+1] = 0
-            tag_memory.synchronize()
+            if len(data) < 255:
+                tlv_length = bytearray([len(data)])
+            else:
+                tlv_length = bytearray([0xFF]) + pack(">H", len(data))
+            length_block = (tlv_offset + 1) >> 3
 
             # Leave room for ndef message length byte(s) and write
             # ndef data into the memory image, but jump over skip
-            # bytes.
-            offset += 2 if len(data) < 255 else 4
-            for i in xrange(len(data)):
-                while offset + i in skip_bytes:
+            # bytes. Data is assigned in slices between skip bytes
+            # so that dynamic memory is read by segment.
+            offset = tlv_offset + 1 + len(tlv_length)
+            index = 0
+            while index < len(data):
+                while offset in skip_bytes:
                     offset += 1
-                tag_memory[offset+i] = data[i]
+                end = offset
+                while end < offset + len(data) - index \
+                        and end not in skip_bytes:
+                    end += 1
+                tag_memory[offset:end] = data[index:index+end-offset]
+                index, offset = index + end - offset, end
             # Write a terminator tlv if space permits. We may have to
             # skip reserved and lock bytes.
-            offset = offset + i + 1
             while offset < tag_memory_size:
                 if offset not in skip_bytes:
                     tag_memory[offset] = 0xFE
                     break
                 offset += 1
-            # Write the new message data to the tag.
-            tag_memory.synchronize()
-
-            # Write the ndef message tlv length.
-            offset = self._ndef_tlv_offset
-            if len(data) < 255:
-                tag_memory[offset+1] = len(data)
-            else:
-                tag_memory[offset+1] = 0xFF
-                tag_memory[offset+2:offset+4] = pack(">H", len(data))
+            tag_memory[tlv_offset+1:tlv_offset+1+len(tlv_length)] = tlv_length
+
+            blocks = tag_memory._changed_blocks()
+            writes = tag_memory.blocks_written + tag_memory.bytes_written
+            if tag_memory._write_count(blocks) > 1:
+                # Set the ndef message tlv length to 0 on the tag, if
+                # not already, then write the other blocks.
+                tag_memory[tlv_offset+1] = 0
+                if tag_memory._tag_data(length_block)[(tlv_offset+1) & 7]:
+                    if not tag_memory._write_to_tag([length_block]):
+                        return
+                if not tag_memory._write_to_tag(set(blocks) - {length_block}):
+                    return
+                tag_memory[tlv_offset+1] = tlv_length[0]
             tag_memory.synchronize()
+            log.debug("wrote ndef data with {0} commands".format(
+                tag_memory.blocks_written + tag_memory.bytes_written - writes))
 
     #
     # Type1Tag methods and attributes
@@ -477,86 +507,155 @@ class Type1Tag(Tag):
 class Type1TagMemoryReader(object):
     def __init__(self, tag):
         assert isinstance(tag, Type1Tag)
-        self._data_from_tag = bytearray()
-        self._data_in_cache = bytearray()
+        self._blocks = dict()
+        self._dirty = dict()
         self._tag = tag
         self._header_rom = bytearray(0)
+        self.blocks_written = 0
+        self.bytes_written = 0
         # read header_rom and static memory
-        self._read_from_tag(1)
+        self._read_from_tag(0, 1)
+
+    # The memory image is sparse and holds only the 8 byte blocks
+    # that were accessed. Static memory is read with READ_ALL, block
+    # 15 and dynamic memory blocks with READ8 or, if more than one
+    # block of a segment is needed, with READ_SEGMENT. Modified blocks
+    # are remembered in _dirty with the data last read from or written
+    # to the tag. The number of WRITE-E8/WRITE-NE8 and WRITE-E/WRITE-NE
+    # commands sent are counted in blocks_written and bytes_written.
 
     def __len__(self):
-        return len(self._data_from_tag)
+        return (max(self._blocks) + 1) * 8 if self._blocks else 0
 
     def __getitem__(self, key):
         if isinstance(key, slice):
             start, stop, step = key.indices(0x100000)
-            if stop > len(self):
-                self._read_from_tag(stop)
-        elif key >= len(self):
-            self._read_from_tag(stop=key+1)
-        return self._data_in_cache[key]
+            self._read_from_tag(start, stop)
+            return self._get_slice(start, stop)[::step]
+        if key < 0:
+            raise IndexError("negative index into tag memory")
+        self._read_from_tag(key, key + 1)
+        try:
+            return self._blocks[key >> 3][key & 7]
+        except KeyError:
+            raise IndexError("tag memory index out of range")
 
     def __setitem__(self, key, value):
         self.__getitem__(key)
         if isinstance(key, slice):
-            if len(value) != len(xrange(*key.indices(0x100000))):
+            indices = xrange(*key.indices(0x100000))
+            if len(value) != len(indices):
                 msg = "{cls} requires item assignment of identical length"
                 raise ValueError(msg.format(cls=self.__class__.__name__))
-        self._data_in_cache[key] = value
-        del self._data_in_cache[len(self):]
+            value = bytearray(value)
+        else:
+            indices, value = [key], [value]
+        for index, octet in zip(indices, value):
+            block = self._blocks.get(index >> 3)
+            if block is not None and block[index & 7] != octet:
+                self._dirty.setdefault(index >> 3, block[:])
+                block[index & 7] = octet
 
     def __delitem__(self, key):
         msg = "{cls} object does not support item deletion"
         raise TypeError(msg.format(cls=self.__class__.__name__))
 
-    def _read_from_tag(self, stop):
-        if len(self) < 120:
-            try:
-                read_all_data_response = self._tag.read_all()
-            except Type1TagCommandError:
-                return
-            else:
-                self._header_rom = read_all_data_response[0:2]
-                self._data_from_tag[0:] = read_all_data_response[2:]
-                self._data_in_cache[0:] = self._data_from_tag[0:]
-        if stop > 120 and len(self) < 128:
-            try:
-                read_block_response = self._tag.read_block(15)
-            except Type1TagCommandError:
-                return
-            else:
-                self._data_from_tag[120:128] = read_block_response
-                self._data_in_cache[120:128] = read_block_response
-        while len(self) < stop:
+    def _get_slice(self, start, stop):
+        # Return the bytes from *start* to *stop* but not beyond the
+        # first block that is not in the memory image.
+        data = bytearray()
+        for block in xrange(start >> 3, (stop + 7) >> 3):
+            if block not in self._blocks:
+                break
+            data += self._blocks[block]
+        return data[start & 7:(start & 7) + stop - start]
+
+    def _add_blocks(self, first, data):
+        for i in xrange(len(data) >> 3):
+            self._blocks.setdefault(first + i, data[i*8:i*8+8])
+
+    def _read_from_tag(self, start, stop):
+        block, stop_block = start >> 3, (stop + 7) >> 3
+        while block < stop_block:
+            if block in self._blocks:
+                block += 1
+                continue
             try:
-                data = self._tag.read_segment(len(self) >> 7)
+                if block < 15:
+                    read_all_data_response = self._tag.read_all()
+                    self._header_rom = read_all_data_response[0:2]
+                    self._add_blocks(0, read_all_data_response[2:])
+                    if block not in self._blocks:
+                        return
+                elif block == 15:
+                    self._add_blocks(15, self._tag.read_block(15))
+                else:
+                    segment_stop = min(stop_block, ((block >> 4) + 1) << 4)
+                    if any(b not in self._blocks
+                           for b in xrange(block + 1, segment_stop)):
+                        data = self._tag.read_segment(block >> 4)
+                        self._add_blocks((block >> 4) << 4, data)
+                    else:
+                        self._add_blocks(block, self._tag.read_block(block))
             except Type1TagCommandError:
                 return
-            else:
-                self._data_from_tag.extend(data)
-                self._data_in_cache.extend(data)
-
-    def _write_to_tag(self, stop):
+            block += 1
+
+    def _write_blocks(self):
+        # Tags with dynamic memory support the 8 byte WRITE commands.
+        hr0 = self._header_rom[0]
+        return hr0 >> 4 == 1 and hr0 & 0x0F != 1
+
+    def _tag_data(self, block):
+        # Return the *block* data as it was last read from or written
+        # to the tag.
+        return self._dirty.get(block, self._blocks[block])
+
+    def _changed_blocks(self):
+        # Return the sorted list of blocks where the memory image
+        # differs from the data on the tag.
+        return [block for block in sorted(self._dirty)
+                if self._blocks[block] != self._dirty[block]]
+
+    def _write_count(self, blocks):
+        # Return the number of write commands needed for *blocks*.
+        if self._write_blocks():
+            return len(blocks)
+        return sum(sum(1 for new, old in zip(self._blocks[b], self._dirty[b])
+                       if new != old) for b in blocks)
+
+    def _write_to_tag(self, blocks=None):
+        # Write the modified blocks, or only those given in *blocks*,
+        # in address order. The no-erase write commands are used when
+        # no bit needs to be cleared. Returns False if a write failed.
+        if blocks is not None:
+            blocks = [b for b in sorted(blocks) if b in self._dirty]
         try:
-            hr0 = self._header_rom[0]
-            if hr0 >> 4 == 1 and hr0 & 0x0F != 1:
-                for i in xrange(0, stop, 8):
-                    data = self._data_in_cache[i:i+8]
-                    if data != self._data_from_tag[i:i+8]:
-                        self._tag.write_block(i//8, data)
-                        self._data_from_tag[i:i+8] = data
-            else:
-                for i in xrange(0, stop):
-                    data = self._data_in_cache[i]
-                    if data != self._data_from_tag[i]:
-                        self._tag.write_byte(i, data)
-                        self._data_from_tag[i] = data
+            write_blocks = self._write_blocks()
+            for block in (sorted(self._dirty) if blocks is None else blocks):
+                data, tag_data = self._blocks[block], self._dirty[block]
+                if write_blocks:
+                    if data != tag_data:
+                        erase = any(old & ~new
+                                    for new, old in zip(data, tag_data))
+                        self._tag.write_block(block, data, erase)
+                        self.blocks_written += 1
+                else:
+                    for i in xrange(8):
+                        if data[i] != tag_data[i]:
+                            erase = bool(tag_data[i] & ~data[i])
+                            self._tag.write_byte(block*8+i, data[i], erase)
+                            self.bytes_written += 1
+                            tag_data[i] = data[i]
+                del self._dirty[block]
         except Type1TagCommandError as error:
             log.error(str(error))
+            return False
+        return True
 
     def synchronize(self):
         """Write pages that contain modified data back to tag memory."""
-        self._write_to_tag(stop=len(self))
+        self._write_to_tag()
 
 
 def activate(clf, target):
@@ -19,6 +19,7 @@
 # See the Licence for the specific language governing
 # permissions and limitations under the Licence.
 # -----------------------------------------------------------------------------
+import copy
 import time
 from binascii import hexlify
 from struct import pack, unpack
@@ -69,21 +70,47 @@ class Type2TagCommandError(TagCommandError):
 def read_tlv(memory, offset, skip_bytes):
     # Unpack a Type 2 Tag TLV from tag memory and return tag type, tag
     # length and tag value. For tag type 0 there is no length field,
-    # this is returned as length -1. The tlv length field can be one
-    # or three bytes, if the first byte is 255 then the next two byte
-    # carry the length (big endian).
+    # this is returned as length -1.
+    tlv_t, tlv_l, offset = read_tlv_header(memory, offset)
+    if tlv_l < 0:
+        return (tlv_t, -1, None)
+    tlv_v = bytearray()
+    for data in iter_tlv_value(memory, offset, tlv_l, skip_bytes):
+        tlv_v += data
+    return (tlv_t, tlv_l, tlv_v)
+
+
+def read_tlv_header(memory, offset):
+    # Unpack the type and length of a Type 2 Tag TLV and return them
+    # with the offset of the value field. The tlv length field can
+    # be one or three bytes, if the first byte is 255 then the next
+    # two byte carry the length (big endian).
     tlv_t, offset = (memory[offset], offset+1)
     if tlv_t in (0x00, 0xFE):
-        return (tlv_t, -1, None)
+        return (tlv_t, -1, offset)
     tlv_l, offset = (memory[offset], offset+1)
     if tlv_l == 0xFF:
         tlv_l, offset = (unpack(">H", memory[offset:offset+2])[0], offset+2)
-    tlv_v = bytearray(tlv_l)
-    for i in xrange(tlv_l):
-        while (offset + i) in skip_bytes:
+    return (tlv_t, tlv_l, offset)
+
+
+def iter_tlv_value(memory, offset, length, skip_bytes, size=None):
+    # Yield the tlv value that starts at offset in slices between
+    # skip bytes, this allows the memory reader to fetch more than 16
+    # byte with a single command. A slice is at most size bytes.
+    while length > 0:
+        while offset in skip_bytes:
             offset += 1
-        tlv_v[i] = memory[offset+i]
-    return (tlv_t, tlv_l, tlv_v)
+        end = offset
+        while end < offset + min(length, size or length) \
+                and end not in skip_bytes:
+            end += 1
+        data = memory[offset:end]
+        if len(data) < end - offset:
+            raise IndexError("tlv value exceeds readable memory")
+        yield data
+        length -= len(data)
+        offset = end
 
 
 def get_lock_byte_range(data):
@@ -158,6 +185,12 @@ class Type2Tag(Tag):
                 return False
 
         def _read_ndef_data(self):
+            return self._join_ndef_data(self._iter_ndef_data(chunked=False))
+
+        def _iter_ndef_data(self, chunked=True):
+            # The ndef message is yielded in slices of the size that
+            # one tag read command returns, or as a single slice if
+            # not chunked.
             log.debug("read ndef data")
             tag_memory = Type2TagMemoryReader(self.tag)
 
@@ -176,8 +209,10 @@ class Type2Tag(Tag):
                     offset += 1
 
                 try:
-                    tlv = read_tlv(tag_memory, offset, skip_bytes)
-                    tlv_t, tlv_l, tlv_v = tlv
+                    tlv_t, tlv_l, value = read_tlv_header(tag_memory, offset)
+                    if tlv_t != 3 and tlv_l >= 0:
+                        tlv_v = bytearray().join(iter_tlv_value(
+                            tag_memory, value, tlv_l, skip_bytes))
                 except IndexError:
                     return None
                 else:
@@ -199,7 +234,9 @@ class Type2Tag(Tag):
                     else:
                         log.debug("memory tlv has wrong length")
                 elif tlv_t == 3:
-                    ndef = tlv_v
+                    size = self.tag._read_pages_size if chunked else None
+                    ndef = (tlv_l, iter_tlv_value(
+                        tag_memory, value, tlv_l, skip_bytes, size))
                     break
                 elif tlv_t == 254:
                     break
@@ -224,45 +261,88 @@ class Type2Tag(Tag):
             # not we'll do it first. We'll then have a tag memory
             # image, know which bytes need to be to skipped as told by
             # memory or control tlv data, and where the ndef message
-            # tlv starts. We first set the ndef message tlv length to
-            # zero (synchronize cause that to be actually written),
-            # then write all new data into the memory image (skipping
-            # bytes as needed) and let that be written to the tag, and
-            # finally write the new ndef message tlv length.
+            # tlv starts. All new data is written into the memory
+            # image and only pages that differ from the tag will be
+            # written. If that is more than a single page, we first
+            # set the ndef message tlv length to zero on the tag, then
+            # write the other changed pages and finally the new ndef
+            # message tlv length. A torn write then never leaves a
+            # corrupt message that looks valid.
             log.debug("write ndef data {0}{1}".format(
                 hexlify(data[:10]), '...' if len(data) > 10 else ''))
 
             tag_memory = self._tag_memory
             skip_bytes = self._skip_bytes
-            offset = self._ndef_tlv_offset
+            tlv_offset = self._ndef_tlv_offset
 
-            # Set the ndef message tlv length to 0.
-            tag_memory[offset+1] = 0
-            tag_memory.synchronize()
+            if len(data) < 255:
+                tlv_length = bytearray([len(data)])
+            else:
+                tlv_length = bytearray([0xFF]) + pack(">H", len(data))
+            length_page = (tlv_offset + 1) >> 2
 
-            # Leave room for ndef message length byte(s) and write
-            # ndef data into the memory image, but jump over skip
-            # bytes. If space permits, write a terminator tlv.
-            offset += 2 if len(data) < 255 else 4
+            # Write ndef data into the memory image, but jump over
+            # skip bytes. If space permits, write a terminator tlv.
+            offset = tlv_offset + 1 + len(tlv_length)
             for index, octet in enumerate(data):
                 while offset + index in skip_bytes:
                     offset += 1
                 tag_memory[offset+index] = octet
-            offset = offset + index + 1
+            offset = offset + len(data)
             while offset in skip_bytes:
                 offset += 1
             if offset < tag_memory[14] * 8 + 16:
                 tag_memory[offset] = 0xFE
+            tag_memory[tlv_offset+1:tlv_offset+1+len(tlv_length)] = tlv_length
+
+            pages = tag_memory._changed_pages()
+            pages_written = tag_memory.pages_written
+            if len(pages) > 1:
+                # Set the ndef message tlv length to 0 on the tag, if
+                # not already, then write the other pages.
+                tag_memory[tlv_offset+1] = 0
+                if tag_memory._tag_data(length_page)[(tlv_offset+1) & 3]:
+                    if not tag_memory._write_to_tag([length_page]):
+                        return
+                if not tag_memory._write_to_tag(set(pages) - {length_page}):
+                    return
+                tag_memory[tlv_offset+1] = tlv_length[0]
             tag_memory.synchronize()
-
-            # Write the ndef message tlv length.
-            offset = self._ndef_tlv_offset
-            if len(data) < 255:
-                tag_memory[offset+1] = len(data)
-            else:
-                tag_memory[offset+1] = 0xFF
-                tag_memory[offset+2:offset+4] = pack(">H", len(data))
-            tag_memory.synchronize()
+            log.debug("wrote {0} pages of ndef data".format(
+                tag_memory.pages_written - pages_written))
+
+        def _cache_state(self):
+            # The probe is the capability container and memory up to
+            # the end of the ndef message tlv length field. The state
+            # includes the memory image as it is on the tag, unless
+            # a write did not complete.
+            tag_memory = self._tag_memory
+            if tag_memory._changed_pages():
+                return None
+            pages = dict((page, tag_memory._tag_data(page))
+                         for page in tag_memory._pages)
+            probe = bytearray()
+            for page in xrange(3, ((self._ndef_tlv_offset + 3) >> 2) + 1):
+                probe += pages.get(page, bytearray(4))
+            probe = bytes(probe[:self._ndef_tlv_offset + 4 - 12])
+            state = {
+                '_capacity': self._capacity, '_data': self._data,
+                '_readable': self._readable, '_writeable': self._writeable,
+                '_ndef_tlv_offset': self._ndef_tlv_offset,
+                '_skip_bytes': self._skip_bytes, '_pages': pages}
+            return (probe, copy.deepcopy(state))
+
+        def _probe_ndef_data(self, state):
+            # The memory reader is kept for _restore_state().
+            self._tag_memory = Type2TagMemoryReader(self.tag)
+            offset = state['_ndef_tlv_offset']
+            return bytes(self._tag_memory[12:offset+4])
+
+        def _restore_state(self, state):
+            state = copy.deepcopy(state)
+            for page, data in state.pop('_pages').items():
+                self._tag_memory._pages.setdefault(page, data)
+            self.__dict__.update(state)
 
     #
     # Type2Tag methods and attributes
@@ -493,6 +573,18 @@ class Type2Tag(Tag):
 
         return data
 
+    def _read_pages(self, page, stop):
+        # Read from *page* onwards, at least four pages and as much
+        # as possible until *stop* (exclusive). The generic Type 2 Tag
+        # only knows the READ command that returns four pages.
+        return self.read(page)
+
+    @property
+    def _read_pages_size(self):
+        # The number of bytes that one _read_pages() call returns if
+        # enough pages are requested.
+        return 16
+
     def write(self, page, data):
         """Send a WRITE command to store data on the tag.
 
@@ -618,72 +710,136 @@ class Type2TagMemoryReader(object):
             tag_memory[16:19] = [0x03, 0x00, 0xFE]
             tag_memory.synchronize()
 
+    Only pages with modified data are written. The number of pages
+    written to the tag is counted in :attr:`pages_written`.
+
     """
     def __init__(self, tag):
         assert isinstance(tag, Type2Tag)
-        self._data_from_tag = bytearray()
-        self._data_in_cache = bytearray()
+        self._pages = dict()
+        self._dirty = dict()
         self._tag = tag
+        self.pages_written = 0
+
+    # The memory image is sparse, it only holds the pages that were
+    # accessed. Tag memory is read on demand in runs of missing pages
+    # and the pages that were modified are remembered in _dirty with
+    # the data last read from or written to the tag.
 
     def __len__(self):
-        return len(self._data_from_tag)
+        return (max(self._pages) + 1) * 4 if self._pages else 0
 
     def __getitem__(self, key):
         if isinstance(key, slice):
             start, stop, step = key.indices(0x100000)
-            if stop > len(self):
-                self._read_from_tag(stop)
-        elif key >= len(self):
-            self._read_from_tag(stop=key+1)
-        return self._data_in_cache[key]
+            self._read_from_tag(start, stop)
+            return self._get_slice(start, stop)[::step]
+        if key < 0:
+            raise IndexError("negative index into tag memory")
+        self._read_from_tag(key, key + 1)
+        try:
+            return self._pages[key >> 2][key & 3]
+        except KeyError:
+            raise IndexError("tag memory index out of range")
 
     def __setitem__(self, key, value):
         self.__getitem__(key)
         if isinstance(key, slice):
-            if len(value) != len(xrange(*key.indices(0x100000))):
+            indices = xrange(*key.indices(0x100000))
+            if len(value) != len(indices):
                 msg = "{cls} requires item assignment of identical length"
                 raise ValueError(msg.format(cls=self.__class__.__name__))
-        self._data_in_cache[key] = value
-        del self._data_in_cache[len(self):]
+            value = bytearray(value)
+        else:
+            indices, value = [key], [value]
+        for index, octet in zip(indices, value):
+            page = self._pages.get(index >> 2)
+            if page is not None and page[index & 3] != octet:
+                self._dirty.setdefault(index >> 2, page[:])
+                page[index & 3] = octet
 
     def __delitem__(self, key):
         msg = "{cls} object does not support item deletion"
         raise TypeError(msg.format(cls=self.__class__.__name__))
 
-    def _read_from_tag(self, stop):
-        start = len(self)
+    def _get_slice(self, start, stop):
+        # Return the bytes from *start* to *stop* but not beyond the
+        # first page that is not in the memory image.
+        data = bytearray()
+        for page in xrange(start >> 2, (stop + 3) >> 2):
+            if page not in self._pages:
+                break
+            data += self._pages[page]
+        return data[start & 3:(start & 3) + stop - start]
+
+    def _read_from_tag(self, start, stop):
+        page, stop_page = start >> 2, (stop + 3) >> 2
         try:
-            for i in xrange((start >> 4) << 4, stop, 16):
-                self._tag.sector_select(i >> 10)
-                self._data_from_tag[i:i+16] = self._tag.read(i >> 2)
-                self._data_in_cache[i:i+16] = self._data_from_tag[i:i+16]
+            while page < stop_page:
+                if page in self._pages:
+                    page += 1
+                    continue
+                # A run of missing pages is read from the start of the
+                # four page READ block if those pages are missing too,
+                # and ends at the next page in the image or the sector.
+                first = page
+                while first & 3 and first - 1 not in self._pages:
+                    first -= 1
+                last = page + 1
+                last_stop = min(stop_page, ((page >> 8) + 1) << 8)
+                while last < last_stop and last not in self._pages:
+                    last += 1
+                self._tag.sector_select(first >> 8)
+                data = self._tag._read_pages(first, last)
+                for i in xrange(len(data) >> 2):
+                    self._pages.setdefault(first + i, data[i*4:i*4+4])
+                if len(data) < 4:
+                    break
+                page = first + (len(data) >> 2)
         except Type2TagCommandError:
             pass
 
-    def _write_to_tag(self, stop):
+    def _tag_data(self, page):
+        # Return the *page* data as it was last read from or written
+        # to the tag.
+        return self._dirty.get(page, self._pages[page])
+
+    def _changed_pages(self):
+        # Return the sorted list of pages where the memory image
+        # differs from the data on the tag.
+        return [page for page in sorted(self._dirty)
+                if self._pages[page] != self._dirty[page]]
+
+    def _write_to_tag(self, pages=None):
+        # Write the modified pages, or only those given in *pages*, in
+        # address order. Returns False if a write command failed.
+        if pages is not None:
+            pages = [page for page in sorted(pages) if page in self._dirty]
         try:
-            for i in xrange(0, stop, 4):
-                data = self._data_in_cache[i:i+4]
-                if data != self._data_from_tag[i:i+4]:
-                    self._tag.sector_select(i >> 10)
-                    self._tag.write(i >> 2, data)
-                    self._data_from_tag[i:i+4] = data
+            for page in (sorted(self._dirty) if pages is None else pages):
+                data = self._pages[page]
+                if data != self._dirty[page]:
+                    self._tag.sector_select(page >> 8)
+                    self._tag.write(page, data)
+                    self.pages_written += 1
+                del self._dirty[page]
         except Type2TagCommandError:
-            pass
+            return False
+        return True
 
     def synchronize(self):
         """Write pages that contain modified data back to tag memory."""
-        self._write_to_tag(stop=len(self))
+        self._write_to_tag()
 
 
-def activate(clf, target):
+def activate(clf, target, product_cache=None):
     # Type 2 Tags go mute when they receive an unsupported command. It
     # is then necessary to sense again and by copying sdd_res to
     # sel_req we ensure that only the same tag will be found.
     target.sel_req = target.sdd_res[:]
     if target.sdd_res[0] == 0x04:  # NXP
         import nfc.tag.tt2_nxp
-        tag = nfc.tag.tt2_nxp.activate(clf, target)
+        tag = nfc.tag.tt2_nxp.activate(clf, target, product_cache)
         if tag is not None:
             return tag
         else:
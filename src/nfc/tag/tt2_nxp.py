@@ -373,6 +373,47 @@ class NTAG21x(tt2.Type2Tag):
         args = (password, read_protect, protect_from)
         return super(NTAG21x, self).protect(*args)
 
+    def _read_pages(self, page, stop):
+        # Use FAST_READ to get all pages up to *stop* with one command
+        # if the reader can receive them, READ is used for up to four
+        # pages (that returns four pages anyway) and when FAST_READ is
+        # rejected, for example at a read protected page.
+        stop = min(stop, self._cfgpage + 4)
+        if stop - page > 4:
+            count = min(stop - page, self.clf.max_recv_data_size // 4)
+            try:
+                return self._fast_read(page, page + count - 1)
+            except tt2.Type2TagCommandError as error:
+                if int(error) != tt2.INVALID_PAGE_ERROR:
+                    raise
+                log.debug("fast read rejected, fall back to read")
+        return self.read(page)
+
+    @property
+    def _read_pages_size(self):
+        # As many pages as one FAST_READ response can carry.
+        return 4 * max(4, self.clf.max_recv_data_size // 4)
+
+    def _fast_read(self, start_page, end_page):
+        log.debug("fast read pages {0} to {1}".format(start_page, end_page))
+        size = 4 * (end_page - start_page + 1)
+        cmd = b"\x3A" + chr(start_page % 256) + chr(end_page % 256)
+        data = self.transceive(cmd, timeout=0.005 + size * 1E-4)
+
+        if len(data) == 1 and data[0] & 0xFA == 0x00:
+            log.debug("received nak response")
+            self.target.sel_req = self.target.sdd_res[:]
+            self._target = self.clf.sense(self.target)
+            raise tt2.Type2TagCommandError(
+                tt2.INVALID_PAGE_ERROR if self.target
+                else nfc.tag.RECEIVE_ERROR)
+
+        if len(data) != size:
+            log.debug("invalid response " + hexlify(data))
+            raise tt2.Type2TagCommandError(tt2.INVALID_RESPONSE_ERROR)
+
+        return data
+
     def _protect(self, password, read_protect, protect_from):
         if password is None:
             return self._protect_with_lockbits()
@@ -633,6 +674,7 @@ class MifareUltralightEV1(NTAG21x):
 class MF0UL11(MifareUltralightEV1):
     def __init__(self, clf, target):
         super(MF0UL11, self).__init__(clf, target, "MF0UL11")
+        self._cfgpage = 16
 
     def dump(self):
         return self._dump_ul11()
@@ -641,6 +683,7 @@ class MF0UL11(MifareUltralightEV1):
 class MF0ULH11(MifareUltralightEV1):
     def __init__(self, clf, target):
         super(MF0ULH11, self).__init__(clf, target, "MF0ULH11")
+        self._cfgpage = 16
 
     def dump(self):
         return self._dump_ul11()
@@ -649,6 +692,7 @@ class MF0ULH11(MifareUltralightEV1):
 class MF0UL21(MifareUltralightEV1):
     def __init__(self, clf, target):
         super(MF0UL21, self).__init__(clf, target, "MF0UL21")
+        self._cfgpage = 37
 
     def dump(self):
         return self._dump_ul21()
@@ -657,6 +701,7 @@ class MF0UL21(MifareUltralightEV1):
 class MF0ULH21(MifareUltralightEV1):
     def __init__(self, clf, target):
         super(MF0ULH21, self).__init__(clf, target, "MF0ULH21")
+        self._cfgpage = 37
 
     def dump(self):
         return self._dump_ul21()
@@ -729,7 +774,17 @@ VERSION_MAP = {
 }
 
 
-def activate(clf, target):
+def activate(clf, target, product_cache=None):
+    if product_cache is not None:
+        product = product_cache._lookup(target)
+        if product is not None:
+            log.debug("product {0} known from cache".format(product))
+            return product(clf, target)
+        tag = activate(clf, target)
+        if tag is not None:
+            product_cache._store(target, type(tag))
+        return tag
+
     log.debug("check if authenticate command is available")
     try:
         rsp = clf.exchange(b'\x1A\x00', timeout=0.01)
@@ -22,8 +22,10 @@
 import nfc.tag
 import nfc.clf
 
+import copy
 import time
 import itertools
+import collections
 from binascii import hexlify
 from struct import pack, unpack
 
@@ -160,6 +162,8 @@ class Type3Tag(nfc.tag.Tag):
                 log.debug("ndef attribute data checksum error")
                 return None
 
+            self._attribute_data = bytes(data[0:16])
+
             ver, nbr, nbw, nmaxb = unpack(">BBBH", data[0:5])
             writef, rwflag = unpack(">BB", data[9:11])
             length = unpack(">I", b"\x00" + data[11:14])[0]
@@ -184,14 +188,37 @@ class Type3Tag(nfc.tag.Tag):
             attribute_data[11:14] = pack('>I', attributes['ln'])[1:4]
             attribute_data[14:16] = pack('>H', sum(attribute_data[0:14]))
             self._tag.write_to_ndef_service(attribute_data, 0)
+            self._attribute_data = bytes(attribute_data)
 
-        def _read_ndef_data(self):
+        def _select_ndef_system(self):
             if self.tag.sys != 0x12FC:
                 try:
                     self.tag.idm, self.tag.pmm = self._tag.polling(0x12FC)
                     self.tag.sys = 0x12FC
                 except Type3TagCommandError:
-                    return None
+                    return False
+            return True
+
+        def _block_lists(self, last_block_number, max_blocks, block_size):
+            # Split the ndef data blocks from 1 to last_block_number
+            # into the block lists of read or write commands that are
+            # within the Nbr or Nbw limit and fit the reader's frame.
+            sc = ServiceCode(0, 0b001011 if not block_size else 0b001001)
+            blocks = [(sc, n) for n in range(1, last_block_number)]
+            return [[number for _, number in keys] for _, _, keys in
+                    self._tag._plan_commands(blocks, max_blocks, block_size)]
+
+        def _read_ndef_data(self):
+            data = self._join_ndef_data(self._iter_ndef_data())
+            if data is not None:
+                log.debug("got {0} byte ndef data {1}{2}".format(
+                    len(data), hexlify(data[0:32]),
+                    ('', '...')[len(data) > 32]))
+            return data
+
+        def _iter_ndef_data(self):
+            if not self._select_ndef_system():
+                return None
 
             attributes = self._read_attribute_data()
             if attributes is None:
@@ -201,22 +228,21 @@ class Type3Tag(nfc.tag.Tag):
                 log.debug("unsupported ndef mapping major version")
                 return None
 
-            last_block_number = 1 + (attributes['ln'] + 15) // 16
-            data = bytearray()
+            length = attributes['ln']
+            last_block_number = 1 + (length + 15) // 16
+            block_lists = self._block_lists(
+                last_block_number, attributes['nbr'], block_size=0)
 
-            for i in range(1, last_block_number, attributes['nbr']):
-                last_block = min(i + attributes['nbr'], last_block_number)
-                block_list = range(i, last_block)
-                try:
-                    data += self.tag.read_from_ndef_service(*block_list)
-                except Type3TagCommandError:
-                    return None
+            def read_ndef_blocks():
+                # Yield the ndef data of each read command, without
+                # the padding of the last block.
+                offset = 0
+                for block_list in block_lists:
+                    data = self.tag.read_from_ndef_service(*block_list)
+                    yield data[0:length-offset]
+                    offset += len(data)
 
-            data = data[0:attributes['ln']]
-            log.debug("got {0} byte ndef data {1}{2}".format(
-                len(data), hexlify(data[0:32]), ('', '...')[len(data) > 32]))
-
-            return data
+            return (length, read_ndef_blocks())
 
         def _write_ndef_data(self, data):
             attributes = self._read_attribute_data()
@@ -230,16 +256,31 @@ class Type3Tag(nfc.tag.Tag):
             attributes['ln'] = len(data)  # because we may need to pad zeros
             data = data + bytearray(-len(data) % 16)  # adjust to block size
 
-            for i in range(1, last_block_number, attributes['nbw']):
-                last_block = min(i + attributes['nbw'], last_block_number)
-                block_data = data[(i-1)*16:(last_block-1)*16]
-                self._tag.write_to_ndef_service(
-                    block_data, *range(i, last_block))
+            for block_list in self._block_lists(
+                    last_block_number, attributes['nbw'], block_size=16):
+                block_data = data[(block_list[0]-1)*16:block_list[-1]*16]
+                self._tag.write_to_ndef_service(block_data, *block_list)
 
             attributes['writef'] = 0x00
             self._write_attribute_data(attributes)
             return True
 
+        def _cache_state(self):
+            # The probe is the attribute information block that has
+            # the ndef data length and a checksum.
+            state = {
+                '_capacity': self._capacity, '_data': self._data,
+                '_readable': self._readable, '_writeable': self._writeable,
+                '_attribute_data': self._attribute_data}
+            return (self._attribute_data, copy.deepcopy(state))
+
+        def _probe_ndef_data(self, state):
+            if self._select_ndef_system():
+                try:
+                    return bytes(self._tag.read_from_ndef_service(0)[0:16])
+                except Type3TagCommandError:
+                    pass
+
     def __init__(self, clf, target):
         super(Type3Tag, self).__init__(clf, target)
         self.idm = target.sensf_res[1:9]
@@ -586,6 +627,41 @@ class Type3Tag(nfc.tag.Tag):
             bc_list = [BlockCode(n) for n in blocks]
             return self.read_without_encryption(sc_list, bc_list)
 
+    def read_blocks(self, blocks, max_blocks=None):
+        """Read data blocks from one or more unencrypted services.
+
+        This method reads all data blocks given by *blocks*, an
+        iterable of ``(service_code, block_number)`` tuples where
+        *service_code* is a :class:`~nfc.tag.tt3.ServiceCode` object,
+        with as few Read Without Encryption commands as possible. A
+        command combines blocks from up to 16 services, the number of
+        blocks per command is limited by the frame size of the reader
+        and, if not :const:`None`, by *max_blocks*. The return value
+        is an ordered dictionary that maps each ``(service_code,
+        block_number)`` tuple of *blocks* to the 16 byte block data.
+
+        Cards may reject commands with more blocks than they support,
+        for an NFC Forum Type 3 Tag *max_blocks* should be the Nbr
+        value of the attribute information block. As an example, the
+        following code reads block 5 from service 16 and blocks 0 to
+        1 from service 80 with a single command::
+
+            sc1 = nfc.tag.tt3.ServiceCode(16, 0x09)
+            sc2 = nfc.tag.tt3.ServiceCode(80, 0x0B)
+            data = tag.read_blocks([(sc1, 5), (sc2, 0), (sc2, 1)])
+            print(hexlify(data[(sc2, 1)]))
+
+        Command execution errors raise :exc:`~nfc.tag.TagCommandError`.
+
+        """
+        data = collections.OrderedDict()
+        for sc_list, bc_list, keys in self._plan_commands(
+                blocks, max_blocks, block_size=0):
+            rsp = self.read_without_encryption(sc_list, bc_list)
+            for i, key in enumerate(keys):
+                data[key] = rsp[i*16:(i+1)*16]
+        return data
+
     def write_without_encryption(self, service_list, block_list, data):
         """Write data blocks to unencrypted services.
 
@@ -664,6 +740,74 @@ class Type3Tag(nfc.tag.Tag):
             bc_list = [BlockCode(n) for n in blocks]
             self.write_without_encryption(sc_list, bc_list, data)
 
+    def write_blocks(self, blocks, max_blocks=None):
+        """Write data blocks to one or more unencrypted services.
+
+        This method writes all data blocks given by *blocks*, a
+        mapping or an iterable of pairs from ``(service_code,
+        block_number)`` tuples to 16 byte block data, with as few
+        Write Without Encryption commands as possible. Commands are
+        composed as for :meth:`read_blocks`, for an NFC Forum Type 3
+        Tag *max_blocks* should be the Nbw value of the attribute
+        information block. ::
+
+            sc = nfc.tag.tt3.ServiceCode(16, 0x09)
+            tag.write_blocks([((sc, 1), 16 * "\\xAA"),
+                              ((sc, 2), 16 * "\\xBB")])
+
+        Command execution errors raise :exc:`~nfc.tag.TagCommandError`.
+
+        """
+        if hasattr(blocks, 'items'):
+            blocks = blocks.items()
+        blocks = collections.OrderedDict(blocks)
+        if any(len(data) != 16 for data in blocks.values()):
+            raise ValueError("block data must be 16 byte")
+        for sc_list, bc_list, keys in self._plan_commands(
+                blocks, max_blocks, block_size=16):
+            data = bytearray()
+            for key in keys:
+                data += blocks[key]
+            self.write_without_encryption(sc_list, bc_list, data)
+
+    def _plan_commands(self, blocks, max_blocks, block_size):
+        # Split the (service_code, block_number) items of *blocks*
+        # into the service and block code lists of as few commands
+        # as possible, keeping the order of blocks. Each command has
+        # at most 16 services and *max_blocks* blocks and must fit
+        # into a FeliCa frame and the reader's send and receive
+        # size. The *block_size* is 16 for write commands that send
+        # the block data and 0 for read commands that receive it.
+        max_send = min(255, self.clf.max_send_data_size)
+        max_recv = min(255, self.clf.max_recv_data_size)
+
+        def add(command, service, number):
+            sc_list, bc_list, keys = command
+            codes = [int(sc) for sc in sc_list]
+            index = codes.index(int(service)) \
+                if int(service) in codes else len(codes)
+            bc = BlockCode(number, service=index)
+            # LEN, code, IDm, number of services and number of blocks
+            send_size = 12 + 2 * max(len(codes), index + 1) + sum(
+                len(code.pack()) + block_size for code in bc_list + [bc])
+            recv_size = 13 + 16 * (len(keys) + 1) if not block_size else 12
+            if keys and not (index < 16 and send_size <= max_send and
+                             recv_size <= max_recv and
+                             (max_blocks is None or len(keys) < max_blocks)):
+                return False
+            if index == len(codes):
+                sc_list.append(service)
+            bc_list.append(bc)
+            keys.append((service, number))
+            return True
+
+        plan = [([], [], [])]
+        for service, number in blocks:
+            if not add(plan[-1], service, number):
+                plan.append(([], [], []))
+                add(plan[-1], service, number)
+        return [command for command in plan if command[2]]
+
     def send_cmd_recv_rsp(self, cmd_code, cmd_data, timeout,
                           send_idm=True, check_status=True):
         """Send a command and receive a response.
@@ -19,6 +19,7 @@
 # See the Licence for the specific language governing
 # permissions and limitations under the Licence.
 # -----------------------------------------------------------------------------
+import copy
 import itertools
 from binascii import hexlify
 from struct import pack, unpack
@@ -71,56 +72,48 @@ class IsoDepInitiator(object):
         self.pni = 0
         self.miu = fsc-1
         self.fwt = fwt
+        self.max_fwt = 4096 / 13.56E6 * 2**14
         self.delta_fwt = 49152 / 13.56E6
         self.n_retry_ack = min(int(1/self.fwt), 5)
         self.n_retry_nak = self.n_retry_ack
 
     def exchange(self, command, timeout=None):
-        if timeout is None:
-            timeout = self.fwt + self.delta_fwt
-
         if command is None:
             # presence check with R(NAK)
+            if timeout is None:
+                timeout = self.fwt + self.delta_fwt
             data = bytearray([0xB2 | self.pni])
             self.clf.exchange(data, timeout)
             return
 
+        response = bytearray()
+        for data in self.exchange_iter(command, timeout):
+            response += data
+        return response
+
+    def exchange_iter(self, command, timeout=None):
+        """Send the *command* and yield the response as it is received.
+
+        Each chained response block is yielded as a memoryview of
+        the received frame without the protocol control byte, so a
+        large response can be processed without being collected
+        first. The iteration must be completed before the next
+        exchange because the chained blocks are only requested when
+        the previous one was consumed.
+
+        """
+        if timeout is None:
+            timeout = self.fwt + self.delta_fwt
+
+        command = memoryview(command)
         for offset in range(0, len(command), self.miu):
             more = len(command) - offset > self.miu
-            pfb = pack('B', (0x02, 0x12)[more] | self.pni)
-            data = pfb + command[offset:offset+self.miu]
-
-            for i in itertools.count(start=1):  # pragma: no branch
-                try:
-                    data = self.clf.exchange(data, timeout)
-                    if len(data) == 0:
-                        raise nfc.clf.TransmissionError
-                    if data[0] == 0xA2 | (~self.pni & 1):
-                        log.debug("ISO-DEP retransmit after ack")
-                        data = pfb + command[offset:offset+self.miu]
-                        continue
-                    break
-                except nfc.clf.TransmissionError:
-                    if i <= self.n_retry_nak:
-                        log.warning("ISO-DEP transmission error (#%d)" % i)
-                        data = bytearray([0xB2 | self.pni])
-                    else:
-                        log.error("ISO-DEP unrecoverable transmission error")
-                        raise Type4TagCommandError(nfc.tag.RECEIVE_ERROR)
-                except nfc.clf.TimeoutError:
-                    if i <= self.n_retry_nak:
-                        log.warning("ISO-DEP timeout error (#%d)" % i)
-                        data = bytearray([0xB2 | self.pni])
-                    else:
-                        log.error("ISO-DEP unrecoverable timeout error")
-                        raise Type4TagCommandError(nfc.tag.TIMEOUT_ERROR)
-                except nfc.clf.ProtocolError:
-                    log.error("ISO-DEP unrecoverable protocol error")
-                    raise Type4TagCommandError(nfc.tag.PROTOCOL_ERROR)
+            block = command[offset:offset+self.miu]
+            frame = bytearray(len(block) + 1)
+            frame[0] = (0x02, 0x12)[more] | self.pni
+            frame[1:] = block
 
-            while data[0] & 0b11111110 == 0b11110010:  # WTX
-                log.debug("ISO-DEP waiting time extension")
-                data = self.clf.exchange(data, (data[1] & 0x3F) * self.fwt)
+            data = self._transceive(frame, timeout, self.n_retry_nak, 0xB2)
 
             if data[0] & 0x01 != self.pni:
                 log.warning("ISO-DEP protocol error: block number")
@@ -135,46 +128,73 @@ class IsoDepInitiator(object):
             else:
                 if data[0] & 0b11101110 == 0x02:  # INF
                     self.pni = (self.pni + 1) % 2
-                    response = data[1:]
                 else:
                     log.error("ISO-DEP protocol error: expected inf")
                     raise Type4TagCommandError(nfc.tag.PROTOCOL_ERROR)
 
-        while bool(data[0] & 0b00010000):
-            data = pack('B', 0xA2 | self.pni)  # ACK
+        yield memoryview(data)[1:]
 
-            for i in itertools.count(start=1):  # pragma: no branch
-                try:
-                    data = self.clf.exchange(data, timeout)
-                    if len(data) == 0:
-                        raise nfc.clf.TransmissionError
-                    break
-                except nfc.clf.TransmissionError:
-                    if i <= self.n_retry_ack:
-                        log.warning("ISO-DEP transmission error  (#%d)" % i)
-                        data = bytearray([0xA2 | self.pni])
-                    else:
-                        log.error("ISO-DEP unrecoverable transmission error")
-                        raise Type4TagCommandError(nfc.tag.RECEIVE_ERROR)
-                except nfc.clf.TimeoutError:
-                    if i <= self.n_retry_ack:
-                        log.warning("ISO-DEP timeout error (#%d)" % i)
-                        data = bytearray([0xA2 | self.pni])
-                    else:
-                        log.error("ISO-DEP unrecoverable timeout error")
-                        raise Type4TagCommandError(nfc.tag.TIMEOUT_ERROR)
-                except nfc.clf.ProtocolError:
-                    log.error("ISO-DEP unrecoverable protocol error")
-                    raise Type4TagCommandError(nfc.tag.PROTOCOL_ERROR)
+        while bool(data[0] & 0b00010000):
+            frame = bytearray([0xA2 | self.pni])  # ACK
+            data = self._transceive(frame, timeout, self.n_retry_ack, 0xA2)
 
             if data[0] & 0x01 != self.pni:
                 log.error("ISO-DEP protocol error: block number")
                 raise Type4TagCommandError(nfc.tag.PROTOCOL_ERROR)
 
-            response = response + data[1:]
             self.pni = (self.pni + 1) % 2
-
-        return response
+            yield memoryview(data)[1:]
+
+    def _transceive(self, frame, timeout, n_retry, r_block):
+        # Send the frame and return the response block. Lost or
+        # broken responses are requested again up to n_retry times
+        # with the R-block (NAK or ACK) that is correct for the
+        # current phase. S(WTX) requests are answered with the same
+        # multiplier and extend only the time until the next block.
+        data, wait, errors = frame, timeout, 0
+        while True:
+            try:
+                data = self.clf.exchange(data, wait)
+                wait = timeout
+                if len(data) == 0:
+                    raise nfc.clf.TransmissionError
+                if data[0] & 0b11111110 == 0b11110010:  # WTX
+                    wtxm = data[1] & 0x3F if len(data) > 1 else 0
+                    if not 0 < wtxm < 60:
+                        log.error("ISO-DEP protocol error: invalid wtxm")
+                        raise Type4TagCommandError(nfc.tag.PROTOCOL_ERROR)
+                    log.debug("ISO-DEP waiting time extension")
+                    wait = min(wtxm * self.fwt, self.max_fwt)
+                    data = bytearray([data[0], wtxm])
+                    continue
+                if r_block == 0xB2 and data[0] == 0xA2 | (~self.pni & 1):
+                    errors += 1
+                    if errors > n_retry:
+                        log.error("ISO-DEP too many retransmit requests")
+                        raise Type4TagCommandError(nfc.tag.PROTOCOL_ERROR)
+                    log.debug("ISO-DEP retransmit after ack")
+                    data = frame
+                    continue
+                return data
+            except nfc.clf.TransmissionError:
+                errors += 1
+                if errors <= n_retry:
+                    log.warning("ISO-DEP transmission error (#%d)" % errors)
+                    data = bytearray([r_block | self.pni])
+                else:
+                    log.error("ISO-DEP unrecoverable transmission error")
+                    raise Type4TagCommandError(nfc.tag.RECEIVE_ERROR)
+            except nfc.clf.TimeoutError:
+                errors += 1
+                if errors <= n_retry:
+                    log.warning("ISO-DEP timeout error (#%d)" % errors)
+                    data = bytearray([r_block | self.pni])
+                else:
+                    log.error("ISO-DEP unrecoverable timeout error")
+                    raise Type4TagCommandError(nfc.tag.TIMEOUT_ERROR)
+            except nfc.clf.ProtocolError:
+                log.error("ISO-DEP unrecoverable protocol error")
+                raise Type4TagCommandError(nfc.tag.PROTOCOL_ERROR)
 
 
 class Type4Tag(nfc.tag.Tag):
@@ -184,6 +204,12 @@ class Type4Tag(nfc.tag.Tag):
     for Type A and B modulation and uses ISO/IEC 7816-4 command and
     response APDUs.
 
+    The ISO-DEP activation negotiates the largest frame size the
+    local device can receive and, up to the *max_bitrate* given to
+    the constructor, the highest bitrate that the tag supports in
+    both directions. The results are available as the :attr:`fsd`,
+    :attr:`fsc` and :attr:`bitrate` attributes.
+
     """
     TYPE = "Type4Tag"
 
@@ -210,6 +236,10 @@ class Type4Tag(nfc.tag.Tag):
             except Type4TagCommandError:
                 log.debug("failed to select " + hexlify(fid))
 
+        @staticmethod
+        def _extended_length(mle, mlc):
+            return mle > 256 or mlc > 255
+
         def _read_binary(self, offset, size):
             (p1, p2) = pack(">H", offset)
             max_data = min(self._max_le, size)
@@ -272,6 +302,16 @@ class Type4Tag(nfc.tag.Tag):
             log.debug("ndef file read flag is %d", rf)
             log.debug("ndef file write flag is %d", wf)
 
+            # Response data above 256 and command data above 255 byte
+            # require extended length fields, a tag that announces
+            # such sizes in the capability container supports them.
+            # READ BINARY and UPDATE BINARY then transfer up to MLe or
+            # MLc byte per command and rely on ISO-DEP chaining.
+            extended_length_support = self._extended_length(mle, mlc)
+            log.debug("extended length support is %s",
+                      extended_length_support)
+
+            self.tag._extended_length_support = extended_length_support
             self._max_le = mle
             self._max_lc = mlc
             self._capacity = mfs - tag + 2
@@ -283,6 +323,9 @@ class Type4Tag(nfc.tag.Tag):
             return True
 
         def _read_ndef_data(self):
+            return self._join_ndef_data(self._iter_ndef_data())
+
+        def _iter_ndef_data(self):
             log.debug("read ndef data")
 
             try:
@@ -304,15 +347,19 @@ class Type4Tag(nfc.tag.Tag):
                 nlen = unpack(lfmt, nlen)[0]
                 log.debug("ndef data length is {0}".format(nlen))
 
-                data = bytearray()
-                while len(data) < nlen:
-                    offset = self._nlen_size + len(data)
-                    data += self._read_binary(offset, nlen - len(data))
-
             except Type4TagCommandError:
                 return None
-            else:
-                return data
+
+            def read_ndef_file():
+                # Yield the response data of each READ BINARY command.
+                offset = 0
+                while offset < nlen:
+                    data = self._read_binary(
+                        self._nlen_size + offset, nlen - offset)
+                    offset += len(data)
+                    yield data
+
+            return (nlen, read_ndef_file())
 
         def _write_ndef_data(self, data):
             log.debug("write ndef data")
@@ -334,6 +381,27 @@ class Type4Tag(nfc.tag.Tag):
 
             return True
 
+        def _cache_state(self):
+            # The probe is the NLEN field of the ndef file. The state
+            # has the capability data needed to select and access the
+            # ndef file without reading the capability container.
+            lfmt = ">I" if self._nlen_size == 4 else ">H"
+            state = dict((name, getattr(self, name)) for name in (
+                '_aid', '_ndef_file', '_max_le', '_max_lc', '_nlen_size',
+                '_capacity', '_readable', '_writeable', '_data'))
+            return (pack(lfmt, len(self._data)), copy.deepcopy(state))
+
+        def _probe_ndef_data(self, state):
+            self._aid, self._max_le = state['_aid'], state['_max_le']
+            self.tag._extended_length_support = self._extended_length(
+                state['_max_le'], state['_max_lc'])
+            try:
+                self.tag.send_apdu(0, 0xA4, 0x04, 0x00, self._aid)
+                if self._select_fid(state['_ndef_file']):
+                    return bytes(self._read_binary(0, state['_nlen_size']))
+            except Type4TagCommandError:
+                pass
+
         def _wipe_ndef_data(self, wipe=None):
             lfmt = ">I" if self._nlen_size == 4 else ">H"
             nlen = bytearray(pack(lfmt, 0))
@@ -499,18 +567,40 @@ class Type4Tag(nfc.tag.Tag):
         s = "{tag.__class__.__name__} MIU={tag._dep.miu} FWT={tag._dep.fwt:f}"
         return s.format(tag=self)
 
+    # The frame sizes for FSDI and FSCI values 0 to 8.
+    _fsd = (16, 24, 32, 40, 48, 64, 96, 128, 256)
+
+    def _select_fsdi(self):
+        # Return the index of the largest frame size that the local
+        # device can receive.
+        max_recv_data_size = self.clf.max_recv_data_size
+        if max_recv_data_size < 256:
+            log.warning("{0} does not support fsd 256".format(self.clf))
+        return max([fsdi for fsdi, fsd in enumerate(self._fsd)
+                    if fsd <= max_recv_data_size] or [0])
+
+    @staticmethod
+    def _select_bitrate(capability, max_bitrate):
+        # Return the highest bitrate up to max_bitrate that the tag
+        # supports in both directions, the capability is TA(1) from
+        # the ATS or the bit rate capability byte of SENSB_RES. Bits
+        # 5 to 7 are for 212, 424 and 848 kbps from tag to reader,
+        # bits 1 to 3 for the same bitrates from reader to tag.
+        bitrate = 106
+        for i, kbps in enumerate((212, 424, 848)):
+            if kbps <= max_bitrate and capability & (0x11 << i) == 0x11 << i:
+                bitrate = kbps
+        return bitrate
+
 
 class Type4ATag(Type4Tag):
-    def __init__(self, clf, target):
+    def __init__(self, clf, target, max_bitrate=106):
         super(Type4ATag, self).__init__(clf, target)
         self._nfcid = bytearray(target.sdd_res)
 
+        fsdi = self._select_fsdi()
         log.debug("send RATS command to activate the Type 4A Tag")
-        if self.clf.max_recv_data_size < 256:
-            log.warning("{0} does not support fsd 256".format(self.clf))
-            rats_cmd = bytearray.fromhex("E0 70")
-        else:
-            rats_cmd = bytearray.fromhex("E0 80")
+        rats_cmd = bytearray([0xE0, fsdi << 4])
         rats_res = self.clf.exchange(rats_cmd, timeout=0.03)
         log.debug("rcvd RATS response: {0}".format(hexlify(rats_res)))
 
@@ -532,23 +622,47 @@ class Type4ATag(Type4Tag):
         log.debug("max command frame size is {0:d} byte".format(fsc))
         log.debug("max frame waiting time is {0:f}".format(fwt))
 
+        # The interface byte TA(1) is present if bit 5 of the format
+        # byte T0 is set and has the bitrates supported by the tag.
+        ta = rats_res[2] if rats_res[1] & 0x10 and len(rats_res) > 2 else 0
+        bitrate = self._select_bitrate(ta, max_bitrate)
+        if bitrate > 106:
+            dxi = (212, 424, 848).index(bitrate) + 1
+            pps_cmd = bytearray([0xD0, 0x11, dxi << 2 | dxi])
+            log.debug("send PPS command for {0} kbps".format(bitrate))
+            try:
+                pps_res = self.clf.exchange(pps_cmd, timeout=fwt)
+            except nfc.clf.CommunicationError as error:
+                log.debug("PPS failed with {0!r}".format(error))
+                pps_res = None
+            if pps_res == pps_cmd[0:1]:
+                self.target.brty = "{0}A".format(bitrate)
+            else:
+                log.warning("PPS not accepted, stay at 106 kbps")
+                bitrate = 106
+
+        self.bitrate, self.fsc, self.fsd = bitrate, fsc, self._fsd[fsdi]
         self._dep = IsoDepInitiator(clf, fsc, fwt)
         self._extended_length_support = False
 
 
 class Type4BTag(Type4Tag):
-    def __init__(self, clf, target):
+    def __init__(self, clf, target, max_bitrate=106):
         super(Type4BTag, self).__init__(clf, target)
         self._nfcid = bytearray(target.sensb_res[1:5])
 
+        # The ATTRIB command sets the frame size the reader can
+        # receive and the bitrate in both directions as param 2.
+        fsdi = self._select_fsdi()
+        bitrate = self._select_bitrate(target.sensb_res[9], max_bitrate)
+        dxi = (106, 212, 424, 848).index(bitrate)
+        param2 = bytearray([dxi << 6 | dxi << 4 | fsdi])
         log.debug("send ATTRIB command to activate the Type 4B Tag")
-        if self.clf.max_recv_data_size < 256:
-            log.warning("{0} does not support fsd 256".format(self.clf))
-            attrib_cmd = b'\x1D' + self._nfcid + b'\x00\x07\x01\x00'
-        else:
-            attrib_cmd = b'\x1D' + self._nfcid + b'\x00\x08\x01\x00'
+        attrib_cmd = b'\x1D' + self._nfcid + b'\x00' + param2 + b'\x01\x00'
         attrib_res = self.clf.exchange(attrib_cmd, timeout=0.03)
         log.debug("rcvd ATTRIB response {0}".format(hexlify(attrib_res)))
+        if bitrate > 106:
+            self.target.brty = "{0}B".format(bitrate)
 
         fsci, fwti = target.sensb_res[10] >> 4, target.sensb_res[11] >> 4
         if fsci > 8:
@@ -568,12 +682,13 @@ class Type4BTag(Type4Tag):
         log.debug("max command frame size is {0:d} byte".format(fsc))
         log.debug("max frame waiting time is {0:f}".format(fwt))
 
+        self.bitrate, self.fsc, self.fsd = bitrate, fsc, self._fsd[fsdi]
         self._dep = IsoDepInitiator(clf, fsc, fwt)
         self._extended_length_support = False
 
 
-def activate(clf, target):
+def activate(clf, target, max_bitrate=106):
     if target.brty.endswith('A'):
-        return Type4ATag(clf, target)
+        return Type4ATag(clf, target, max_bitrate)
     if target.brty.endswith('B'):
-        return Type4BTag(clf, target)
+        return Type4BTag(clf, target, max_bitrate)
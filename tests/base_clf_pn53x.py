@@ -7,6 +7,9 @@ import nfc.clf.pn53x
 
 import os
 import errno
+import timeit
+import logging
+import itertools
 import pytest
 from pytest_mock import mocker  # noqa: F401
 from mock import call
@@ -384,6 +387,23 @@ class TestChipset(object):
             chipset.in_communicate_thru(b'', 1.1)
         assert excinfo.value.errno == 1
 
+    @pytest.mark.benchmark
+    def test_command_benchmark(self, chipset):
+        frames = itertools.cycle([ACK(), RSP('41 00' + 16 * 'aa'),
+                                  ACK(), RSP('43 00' + 16 * 'aa')])
+        chipset.transport.read = lambda timeout: bytearray(next(frames))
+        chipset.transport.write = lambda frame: None
+        data = bytearray(16)
+
+        def exchange():
+            chipset.in_data_exchange(data, 1.0)
+            chipset.in_communicate_thru(data, 1.0)
+
+        exchange_time = min(timeit.repeat(exchange, repeat=3, number=1000))
+        logging.info("%s command: %.1f us per exchange", chipset.__module__,
+                     1E3 * exchange_time / 2)
+        assert chipset.in_data_exchange(data, 1.0) == (16 * HEX('aa'), False)
+
     def test_tg_set_general_bytes(self, chipset):
         chipset.transport.read.side_effect = [ACK(), RSP('93 00')]
         assert chipset.tg_set_general_bytes(b'12') is None
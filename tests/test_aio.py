@@ -0,0 +1,182 @@
+# -*- coding: latin-1 -*-
+from __future__ import absolute_import, division
+
+import nfc
+import nfc.clf
+import nfc.tag
+
+import errno
+import concurrent.futures
+import threading
+import pytest
+from pytest_mock import mocker  # noqa: F401
+
+import logging
+logging.basicConfig(level=logging.DEBUG)
+logging_level = logging.getLogger().getEffectiveLevel()
+logging.getLogger("nfc.clf").setLevel(logging_level)
+
+asyncio = pytest.importorskip("nfc.aio").asyncio
+
+
+def HEX(s):
+    return bytearray.fromhex(s)
+
+
+@pytest.fixture()
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture()  # noqa: F811
+def device(mocker):
+    device = mocker.Mock(spec=nfc.clf.device.Device)
+    device.path = "usb:001:001"
+    device.vendor_name = "Vendor"
+    device.product_name = "Product"
+    device.sense_tta.return_value = None
+    device.sense_ttb.return_value = None
+    device.sense_ttf.return_value = None
+    device.sense_dep.return_value = None
+    return device
+
+
+@pytest.fixture()  # noqa: F811
+def clf(mocker, loop, device):
+    mocker.patch('nfc.clf.device.connect').return_value = device
+    clf = loop.run_until_complete(nfc.aio.open('usb', loop=loop))
+    assert isinstance(clf, nfc.aio.ContactlessFrontend)
+    assert isinstance(clf.clf, nfc.clf.ContactlessFrontend)
+    assert clf.loop is loop
+    return clf
+
+
+def test_open_fails(mocker, loop):  # noqa: F811
+    mocker.patch('nfc.clf.device.connect').return_value = None
+    with pytest.raises(IOError) as excinfo:
+        loop.run_until_complete(nfc.aio.open('usb', loop=loop))
+    assert excinfo.value.errno == errno.ENODEV
+
+
+def test_close(clf, loop, device):
+    assert str(clf) == "Vendor Product on usb:001:001"
+    assert loop.run_until_complete(clf.close()) is None
+    assert clf.clf.device is None
+    device.close.assert_called_once_with()
+
+
+def test_sense(clf, loop, device):
+    target = nfc.clf.RemoteTarget('106A', sens_res=HEX('4400'),
+                                  sdd_res=HEX('0416C6C2D73881'),
+                                  sel_res=HEX('00'))
+    device.sense_tta.return_value = target
+    found = loop.run_until_complete(
+        clf.sense(nfc.clf.RemoteTarget('106A'), iterations=1))
+    assert found is target
+
+
+def test_sense_concurrently(mocker, loop):  # noqa: F811
+    devices = [mocker.Mock(spec=nfc.clf.device.Device) for _ in range(4)]
+    for device in devices:
+        device.sense_ttf.return_value = None
+    mocker.patch('nfc.clf.device.connect').side_effect = devices
+    clfs = loop.run_until_complete(asyncio.gather(
+        *[nfc.aio.open('usb', loop=loop) for _ in devices], loop=loop))
+    target = nfc.clf.RemoteTarget('212F')
+    result = loop.run_until_complete(asyncio.gather(
+        *[clf.sense(target) for clf in clfs], loop=loop))
+    assert result == [None, None, None, None]
+    assert [d.sense_ttf.call_count for d in devices] == [1, 1, 1, 1]
+
+
+def test_listen(clf, loop, device):
+    device.listen_ttf.return_value = None
+    target = nfc.clf.LocalTarget('212F')
+    assert loop.run_until_complete(clf.listen(target, 0.1)) is None
+    device.listen_ttf.assert_called_once_with(target, 0.1)
+
+
+def test_exchange(clf, loop, device):
+    clf.clf.target = nfc.clf.RemoteTarget('106A')
+    device.send_cmd_recv_rsp.return_value = HEX('0102')
+    rsp = loop.run_until_complete(clf.exchange(HEX('3000'), 0.1))
+    assert rsp == HEX('0102')
+
+
+def test_connect(clf, loop, device):
+    result = loop.run_until_complete(
+        clf.connect(rdwr={'iterations': 1}, terminate=lambda: True))
+    assert result is None
+
+
+def test_tags(mocker, clf, loop, device):  # noqa: F811
+    target = nfc.clf.RemoteTarget('212F', sensf_res=HEX(
+        '01 0102030405060708 FFFFFFFFFFFFFFFF 12FC'))
+    device.sense_ttf.side_effect = [target, None, IOError(errno.EIO, "")]
+    tag = mocker.Mock(spec=nfc.tag.Tag)
+    mocker.patch('nfc.tag.activate').return_value = tag
+    tags = clf.tags(targets=['212F'], iterations=1)
+    assert tags.__aiter__() is tags
+    assert loop.run_until_complete(tags.__anext__()) is tag
+    with pytest.raises(nfc.aio.StopAsyncIteration):
+        loop.run_until_complete(tags.__anext__())
+    assert loop.run_until_complete(tags.next()) is None
+
+
+def test_tags_close(clf, loop, device):
+    tags = clf.tags(targets=['212F'])
+    tags.close()
+    assert loop.run_until_complete(tags.next()) is None
+    assert device.sense_ttf.call_count == 0
+
+
+def test_tags_error(mocker, clf, loop, device):  # noqa: F811
+    mocker.patch('nfc.clf.ContactlessFrontend.connect').side_effect = \
+        ValueError()
+    tags = clf.tags(targets=['212F'])
+    with pytest.raises(ValueError):
+        loop.run_until_complete(tags.next())
+    assert loop.run_until_complete(tags.next()) is None
+
+
+def test_open_cancelled(mocker, loop, device):  # noqa: F811
+    opening, release = threading.Event(), threading.Event()
+
+    def connect(path):
+        opening.set()
+        release.wait(1)
+        return device
+
+    mocker.patch('nfc.clf.device.connect').side_effect = connect
+    future = nfc.aio.open('usb', loop=loop)
+    loop.run_until_complete(loop.run_in_executor(None, opening.wait, 1))
+    future.cancel()
+    release.set()
+    while device.close.call_count == 0:
+        loop.run_until_complete(asyncio.sleep(0.01, loop=loop))
+    assert future.cancelled()
+    device.close.assert_called_once_with()
+
+
+def test_tags_timeout(mocker, loop, device):  # noqa: F811
+    mocker.patch('nfc.clf.device.connect').return_value = device
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    clf = loop.run_until_complete(
+        nfc.aio.open('usb', loop=loop, executor=executor))
+    exception_handler = mocker.Mock()
+    loop.set_exception_handler(exception_handler)
+    tags = clf.tags(targets=['212F'], iterations=1, interval=0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        loop.run_until_complete(
+            asyncio.wait_for(tags.next(), 0.05, loop=loop))
+    assert tags._closed.is_set()
+    # with a single worker this returns after the search has stopped
+    loop.run_until_complete(clf.run(lambda: None))
+    loop.run_until_complete(asyncio.sleep(0, loop=loop))
+    sense_count = device.sense_ttf.call_count
+    loop.run_until_complete(asyncio.sleep(0.05, loop=loop))
+    assert device.sense_ttf.call_count == sense_count
+    assert exception_handler.call_count == 0
+    assert loop.run_until_complete(tags.next()) is None
@@ -6,6 +6,7 @@ import nfc.clf
 import nfc.clf.device
 
 import sys
+import timeit
 import pytest
 from pytest_mock import mocker  # noqa: F401
 
@@ -117,6 +118,58 @@ class TestDevice(object):
     def test_check_crc_b(self, device):
         assert device.check_crc_b(HEX('0000470F')) is True
 
+    def test_check_crc_a_frames(self, device):
+        frames = [HEX('0000A01E'), HEX('0000A01F'), HEX('00'), HEX('6363')]
+        assert device.check_crc_a_frames(frames) == [True, False, False, True]
+
+    def test_check_crc_b_frames(self, device):
+        frames = [HEX('0000470F'), HEX('0000470E'), HEX(''), HEX('0000')]
+        assert device.check_crc_b_frames(frames) == [True, False, False, True]
+
+
+def calculate_crc_bitwise(data, size, reg):
+    # The bit-serial reference algorithm from ISO/IEC 14443-3 Annex B.
+    for octet in data[:size]:
+        for pos in range(8):
+            bit = (reg ^ ((octet >> pos) & 1)) & 1
+            reg = reg >> 1
+            if bit:
+                reg = reg ^ 0x8408
+    return reg
+
+
+@pytest.mark.parametrize("data", [
+    HEX(''), HEX('00'), HEX('FF'), HEX('3000'), HEX('0102030405060708'),
+    bytearray(range(256)), bytearray(range(255, -1, -1)) * 4,
+])
+@pytest.mark.parametrize("reg", [0x6363, 0xFFFF, 0x0000])
+def test_calculate_crc(data, reg):
+    assert nfc.clf.device.calculate_crc(data, len(data), reg) == \
+        calculate_crc_bitwise(data, len(data), reg)
+    assert nfc.clf.device.calculate_crc(data, len(data)//2, reg) == \
+        calculate_crc_bitwise(data, len(data)//2, reg)
+
+
+@pytest.mark.benchmark
+def test_calculate_crc_benchmark():
+    data = bytearray(range(256))
+    table = timeit.Timer(
+        lambda: nfc.clf.device.calculate_crc(data, len(data), 0x6363))
+    bitwise = timeit.Timer(
+        lambda: calculate_crc_bitwise(data, len(data), 0x6363))
+    table_time = min(table.repeat(repeat=3, number=100))
+    bitwise_time = min(bitwise.repeat(repeat=3, number=100))
+    logging.info("calculate_crc 256 byte: table %.1f us, bitwise %.1f us",
+                 1E4 * table_time, 1E4 * bitwise_time)
+    assert table_time < bitwise_time
+
+
+@pytest.fixture(autouse=True)
+def discovery_cache():
+    nfc.clf.device.forget()
+    yield nfc.clf.device.discovery_cache
+    nfc.clf.device.forget()
+
 
 @pytest.mark.parametrize("found, instance_type", [  # noqa: F811
     (None, type(None)),
@@ -203,6 +256,50 @@ def test_connect_tty_driver_init_error(mocker):  # noqa: F811
     sys.platform = sys_platform
 
 
+def test_connect_usb_from_cache(mocker, device, discovery_cache):  # noqa: F811
+    sys_platform, sys.platform = sys.platform, 'testing'
+    usb = mocker.patch('nfc.clf.transport.USB')
+    find = mocker.patch('nfc.clf.transport.USB.find')
+    find.return_value = [(0x054c, 0x0193, 1, 2)]
+    mocker.patch('nfc.clf.transport.TTY')
+    mocker.patch('nfc.clf.transport.TTY.find').return_value = None
+    init = mocker.patch('nfc.clf.pn531.init')
+    init.return_value = device
+    assert nfc.clf.device.connect('usb') is device
+    assert discovery_cache == {'usb': ('usb', (1, 2), 'pn531')}
+    assert nfc.clf.device.connect('usb') is device
+    assert find.call_count == 1 and init.call_count == 2
+    assert usb.call_args_list == 2 * [mocker.call(1, 2)]
+    assert device.path == "usb:001:002"
+    init.side_effect = [IOError(), device]
+    assert nfc.clf.device.connect('usb') is device
+    assert find.call_count == 2 and init.call_count == 4
+    nfc.clf.device.forget('usb')
+    assert discovery_cache == {}
+    sys.platform = sys_platform
+
+
+def test_connect_tty_from_cache(mocker, device, discovery_cache):  # noqa: F811
+    mocker.patch('nfc.clf.transport.USB')
+    mocker.patch('nfc.clf.transport.USB.find').return_value = None
+    tty = mocker.patch('nfc.clf.transport.TTY')
+    find = mocker.patch('nfc.clf.transport.TTY.find')
+    find.return_value = (['/dev/ttyS0', '/dev/ttyS1'], '', True)
+    arygon = mocker.patch('nfc.clf.arygon.init')
+    arygon.side_effect = IOError()
+    pn532 = mocker.patch('nfc.clf.pn532.init')
+    pn532.side_effect = [IOError(), device, device] + 3 * [IOError()]
+    assert nfc.clf.device.connect('tty') is device
+    assert discovery_cache == {'tty': ('tty', '/dev/ttyS1', 'pn532')}
+    assert nfc.clf.device.connect('tty') is device
+    assert find.call_count == 1 and arygon.call_count == 2
+    assert device.path == '/dev/ttyS1'
+    assert nfc.clf.device.connect('tty') is None
+    assert discovery_cache == {}
+    assert arygon.call_count == 4 and pn532.call_count == 6
+    assert tty.return_value.close.call_count == 8
+
+
 def test_connect_udp(mocker, device):  # noqa: F811
     mocker.patch('nfc.clf.transport.USB')
     mocker.patch('nfc.clf.transport.USB.find').return_value = None
@@ -237,6 +237,56 @@ class TestContactlessFrontend(object):
         rdwr_options = {'iterations': 1}
         assert clf.connect(rdwr=rdwr_options, terminate=terminate) is None
 
+    def test_connect_rdwr_recover_from_io_error(self, clf, terminate,
+                                                device_connect, device):
+        terminate.side_effect = [False, False, False, True]
+        clf.device.sense_tta.side_effect = [IOError(errno.EIO, ""), None]
+        recovery = nfc.clf.Recovery()
+        rdwr_options = {'iterations': 1}
+        assert clf.connect(rdwr=rdwr_options, recover=recovery,
+                           terminate=terminate) is None
+        assert device_connect.call_count == 2
+        device_connect.assert_called_with('test')
+        assert device.close.call_count == 1
+        assert recovery.recoveries == 1 and recovery.failures == 0
+        assert recovery.attempts == 1 and recovery.downtime >= 0
+        assert str(recovery).startswith("recoveries 1 failures 0 attempts 1")
+
+    def test_connect_rdwr_recover_retries(self, clf, terminate,
+                                          device_connect, device):
+        clf.device.sense_tta.side_effect = IOError(errno.ENODEV, "")
+        device_connect.return_value = None
+        recovery = nfc.clf.Recovery(retries=2, interval=0.001)
+        rdwr_options = {'iterations': 1}
+        assert clf.connect(rdwr=rdwr_options, recover=recovery,
+                           terminate=terminate) is False
+        assert device_connect.call_count == 4
+        assert recovery.recoveries == 0 and recovery.failures == 1
+        assert recovery.attempts == 3
+        assert recovery.downtime_max == recovery.downtime > 0
+
+    def test_connect_rdwr_recover_other_error(self, clf, terminate,
+                                              device_connect):
+        clf.device.sense_tta.side_effect = IOError(errno.EACCES, "")
+        recovery = nfc.clf.Recovery()
+        rdwr_options = {'iterations': 1}
+        assert clf.connect(rdwr=rdwr_options, recover=recovery,
+                           terminate=terminate) is False
+        assert device_connect.call_count == 1
+        assert recovery.recoveries == recovery.failures == 0
+
+    def test_connect_rdwr_recover_terminated(self, clf, terminate,
+                                             device_connect):
+        terminate.side_effect = [False, False, True, True]
+        clf.device.sense_tta.side_effect = IOError(errno.EIO, "")
+        device_connect.side_effect = IOError(errno.EBUSY, "")
+        recovery = nfc.clf.Recovery(interval=10)
+        rdwr_options = {'iterations': 1}
+        assert clf.connect(rdwr=rdwr_options, recover=recovery,
+                           terminate=terminate) is False
+        assert device_connect.call_count == 2
+        assert recovery.failures == 1 and recovery.attempts == 1
+
     def _test_connect_card_defaults(self, clf, terminate):
         terminate.side_effect = [False, True]
         card_options = {'on-startup': lambda _: nfc.clf.LocalTarget('212F')}
@@ -455,6 +505,106 @@ class TestContactlessFrontend(object):
         assert isinstance(res_target, nfc.clf.RemoteTarget)
         clf.device.sense_ttb.assert_called_once_with(req_target)
 
+    def test_sense_with_schedule_order(self, clf):
+        targets = [nfc.clf.RemoteTarget(brty)
+                   for brty in ('106A', '106B', '212F')]
+        found = nfc.clf.RemoteTarget('212F', sensf_res=HEX(
+            '01 0102030405060708 FFFFFFFFFFFFFFFF 12FC'))
+        clf.device.sense_ttf.return_value = found
+        schedule = nfc.clf.SenseScheduler()
+        assert clf.sense(*targets, schedule=schedule) is found
+        assert clf.device.sense_tta.call_count == 1
+        assert clf.device.sense_ttb.call_count == 1
+        assert clf.sense(*targets, schedule=schedule) is found
+        assert clf.device.sense_tta.call_count == 1
+        assert clf.device.sense_ttb.call_count == 1
+        assert clf.device.sense_ttf.call_count == 2
+        statistics = schedule.statistics()
+        assert sorted(statistics) == ['106A', '106B', '212F']
+        assert statistics['212F'].hits == statistics['212F'].polls == 2
+        assert statistics['106A'].hits == 0
+        assert statistics['106A'].polls == 1
+        assert statistics['212F'].mean_time_to_detect > 0
+        assert statistics['106A'].mean_time_to_detect == 0
+        assert str(schedule).startswith("106A hits 0/1 poll ")
+
+    def test_sense_with_schedule_decay(self, clf):
+        targets = [nfc.clf.RemoteTarget('106A'),
+                   nfc.clf.RemoteTarget('212F')]
+        found_a = nfc.clf.RemoteTarget('106A', sens_res=HEX('4400'),
+                                       sel_res=HEX('00'),
+                                       sdd_res=HEX('0416C6C2D73881'))
+        found_f = nfc.clf.RemoteTarget('212F')
+        schedule = nfc.clf.SenseScheduler(decay=0.5)
+        clf.device.sense_tta.return_value = found_a
+        assert clf.sense(*targets, schedule=schedule) is found_a
+        clf.device.sense_tta.return_value = None
+        clf.device.sense_ttf.return_value = found_f
+        assert clf.sense(*targets, schedule=schedule) is found_f
+        assert clf.device.sense_tta.call_count == 2
+        assert clf.sense(*targets, schedule=schedule) is found_f
+        assert clf.device.sense_tta.call_count == 2
+        assert schedule.statistics('212F').score > \
+            schedule.statistics('106A').score
+
+    def test_sense_with_schedule_intervals(self, clf):
+        targets = [nfc.clf.RemoteTarget('106A'),
+                   nfc.clf.RemoteTarget('106B')]
+        schedule = nfc.clf.SenseScheduler(intervals={'106B': 10})
+        assert clf.sense(*targets, iterations=3, interval=0,
+                         schedule=schedule) is None
+        assert clf.device.sense_tta.call_count == 3
+        assert clf.device.sense_ttb.call_count == 1
+        assert schedule.statistics('106B').polls == 1
+
+    def test_connect_rdwr_with_schedule(self, clf, terminate):
+        terminate.side_effect = [False, True]
+        schedule = nfc.clf.SenseScheduler()
+        rdwr_options = {'iterations': 1, 'schedule': schedule}
+        assert clf.connect(rdwr=rdwr_options, terminate=terminate) is None
+        assert sorted(schedule.statistics()) == ['106A', '106B', '212F']
+
+    def test_connect_rdwr_with_ndef_cache(self, clf, terminate):
+        terminate.side_effect = [False, True]
+        target = nfc.clf.RemoteTarget('106A')
+        target.sens_res = HEX('4400')
+        target.sel_res = HEX('00')
+        target.sdd_res = HEX('0416C6C2D73881')
+        clf.device.sense_tta.return_value = target
+        ndef_cache = nfc.tag.NdefCache()
+        tags = []
+        rdwr_options = {'iterations': 1, 'targets': ['106A'],
+                        'ndef-cache': ndef_cache,
+                        'on-connect': lambda tag: tags.append(tag)}
+        tag = clf.connect(rdwr=rdwr_options, terminate=terminate)
+        assert tag is tags[0] and tag.ndef_cache is ndef_cache
+
+    def test_connect_rdwr_with_iso_dep_bitrate(self, clf, terminate, mocker):
+        terminate.side_effect = [False, True]
+        target = nfc.clf.RemoteTarget('106B')
+        clf.device.sense_ttb.return_value = target
+        activate = mocker.patch('nfc.tag.activate')
+        rdwr_options = {'iterations': 1, 'targets': ['106B'],
+                        'iso-dep-bitrate': 424}
+        assert clf.connect(rdwr=rdwr_options, terminate=terminate)
+        activate.assert_called_once_with(
+            clf, target, product_cache=None, max_bitrate=424)
+
+    def test_connect_rdwr_with_product_cache(self, clf, terminate, mocker):
+        terminate.side_effect = [False, True]
+        target = nfc.clf.RemoteTarget('106A')
+        target.sens_res = HEX('4400')
+        target.sel_res = HEX('00')
+        target.sdd_res = HEX('0416C6C2D73881')
+        clf.device.sense_tta.return_value = target
+        activate = mocker.patch('nfc.tag.activate')
+        product_cache = nfc.tag.ProductCache()
+        rdwr_options = {'iterations': 1, 'targets': ['106A'],
+                        'product-cache': product_cache}
+        assert clf.connect(rdwr=rdwr_options, terminate=terminate)
+        activate.assert_called_once_with(
+            clf, target, product_cache=product_cache, max_bitrate=106)
+
     #
     # LISTEN
     #
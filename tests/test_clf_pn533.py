@@ -230,6 +230,15 @@ class TestDevice(base_clf_pn53x.TestDevice):
         assert device.product_name == "Device"
         assert transport.read.call_count == 32
 
+    def test_init_with_usb_async(self, mocker, transport):  # noqa: F811
+        mocker.patch('nfc.clf.pn533.usb_async', True)
+        mocker.patch.object(transport, 'start_async', autospec=True)
+        transport.read.side_effect = [ACK(), ERR()]       # Diagnose
+        with pytest.raises(IOError):
+            nfc.clf.pn533.init(transport)
+        assert transport.start_async.mock_calls == [call()]
+        assert transport.write.mock_calls[0] == call(ACK())
+
     def reg_rsp(self, hexdata):
         return RSP('07 00' + hexdata)
 
@@ -0,0 +1,195 @@
+# -*- coding: latin-1 -*-
+from __future__ import absolute_import, division
+
+import nfc
+import nfc.clf
+import nfc.clf.pool
+import nfc.tag
+
+import Queue
+import pytest
+import threading
+import time
+from pytest_mock import mocker  # noqa: F401
+
+import logging
+logging.basicConfig(level=logging.DEBUG)
+logging_level = logging.getLogger().getEffectiveLevel()
+logging.getLogger("nfc.clf").setLevel(logging_level)
+
+
+@pytest.fixture()  # noqa: F811
+def device_find(mocker):
+    return mocker.patch('nfc.clf.device.find')
+
+
+@pytest.fixture()  # noqa: F811
+def device_connect(mocker):
+    def connect(path):
+        device = mocker.Mock(spec=nfc.clf.device.Device)
+        device.path = path
+        return device
+    return mocker.patch('nfc.clf.device.connect', side_effect=connect)
+
+
+@pytest.fixture()  # noqa: F811
+def pool(device_find, device_connect):
+    device_find.return_value = ['usb:001:001', 'usb:001:002']
+    pool = nfc.clf.pool.ContactlessFrontendPool('usb')
+    device_find.assert_called_once_with('usb')
+    return pool
+
+
+def test_pool_is_exported():
+    assert nfc.ContactlessFrontendPool is nfc.clf.pool.ContactlessFrontendPool
+
+
+def test_find_paths(mocker):  # noqa: F811
+    mocker.patch('nfc.clf.transport.USB.find').return_value = [
+        (0x054c, 0x0193, 1, 2), (0x0000, 0x0000, 1, 3),
+        (0x054c, 0x06c3, 2, 14)]
+    mocker.patch('nfc.clf.transport.TTY.find').return_value = None
+    assert nfc.clf.device.find('usb') == ['usb:001:002', 'usb:002:014']
+    mocker.patch('nfc.clf.transport.USB.find').return_value = None
+    mocker.patch('nfc.clf.transport.TTY.find').return_value = \
+        (['/dev/ttyUSB0', '/dev/ttyUSB1'], 'pn532', True)
+    assert nfc.clf.device.find('tty:USB:pn532') == \
+        ['tty:USB0:pn532', 'tty:USB1:pn532']
+    mocker.patch('nfc.clf.transport.TTY.find').return_value = \
+        (['COM1'], '', True)
+    assert nfc.clf.device.find('com') == ['com:COM1']
+    mocker.patch('nfc.clf.transport.TTY.find').return_value = None
+    assert nfc.clf.device.find('udp') == ['udp']
+    assert nfc.clf.device.find('xyz') == []
+
+
+class TestContactlessFrontendPool(object):
+    def test_init(self, pool, device_connect):
+        assert pool.paths == ['usb:001:001', 'usb:001:002']
+        assert len(pool.frontends) == 2
+        assert all([isinstance(clf, nfc.ContactlessFrontend)
+                    for clf in pool.frontends])
+        assert str(pool) == \
+            "ContactlessFrontendPool(usb:001:001, usb:001:002)"
+
+    def test_open_again(self, pool, device_find, device_connect):
+        device_find.return_value = ['usb:001:002', 'usb:001:003']
+        assert pool.open('usb') == 1
+        assert pool.paths == ['usb:001:001', 'usb:001:002', 'usb:001:003']
+
+    def test_open_skips_unavailable(self, pool, device_find, device_connect):
+        device_find.return_value = ['tty:USB0', 'tty:USB1']
+        device_connect.side_effect = [None, IOError()]
+        assert pool.open('tty') == 0
+        assert len(pool.frontends) == 2
+
+    def test_open_invalid_path(self, pool):
+        with pytest.raises(TypeError):
+            pool.open(int())
+        with pytest.raises(ValueError):
+            pool.open('')
+
+    def test_close(self, pool):
+        frontends = pool.frontends
+        with pool:
+            pass
+        assert pool.frontends == []
+        assert all([clf.device is None for clf in frontends])
+
+    def test_connect(self, pool, mocker):  # noqa: F811
+        lock = threading.Lock()
+        calls = []
+
+        def connect(self, **options):
+            with lock:
+                calls.append(self.device.path)
+            tag = mocker.Mock(clf=self)
+            if options['rdwr']['on-connect'](tag):
+                options['rdwr']['on-release'](tag)
+            return True
+
+        mocker.patch('nfc.ContactlessFrontend.connect', connect)
+        terminate = mocker.Mock(side_effect=lambda: len(calls) >= 6)
+        on_connect = mocker.Mock(return_value=True)
+        queue = Queue.Queue()
+        counters = pool.connect(rdwr={'on-connect': on_connect},
+                                terminate=terminate, queue=queue)
+        assert on_connect.call_count == len(calls)
+        assert queue.qsize() == 2 * len(calls)
+        path, event, tag = queue.get()
+        assert path in pool.paths and event == 'rdwr.on-connect'
+        assert tag.clf.device.path == path
+        assert sorted(counters.keys()) == pool.paths
+        total = sum([c.connect['rdwr'] for c in counters.values()])
+        assert total == len(calls)
+        for path, counter in counters.items():
+            assert counter.connect_count == calls.count(path)
+            assert counter.release['rdwr'] == calls.count(path)
+            assert counter.errors == 0
+            assert counter.started is None and counter.elapsed > 0
+            assert (counter.connect_rate > 0) == (counter.connect_count > 0)
+            assert str(counter).startswith("connect %d" % calls.count(path))
+
+    def test_connect_error(self, pool, mocker):  # noqa: F811
+        mocker.patch('nfc.ContactlessFrontend.connect').return_value = False
+        counters = pool.connect(rdwr={})
+        assert [c.errors for c in counters.values()] == [1, 1]
+        assert pool.counters('usb:001:001').errors == 1
+
+    def test_connect_without_options(self, pool, mocker):  # noqa: F811
+        mocker.patch('nfc.ContactlessFrontend.connect').return_value = None
+        counters = pool.connect()
+        assert [c.connect_count for c in counters.values()] == [0, 0]
+        assert [c.connect_rate for c in counters.values()] == [0, 0]
+
+    def test_connect_tag_not_released(self, pool, mocker):  # noqa: F811
+        lock = threading.Lock()
+        calls = []
+
+        def connect(self, **options):
+            with lock:
+                calls.append(self.device.path)
+            tag = mocker.Mock(spec=nfc.tag.Tag)
+            type(tag).is_present = mocker.PropertyMock(
+                side_effect=[True, True, False])
+            assert options['rdwr']['on-connect'](tag) is False
+            return tag
+
+        mocker.patch('nfc.ContactlessFrontend.connect', connect)
+        presence = nfc.tag.PresenceCheck(interval=0.001)
+        on_connect = mocker.Mock(return_value=False)
+        on_release = mocker.Mock(return_value=True)
+        terminate = mocker.Mock(side_effect=lambda: len(calls) >= 4)
+        queue = Queue.Queue()
+        counters = pool.connect(rdwr={'on-connect': on_connect,
+                                      'on-release': on_release,
+                                      'presence-check': presence},
+                                terminate=terminate, queue=queue)
+        connects = sum([c.connect['rdwr'] for c in counters.values()])
+        releases = sum([c.release['rdwr'] for c in counters.values()])
+        assert connects == len(calls) and releases == presence.removals
+        assert len(calls) - 2 <= presence.removals <= len(calls)
+        assert on_release.call_count == 0
+        assert queue.qsize() == connects + releases
+
+    def test_connect_interrupted(self, pool, mocker):  # noqa: F811
+        started, finished = [], []
+
+        def connect(self, **options):
+            started.append(self.device.path)
+            while not options['terminate']():
+                time.sleep(0.01)
+            finished.append(self.device.path)
+            return None
+
+        def is_alive():
+            # interrupt when all frontend loops are running
+            while len(started) < len(pool.paths):
+                time.sleep(0.001)
+            raise KeyboardInterrupt
+
+        mocker.patch('nfc.ContactlessFrontend.connect', connect)
+        mocker.patch('threading.Thread.is_alive', side_effect=is_alive)
+        with pytest.raises(KeyboardInterrupt):
+            pool.connect(rdwr={})
+        assert sorted(finished) == pool.paths
@@ -1808,3 +1808,19 @@ def test_driver_init(transport):
     assert isinstance(device, nfc.clf.rcs380.Device)
     assert device.vendor_name == "Manufacturer Name"
     assert device.product_name == "Product Name"
+
+
+def test_driver_init_with_usb_async(mocker, transport):  # noqa: F811
+    mocker.patch('nfc.clf.rcs380.usb_async', True)
+    mocker.patch.object(transport, 'start_async', autospec=True)
+    transport.read.side_effect = [
+        HEX('01020304'), IOError,
+        ACK(), RSP('2b 00'),
+        ACK(), RSP('21 1101'),
+        ACK(), RSP('23 0001'),
+        ACK(), RSP('07 00'),
+        ACK(), RSP('21 1101'),
+    ]
+    device = nfc.clf.rcs380.init(transport)
+    assert isinstance(device, nfc.clf.rcs380.Device)
+    assert transport.start_async.mock_calls == [call()]
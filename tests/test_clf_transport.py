@@ -116,7 +116,12 @@ class TestTTY(object):
         ]
         assert tty.read(0) == b'\x00\x00\xff\x00\xff\x00'
         assert serial.return_value.read.mock_calls == [call(6)]
-        assert tty.tty.timeout == 0.05
+        assert tty.tty.timeout == 0.001
+
+        serial.return_value.read.reset_mock()
+        serial.return_value.read.side_effect = [HEX('0000ff00ff00')]
+        assert tty.read(5) == b'\x00\x00\xff\x00\xff\x00'
+        assert tty.tty.timeout == 0.005
 
         serial.return_value.read.reset_mock()
         serial.return_value.read.side_effect = [
@@ -124,17 +129,24 @@ class TestTTY(object):
         ]
         assert tty.read(51) == b'\x00\x00\xff\x03\xfb\xd5\x01\x02\x00\x00'
         assert serial.return_value.read.mock_calls == [call(6), call(4)]
-        assert tty.tty.timeout == 0.051
+        assert tty.tty.timeout == 0.05 + 2650.0 / 115200
 
         serial.return_value.read.reset_mock()
-        serial.return_value.read.side_effect = [
+        frames = [
             HEX('0000ffffff01'), HEX('01fed5'), bytearray(256) + HEX('2b00'),
         ]
+        timeouts = []
+
+        def read(size):
+            timeouts.append(tty.tty.timeout)
+            return frames.pop(0)
+
+        serial.return_value.read.side_effect = read
         tty.read(100)
         assert serial.return_value.read.mock_calls == [
             call(6), call(3), call(258),
         ]
-        assert tty.tty.timeout == 0.1
+        assert timeouts == [0.1] + 2 * [0.05 + 2650.0 / 115200]
 
         serial.return_value.read.reset_mock()
         serial.return_value.read.side_effect = [HEX('')]
@@ -220,6 +232,39 @@ class TestUSB(object):
         def open(self):
             return MagicMock(spec=nfc.clf.transport.libusb.USBDeviceHandle)
 
+    class Transfer(object):
+        def __init__(self):
+            self.submitted = False
+            self.status = None
+            self.buffer = b''
+
+        def setBulk(self, endpoint, data, callback=None, timeout=0):
+            self.endpoint, self.data = endpoint, data
+            self.callback, self.timeout = callback, timeout
+
+        def submit(self):
+            self.submitted = True
+
+        def isSubmitted(self):
+            return self.submitted
+
+        def cancel(self):
+            self.status = nfc.clf.transport.libusb.TRANSFER_CANCELLED
+
+        def getStatus(self):
+            return self.status
+
+        def getBuffer(self):
+            return self.buffer
+
+        def getActualLength(self):
+            return len(self.buffer)
+
+        def complete(self, status, data=b''):
+            self.submitted = False
+            self.status, self.buffer = status, data
+            self.callback(self)
+
     @pytest.fixture()  # noqa: F811
     def usb_context(self, mocker):
         libusb = 'nfc.clf.transport.libusb'
@@ -394,3 +439,100 @@ class TestUSB(object):
 
         usb.usb_out = None
         assert usb.write(b'12') is None
+
+    @pytest.fixture()  # noqa: F811
+    def transfers(self, usb):
+        transfers = []
+
+        def get_transfer():
+            transfers.append(self.Transfer())
+            return transfers[-1]
+
+        usb.usb_dev.getTransfer.side_effect = get_transfer
+        usb.start_async()
+        assert len(transfers) == 1
+        assert transfers[0].endpoint == 0x84 and transfers[0].data == 300
+        assert transfers[0].isSubmitted()
+        return transfers
+
+    def test_async_read(self, usb, transfers):
+        COMPLETED = nfc.clf.transport.libusb.TRANSFER_COMPLETED
+        inp = transfers[0]
+        usb.context.handleEventsTimeout.side_effect = \
+            lambda timeout: inp.complete(COMPLETED, b'12')
+        assert usb.read(100) == b'12'
+        assert inp.isSubmitted()
+
+        usb.context.handleEvents.side_effect = \
+            lambda: inp.complete(COMPLETED, b'34')
+        assert usb.read() == b'34'
+
+        usb.context.handleEventsTimeout.side_effect = None
+        with pytest.raises(IOError) as excinfo:
+            usb.read(1)
+        assert excinfo.value.errno == errno.ETIMEDOUT
+
+        for status, data, error in (
+                (COMPLETED, b'', errno.EIO),
+                (nfc.clf.transport.libusb.TRANSFER_ERROR, b'', errno.EIO),
+                (nfc.clf.transport.libusb.TRANSFER_NO_DEVICE, b'',
+                 errno.ENODEV)):
+            inp.complete(status, data)
+            with pytest.raises(IOError) as excinfo:
+                usb.read(100)
+            assert excinfo.value.errno == error
+        assert not inp.isSubmitted()
+
+    def test_async_write(self, usb, transfers):
+        COMPLETED = nfc.clf.transport.libusb.TRANSFER_COMPLETED
+        usb.write(b'12', 100)
+        assert len(transfers) == 2
+        assert transfers[1].endpoint == 0x04 and transfers[1].data == b'12'
+        assert transfers[1].timeout == 100 and transfers[1].isSubmitted()
+        usb.context.handleEventsTimeout.assert_called_with(0)
+
+        usb.write(64 * b'1')
+        assert len(transfers) == 4
+        assert [t.data for t in transfers[2:]] == [64 * b'1', b'']
+
+        for transfer in transfers[1:]:
+            transfer.complete(COMPLETED)
+        usb.write(b'34')
+        assert len(transfers) == 4
+        assert transfers[3].data == b'34'
+
+        transfers[3].complete(nfc.clf.transport.libusb.TRANSFER_TIMED_OUT)
+        with pytest.raises(IOError) as excinfo:
+            usb.write(b'56')
+        assert excinfo.value.errno == errno.ETIMEDOUT
+
+        usb.write(b'56')
+        assert len(usb.transfers.busy) == 1
+        usb.transfers.busy[0].complete(
+            nfc.clf.transport.libusb.TRANSFER_NO_DEVICE)
+        with pytest.raises(IOError) as excinfo:
+            usb.read(100)
+        assert excinfo.value.errno == errno.ENODEV
+
+        del usb.transfers.idle[:]
+        usb.usb_dev.getTransfer.side_effect = None
+        usb.usb_dev.getTransfer.return_value.submit.side_effect = [
+            nfc.clf.transport.libusb.USBErrorNoDevice,
+            nfc.clf.transport.libusb.USBError,
+        ]
+        with pytest.raises(IOError) as excinfo:
+            usb.write(b'78')
+        assert excinfo.value.errno == errno.ENODEV
+        with pytest.raises(IOError) as excinfo:
+            usb.write(b'78')
+        assert excinfo.value.errno == errno.EIO
+
+    def test_async_stop(self, usb, transfers):
+        usb.write(b'12')
+        usb.context.handleEventsTimeout.side_effect = lambda timeout: [
+            t.complete(t.status) for t in transfers if t.isSubmitted()]
+        usb.close()
+        assert usb.transfers is None
+        assert not any([t.isSubmitted() for t in transfers])
+        assert [t.status for t in transfers] == \
+            2 * [nfc.clf.transport.libusb.TRANSFER_CANCELLED]
@@ -0,0 +1,501 @@
+# -*- coding: latin-1 -*-
+from __future__ import absolute_import, division
+
+import nfc.dep
+import nfc.llcp
+import nfc.llcp.llc
+import nfc.llcp.pdu
+
+import Queue
+import time
+import pstats
+import cProfile
+import errno
+import threading
+import pytest
+from pytest_mock import mocker  # noqa: F401
+
+import logging
+logging.basicConfig(level=logging.DEBUG)
+logging_level = logging.getLogger().getEffectiveLevel()
+logging.getLogger("nfc.llcp").setLevel(logging_level)
+
+
+@pytest.fixture()
+def llc():
+    llc = nfc.llcp.llc.LogicalLinkController()
+    llc.cfg.update({'send-miu': 128, 'recv-lto': 100, 'llcp-dpc': 0})
+    return llc
+
+
+@pytest.fixture()
+def ldl(llc):
+    socket = llc.socket(nfc.llcp.llc.LOGICAL_DATA_LINK)
+    llc.bind(socket)
+    return socket
+
+
+def call_later(delay, func, *args):
+    def call():
+        time.sleep(delay)
+        func(*args)
+    thread = threading.Thread(target=call)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def send_later(llc, socket, delay):
+    return call_later(delay, llc.sendto, socket, b'data', 16, 0)
+
+
+class PipeMac(object):
+    # A medium access layer that connects two LLCs within the same
+    # process, exchange() returns None when the link was closed.
+    def __init__(self, recv_queue, send_queue, closed):
+        self.recv_queue = recv_queue
+        self.send_queue = send_queue
+        self.closed = closed
+
+    def exchange(self, data, timeout):
+        if data is not None:
+            self.send_queue.put(bytes(data))
+        while not self.closed.is_set():
+            try:
+                return self.recv_queue.get(timeout=0.01)
+            except Queue.Empty:
+                pass
+
+
+@pytest.fixture()
+def link():
+    # Two linked LLCs with the initiator and target run loops started
+    # in separate threads. Both loops are stopped on teardown.
+    closed = threading.Event()
+    i2t, t2i = Queue.Queue(), Queue.Queue()
+    initiator = nfc.llcp.llc.LogicalLinkController()
+    target = nfc.llcp.llc.LogicalLinkController()
+    initiator.mac = PipeMac(t2i, i2t, closed)
+    target.mac = PipeMac(i2t, t2i, closed)
+    threads = []
+    for llc in (initiator, target):
+        llc.cfg.update({'send-miu': 248, 'recv-lto': 1000, 'llcp-dpc': 0})
+        llc.link.CONNECTED = True
+    for run in (target.run_as_target, initiator.run_as_initiator):
+        threads.append(threading.Thread(target=run, args=(closed.is_set,)))
+        threads[-1].daemon = True
+        threads[-1].start()
+    yield initiator, target
+    closed.set()
+    for thread in threads:
+        thread.join(5)
+
+
+class TestSymmetryBackoff:
+    def test_init(self):
+        backoff = nfc.llcp.llc.SymmetryBackoff()
+        assert backoff.initial == 0.001
+        assert backoff.maximum == 0.05
+        assert backoff.threshold == 10
+        assert str(backoff) == "waits 0 wakeups 0 idle 0.000 sec"
+
+    def test_update(self):
+        backoff = nfc.llcp.llc.SymmetryBackoff(0.001, 0.01, 2)
+        symm = nfc.llcp.pdu.Symmetry()
+        ui = nfc.llcp.pdu.UnnumberedInformation(16, 32, b'data')
+        assert backoff.update(None, symm) == 0.001
+        assert backoff.update(symm, symm) == 0.002
+        assert backoff.update(symm, symm) == 0.004
+        assert backoff.update(symm, symm) == 0.008
+        assert backoff.update(symm, symm) == 0.01
+        assert backoff.update(symm, symm) == 0.01
+        assert backoff.update(ui, symm) == 0.001
+        assert backoff.update(symm, symm) == 0.001
+        assert backoff.update(symm, symm) == 0.002
+        assert backoff.update(symm, ui) == 0.001
+        assert backoff.update(symm, symm) == 0.001
+        backoff.reset()
+        assert backoff.update(symm, symm) == 0.001
+
+    def test_count(self):
+        backoff = nfc.llcp.llc.SymmetryBackoff()
+        backoff.count(0.001, False)
+        backoff.count(0.0005, True)
+        assert backoff.waits == 2
+        assert backoff.wakeups == 1
+        assert backoff.idle_time == 0.0015
+        assert str(backoff) == "waits 2 wakeups 1 idle 0.002 sec"
+
+
+class TestCollect:
+    def test_symm_backoff_option(self):
+        backoff = nfc.llcp.llc.SymmetryBackoff()
+        llc = nfc.llcp.llc.LogicalLinkController(**{'symm-backoff': backoff})
+        assert llc.backoff is backoff
+
+    def test_collect_nothing(self, llc):
+        started = time.time()
+        assert llc.collect(delay=0.01) is None
+        assert time.time() - started >= 0.01
+        assert llc.backoff.waits == 1
+        assert llc.backoff.wakeups == 0
+        assert llc.backoff.idle_time >= 0.01
+
+    def test_collect_without_delay(self, llc):
+        assert llc.collect() is None
+        assert llc.backoff.waits == 0
+
+    def test_collect_queued_pdu(self, llc, ldl):
+        thread = send_later(llc, ldl, 0)
+        while len(ldl.send_queue) == 0:
+            time.sleep(0.001)
+        assert llc.collect(delay=1) == \
+            nfc.llcp.pdu.UnnumberedInformation(16, 32, b'data')
+        assert llc.backoff.waits == 0
+        thread.join()
+
+    def test_collect_wakes_on_send(self, llc, ldl):
+        thread = send_later(llc, ldl, 0.01)
+        started = time.time()
+        assert llc.collect(delay=5) == \
+            nfc.llcp.pdu.UnnumberedInformation(16, 32, b'data')
+        assert time.time() - started < 1
+        assert llc.backoff.waits == 1
+        assert llc.backoff.wakeups == 1
+        thread.join()
+
+    def test_collect_wakes_on_resolve(self, llc):
+        thread = call_later(0.01, llc.resolve, b'urn:nfc:xsn')
+        started = time.time()
+        try:
+            send_pdu = llc.collect(delay=5)
+            assert isinstance(send_pdu, nfc.llcp.pdu.ServiceNameLookup)
+            assert time.time() - started < 1
+            assert llc.backoff.wakeups == 1
+        finally:
+            llc.sap[1].shutdown()
+            thread.join()
+
+
+class TestReadyQueue:
+    def test_only_ready_saps_are_served(self, mocker, llc):  # noqa: F811
+        sockets = [llc.socket(nfc.llcp.llc.LOGICAL_DATA_LINK)
+                   for _ in range(30)]
+        for socket in sockets:
+            llc.bind(socket)
+        assert len(llc.ready) == 0
+        dequeue = mocker.spy(nfc.llcp.llc.ServiceAccessPoint, 'dequeue')
+        llc.sendto(sockets[7], b'data', 16, nfc.llcp.MSG_DONTWAIT)
+        assert list(llc.ready) == [llc.sap[sockets[7].addr]]
+        assert llc.collect() == \
+            nfc.llcp.pdu.UnnumberedInformation(16, sockets[7].addr, b'data')
+        assert len(llc.ready) == 0
+        assert llc.sap[sockets[7].addr].scheduled is False
+        # one dequeue for the first PDU, one when trying to aggregate
+        assert dequeue.call_count == 2
+
+    def test_round_robin(self, llc):
+        llc.cfg['send-agf'] = False
+        sockets = [llc.socket(nfc.llcp.llc.LOGICAL_DATA_LINK)
+                   for _ in range(2)]
+        for socket in sockets:
+            llc.bind(socket)
+        for data in (b'a1', b'a2', b'a3'):
+            llc.sendto(sockets[0], data, 16, nfc.llcp.MSG_DONTWAIT)
+        for data in (b'b1', b'b2'):
+            llc.sendto(sockets[1], data, 16, nfc.llcp.MSG_DONTWAIT)
+        sent = [llc.collect() for _ in range(6)]
+        assert [p.data for p in sent[:5]] == \
+            [b'a1', b'b1', b'a2', b'b2', b'a3']
+        assert sent[5] is None
+        assert len(llc.ready) == 0
+
+    def test_raw_access_point_first(self, llc, ldl):
+        llc.cfg['send-agf'] = False
+        raw = llc.socket(nfc.llcp.llc.RAW_ACCESS_POINT)
+        llc.bind(raw, 20)
+        llc.sendto(ldl, b'data', 16, nfc.llcp.MSG_DONTWAIT)
+        symm = nfc.llcp.pdu.Symmetry()
+        llc.sendto(raw, symm, None, nfc.llcp.MSG_DONTWAIT)
+        assert llc.collect() is symm
+        assert llc.collect().name == "UI"
+
+    def test_removed_sap_is_dropped(self, llc, ldl):
+        llc.sendto(ldl, b'data', 16, nfc.llcp.MSG_DONTWAIT)
+        sap = llc.sap[ldl.addr]
+        llc.close(ldl)
+        assert llc.sap[sap.addr] is None
+        assert llc.collect() is None
+        assert len(llc.ready) == 0 and sap.scheduled is False
+
+    def test_dispatch_schedules_response(self, llc):
+        connect = nfc.llcp.pdu.Connect(1, 32, sn=b'urn:nfc:sn:unknown')
+        llc.dispatch(connect)
+        assert list(llc.ready) == [llc.sap[1]]
+        assert llc.collect() == nfc.llcp.pdu.DisconnectedMode(32, 1, 2)
+
+    def test_queue_depth(self, llc, ldl):
+        assert llc.queue_depth == {}
+        for _ in range(3):
+            llc.sendto(ldl, b'data', 16, nfc.llcp.MSG_DONTWAIT)
+        assert llc.sap[ldl.addr].queue_depth == 3
+        llc.cfg['send-agf'] = False
+        llc.collect()
+        assert llc.queue_depth == {ldl.addr: (2, 3)}
+        llc.collect()
+        llc.collect()
+        assert llc.queue_depth == {ldl.addr: (0, 3)}
+
+
+class TestLink:
+    def test_data_link_connection(self, link):
+        initiator, target = link
+        server = nfc.llcp.Socket(target, nfc.llcp.DATA_LINK_CONNECTION)
+        server.bind(b'urn:nfc:sn:echo')
+        server.listen(1)
+
+        def echo():
+            socket = server.accept()
+            while True:
+                data = socket.recv()
+                if data is None:
+                    break
+                socket.send(data)
+            socket.close()
+        received = []
+
+        def client():
+            socket = nfc.llcp.Socket(
+                initiator, nfc.llcp.DATA_LINK_CONNECTION)
+            socket.connect(b'urn:nfc:sn:echo')
+            for i in range(20):
+                socket.send(bytes(bytearray([i]) * 100))
+                received.append(socket.recv())
+            socket.close()
+
+        threads = [call_later(0, echo), call_later(0, client)]
+        for thread in threads:
+            thread.join(5)
+            assert not thread.is_alive()
+        assert received == [bytes(bytearray([i]) * 100) for i in range(20)]
+        assert len(initiator.ready) == 0
+
+    @pytest.mark.parametrize("miu, rw", [(128, 1), (128, 15), (248, 15)])
+    def test_sendall(self, link, miu, rw):
+        initiator, target = link
+        server = nfc.llcp.Socket(target, nfc.llcp.DATA_LINK_CONNECTION)
+        server.setsockopt(nfc.llcp.SO_RCVMIU, miu)
+        server.setsockopt(nfc.llcp.SO_RCVBUF, rw)
+        server.bind(b'urn:nfc:sn:sink')
+        server.listen(1)
+        message = bytes(bytearray(range(256)) * 8)
+        received = []
+
+        def sink():
+            socket = server.accept()
+            while True:
+                data = socket.recv()
+                if data is None:
+                    break
+                received.append(data)
+            socket.close()
+
+        result = []
+
+        def client():
+            socket = nfc.llcp.Socket(
+                initiator, nfc.llcp.DATA_LINK_CONNECTION)
+            socket.connect(b'urn:nfc:sn:sink')
+            assert socket.getsockopt(nfc.llcp.SO_SNDMIU) == miu
+            result.append(socket.sendall(message))
+            result.append(socket.getsockopt(nfc.llcp.SO_SNDRATE))
+            socket.close()
+
+        threads = [call_later(0, sink), call_later(0, client)]
+        for thread in threads:
+            thread.join(5)
+            assert not thread.is_alive()
+        assert b''.join(received) == message
+        assert max(map(len, received)) == miu
+        assert result[0] is True and result[1] > 0
+        assert len(received) == (len(message) + miu - 1) // miu
+
+    def test_sendall_errors(self, llc, ldl):
+        dlc = llc.socket(nfc.llcp.DATA_LINK_CONNECTION)
+        with pytest.raises(nfc.llcp.Error) as excinfo:
+            llc.sendall(ldl, b'data')
+        assert excinfo.value.errno == errno.EOPNOTSUPP
+        with pytest.raises(nfc.llcp.Error) as excinfo:
+            llc.sendall(dlc, b'data')
+        assert excinfo.value.errno == errno.ENOTCONN
+        with pytest.raises(TypeError):
+            llc.sendall(dlc, 1)
+        with pytest.raises(nfc.llcp.Error) as excinfo:
+            llc.sendall(None, b'data')
+        assert excinfo.value.errno == errno.ENOTSOCK
+
+
+class TestRunLoop:
+    @pytest.fixture()
+    def mac(self, mocker, llc):  # noqa: F811
+        llc.mac = mocker.Mock(spec=nfc.dep.Initiator)
+        llc.mac.exchange.return_value = b'\x00\x00'
+        return llc.mac
+
+    def test_run_as_initiator_backoff(self, llc, mac):
+        llc.backoff = nfc.llcp.llc.SymmetryBackoff(0.001, 0.004, 2)
+        terminate = (lambda: mac.exchange.call_count >= 6)
+        llc.run_as_initiator(terminate=terminate)
+        assert llc.link.SHUTDOWN
+        assert llc.backoff.waits == 1 + 6
+        assert llc.backoff.wakeups == 0
+        assert llc.backoff.idle_time >= 0.01 + 0.001 + 0.002 + 4 * 0.004
+
+    def test_run_as_target_backoff(self, llc, mac):
+        llc.backoff = nfc.llcp.llc.SymmetryBackoff(0.001, 0.004, 2)
+        terminate = (lambda: mac.exchange.call_count >= 6)
+        llc.run_as_target(terminate=terminate)
+        assert llc.link.SHUTDOWN
+        assert llc.backoff.waits == 5
+        assert llc.backoff.idle_time >= 0.001 + 0.002 + 3 * 0.004
+
+    def test_run_as_initiator_counts_pdus(self, llc, mac):
+        terminate = (lambda: mac.exchange.call_count >= 3)
+        llc.run_as_initiator(terminate=terminate)
+        assert llc.pcnt.sent[0] == llc.pcnt.sent_count == 3
+        assert llc.pcnt.rcvd[0] == llc.pcnt.rcvd_count == 3
+        assert str(llc.pcnt) == "sent/rcvd 3/3 SYMM 3/3"
+
+    @pytest.mark.parametrize("disc, closed", [
+        (b'\x01\x40', True), (b'\x41\x50', False),
+    ])
+    def test_run_as_target_disconnect(self, llc, mac, disc, closed):
+        mac.exchange.side_effect = [disc, b'\x00\x00', None]
+        llc.run_as_target()
+        assert llc.link.SHUTDOWN
+        assert mac.exchange.call_count == (1 if closed else 3)
+        assert llc.pcnt.rcvd[0b0101] == 1
+
+
+@pytest.mark.benchmark
+def test_collect_latency_benchmark(llc, ldl):
+    # Measure how long a PDU queued 5 ms into the wait of an idle link
+    # takes to be collected. With a fixed sleep this was the full 50
+    # ms idle back-off.
+    latencies = []
+    for _ in range(10):
+        thread = send_later(llc, ldl, 0.005)
+        started = time.time()
+        assert llc.collect(delay=0.05) is not None
+        latencies.append(time.time() - started - 0.005)
+        thread.join()
+    latency = sorted(latencies)[len(latencies) // 2]
+    logging.info("LLC collect latency %.3f ms on idle link", latency * 1E3)
+    assert llc.backoff.wakeups == 10
+    assert latency < 0.025
+
+
+@pytest.mark.benchmark
+def test_idle_link_benchmark(llc):
+    # Profile 2000 turns of an idle link with no back-off wait. Sending
+    # and receiving SYMM PDUs must not call into the PDU codec, the
+    # time and the function calls per turn are logged.
+    class IdleMac(object):
+        turns, started = 0, None
+
+        def exchange(self, data, timeout):
+            if self.turns == 0:
+                self.started = time.time()
+            self.turns += 1
+            return b'\x00\x00'
+
+    def run(mac):
+        llc.mac = mac
+        llc.run_as_initiator(terminate=lambda: mac.turns >= 2000)
+        return (time.time() - mac.started) / mac.turns
+
+    llc.backoff = nfc.llcp.llc.SymmetryBackoff(0, 0)
+    turn_time = run(IdleMac())
+    profile = cProfile.Profile()
+    profile.runcall(run, IdleMac())
+    stats = pstats.Stats(profile).stats
+    calls = sum(stat[1] for stat in stats.values()) // 2000
+    codec_calls = sum(stat[1] for (filename, _, _), stat in stats.items()
+                      if filename.endswith("pdu.py"))
+    logging.info("LLC idle link %.1f usec and %d function calls per turn",
+                 turn_time * 1E6, calls)
+    assert codec_calls == 0
+
+
+@pytest.mark.benchmark
+def test_collect_scheduling_benchmark():
+    # Compare the time to collect one UI PDU with one and with thirty
+    # bound sockets, the scheduling cost must not depend on the number
+    # of sockets that have nothing to send.
+    def collect_time(count):
+        llc = nfc.llcp.llc.LogicalLinkController()
+        llc.cfg.update({'send-miu': 128})
+        sockets = [llc.socket(nfc.llcp.llc.LOGICAL_DATA_LINK)
+                   for _ in range(count)]
+        for socket in sockets:
+            llc.bind(socket)
+        elapsed = 0.0
+        for _ in range(200):
+            llc.sendto(sockets[0], b'data', 16, nfc.llcp.MSG_DONTWAIT)
+            started = time.time()
+            assert llc.collect() is not None
+            elapsed += time.time() - started
+        return elapsed / 200
+
+    one, many = collect_time(1), collect_time(30)
+    logging.info("LLC collect %.1f usec with 1 and %.1f usec with 30 sockets",
+                 one * 1E6, many * 1E6)
+    assert many < 2 * one
+
+
+@pytest.mark.benchmark
+def test_sendall_benchmark(link):
+    # Count the link turns needed to send 8 kB with send() on a default
+    # data link connection and with sendall() on a connection with a
+    # 248 byte MIU and a receive window of 15.
+    initiator, target = link
+
+    def transfer(miu, rw, bulk):
+        server = nfc.llcp.Socket(target, nfc.llcp.DATA_LINK_CONNECTION)
+        server.setsockopt(nfc.llcp.SO_RCVMIU, miu)
+        server.setsockopt(nfc.llcp.SO_RCVBUF, rw)
+        server.bind()
+        server.listen(1)
+        message = bytes(bytearray(8192))
+        result = []
+
+        def sink():
+            socket = server.accept()
+            size = 0
+            while size < len(message):
+                size += len(socket.recv())
+            result.append(size)
+
+        thread = call_later(0, sink)
+        socket = nfc.llcp.Socket(initiator, nfc.llcp.DATA_LINK_CONNECTION)
+        socket.connect(server.getsockname())
+        sent = initiator.pcnt.sent_count
+        started = time.time()
+        if bulk:
+            socket.sendall(message)
+        else:
+            for offset in range(0, len(message), miu):
+                socket.send(message[offset:offset+miu])
+        thread.join(10)
+        elapsed = time.time() - started
+        socket.close()
+        server.close()
+        assert result == [len(message)]
+        return initiator.pcnt.sent_count - sent, len(message) / elapsed
+
+    send_turns, send_rate = transfer(128, 1, False)
+    bulk_turns, bulk_rate = transfer(248, 15, True)
+    logging.info("LLC 8 kB transfer: send() %d turns %.0f byte/s, "
+                 "sendall() %d turns %.0f byte/s",
+                 send_turns, send_rate, bulk_turns, bulk_rate)
+    assert bulk_turns < send_turns
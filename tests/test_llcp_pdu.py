@@ -2,6 +2,8 @@
 from __future__ import absolute_import, division
 
 import pytest
+import logging
+import time
 import nfc.llcp.pdu
 
 
@@ -103,6 +105,15 @@ def test_encode_pdu_fail_wrong_type(arg):
         nfc.llcp.pdu.encode(arg)
 
 
+@pytest.mark.parametrize("octets", [
+    "0000", "0040", "0080", "8101", "8141", "8181", "81C100",
+    "820100000000", "0641", "0280", "830100", "834100", "838100", "83C1",
+])
+def test_pdu_has_no_instance_dict(octets):
+    pdu = nfc.llcp.pdu.decode(bytearray.fromhex(octets))
+    assert not hasattr(pdu, '__dict__')
+
+
 # ----------------------------------------------------------------------------
 # SYMM PDU
 # ----------------------------------------------------------------------------
@@ -377,6 +388,34 @@ class TestConnect:
         pdu = self.pdu_class(*args)
         assert nfc.llcp.pdu.encode(pdu) == bytearray.fromhex(octets)
 
+    @pytest.mark.parametrize("octets, offset, size", [
+        ("8101050109",       0, 4),
+        ("0000810102020001", 2, 5),
+    ])
+    def test_decode_fail(self, octets, offset, size):
+        octets = bytearray.fromhex(octets)
+        with pytest.raises(nfc.llcp.pdu.DecodeError):
+            self.pdu_class.decode(octets, offset, size)
+
+    def test_decode_parameters_on_first_access(self, mocker):  # noqa: F811
+        spy = mocker.spy(nfc.llcp.pdu.Parameter, 'decode')
+        octets = bytearray.fromhex("81010202000305010F")
+        pdu = nfc.llcp.pdu.decode(octets)
+        assert spy.call_count == 0
+        assert pdu.miu == 131
+        assert spy.call_count == 2
+        assert (pdu.rw, pdu.sn) == (15, None)
+        assert spy.call_count == 2
+        with pytest.raises(AttributeError):
+            pdu.undefined
+
+    def test_set_parameter_before_first_access(self):
+        pdu = nfc.llcp.pdu.decode(bytearray.fromhex("81010202000305010F"))
+        pdu.rw = 2
+        assert (pdu.miu, pdu.rw) == (131, 2)
+        octets = bytearray.fromhex("810102020003050102")
+        assert nfc.llcp.pdu.encode(pdu) == octets
+
 
 # ----------------------------------------------------------------------------
 # DISC PDU
@@ -850,3 +889,51 @@ class TestUnknownProtocolDataUnit:
     def test_encode_fail(self, args):
         with pytest.raises(nfc.llcp.pdu.EncodeError):
             self.pdu_class(*args).encode()
+
+
+# =============================================================================
+# PDU Codec Benchmark
+# =============================================================================
+@pytest.mark.benchmark
+def test_codec_benchmark():
+    # Decode and encode frames of the PDU types seen on a busy link. A
+    # CONNECT is decoded once with and once without reading the TLV
+    # parameters, the latter must be cheaper as they are decoded lazily.
+    vectors = [
+        ("SYMM", "0000"),
+        ("I", "83010042434445464748494A4B4C4D4E4F"),
+        ("RR", "838100"),
+        ("AGF", "00800003838100000583010041420002C181"),
+        ("CONNECT", "810102020073050102060773657276696365"),
+        ("CC", "81810202007305010F"),
+        ("PAX", "00400101100202007303020013040164070103"),
+        ("SNL", "06410806016E666370790902020A"),
+    ]
+    count = 1000
+    for name, octets in vectors:
+        octets = bytes(bytearray.fromhex(octets))
+        pdu = nfc.llcp.pdu.decode(octets)
+        assert nfc.llcp.pdu.encode(pdu) == octets
+        started = time.time()
+        for _ in range(count):
+            nfc.llcp.pdu.decode(octets)
+        decode_time = (time.time() - started) / count
+        started = time.time()
+        for _ in range(count):
+            nfc.llcp.pdu.encode(pdu)
+        encode_time = (time.time() - started) / count
+        logging.info("PDU %-7s decode %5.1f usec encode %5.1f usec",
+                     name, decode_time * 1E6, encode_time * 1E6)
+
+    octets = bytes(bytearray.fromhex(vectors[4][1]))
+    started = time.time()
+    for _ in range(count):
+        nfc.llcp.pdu.decode(octets)
+    lazy_time = time.time() - started
+    started = time.time()
+    for _ in range(count):
+        nfc.llcp.pdu.decode(octets).miu
+    full_time = time.time() - started
+    logging.info("CONNECT decode %.1f usec lazy and %.1f usec with TLVs",
+                 lazy_time / count * 1E6, full_time / count * 1E6)
+    assert lazy_time < full_time
@@ -6,6 +6,7 @@ import nfc.tag
 
 import ndef
 import pytest
+import threading
 from pytest_mock import mocker  # noqa: F401
 
 import logging
@@ -71,6 +72,42 @@ def test_read_ndef(mocker, tag):  # noqa: F811
     assert tag.ndef is None
 
 
+def test_iter_ndef_records(mocker, tag):  # noqa: F811
+    read_ndef_data = mocker.patch("nfc.tag.Tag.NDEF._read_ndef_data")
+    read_ndef_data.return_value = None
+    assert list(tag.iter_ndef_records()) == []
+    assert tag._ndef is None
+
+    read_ndef_data.return_value = HEX('900000 500000')
+    assert list(tag.iter_ndef_records()) == [ndef.Record(), ndef.Record()]
+    assert read_ndef_data.call_count == 2
+    assert tag.ndef.octets == HEX('900000 500000')
+    assert list(tag.iter_ndef_records()) == [ndef.Record(), ndef.Record()]
+    assert read_ndef_data.call_count == 2
+
+
+def test_iter_ndef_records_incomplete(mocker, tag):  # noqa: F811
+    iter_ndef_data = mocker.patch("nfc.tag.Tag.NDEF._iter_ndef_data")
+
+    def chunks(error):
+        yield HEX('900000')
+        yield HEX('50')
+        raise error
+
+    iter_ndef_data.return_value = (6, chunks(nfc.tag.TagCommandError(0)))
+    assert list(tag.iter_ndef_records()) == [ndef.Record()]
+    assert tag._ndef is None
+
+    iter_ndef_data.return_value = (6, iter([HEX('900000'), HEX('50')]))
+    assert list(tag.iter_ndef_records()) == [ndef.Record()]
+    assert tag._ndef is None
+
+    iter_ndef_data.return_value = (6, iter([HEX('900000'), HEX('570000')]))
+    with pytest.raises(ndef.DecodeError):
+        list(tag.iter_ndef_records())
+    assert tag._ndef is None
+
+
 def test_write_ndef(mocker, tag):  # noqa: F811
     read_ndef_data = mocker.patch("nfc.tag.Tag.NDEF._read_ndef_data")
     read_ndef_data.return_value = HEX('')
@@ -137,3 +174,191 @@ def test_activate(mocker, clf, target):  # noqa: F811
 def test_tag_emulate_unsupported(clf, brty):
     target = nfc.clf.LocalTarget(brty)
     assert nfc.tag.emulate(clf, target) is None
+
+
+class TestPresenceCheck(object):
+    @pytest.fixture()  # noqa: F811
+    def is_present(self, mocker):
+        return mocker.PropertyMock()
+
+    @pytest.fixture()  # noqa: F811
+    def tag(self, mocker, is_present):
+        tag = mocker.Mock(spec=nfc.tag.Tag)
+        type(tag).is_present = is_present
+        return tag
+
+    def test_tag_removed(self, tag, is_present):
+        is_present.side_effect = [True, True, True, False]
+        presence = nfc.tag.PresenceCheck(interval=0.001)
+        assert presence.wait(tag) is True
+        assert presence.checks == 4
+        assert presence.removals == 1
+        assert 0 < presence.removal_latency < 0.1
+        assert presence.mean_removal_latency == presence.removal_latency
+        assert presence.removal_latency_max == presence.removal_latency
+        assert presence.mean_check_time >= 0
+        assert str(presence).startswith("checks 4 (")
+
+    def test_terminate_before_check(self, tag):
+        presence = nfc.tag.PresenceCheck()
+        assert presence.wait(tag, terminate=lambda: True) is False
+        assert presence.checks == 0
+        assert presence.mean_check_time == 0
+        assert presence.mean_removal_latency == 0
+        assert presence.removal_latency is None
+
+    def test_terminate_while_waiting(self, mocker, tag,  # noqa: F811
+                                     is_present):
+        is_present.return_value = True
+        terminate = mocker.Mock(side_effect=[False, False, False, True])
+        presence = nfc.tag.PresenceCheck(interval=10, granularity=0.001)
+        assert presence.wait(tag, terminate) is False
+        assert presence.checks == 1
+        assert terminate.call_count == 4
+
+    def test_interval_backoff(self, mocker, tag, is_present):  # noqa: F811
+        is_present.side_effect = 4 * [True] + [False]
+        sleep = mocker.patch('time.sleep')
+        presence = nfc.tag.PresenceCheck(0.01, 0.05, granularity=1)
+        assert presence.max_interval == 0.05
+        assert presence.wait(tag) is True
+        intervals = [call[0][0] for call in sleep.call_args_list]
+        assert len(intervals) >= 4
+        assert max(intervals) <= 0.05
+        assert nfc.tag.PresenceCheck(0.1, 0.05).max_interval == 0.1
+
+    def test_shared_between_threads(self, mocker):  # noqa: F811
+        presence = nfc.tag.PresenceCheck(interval=0.001)
+
+        def run():
+            tag = mocker.Mock(spec=nfc.tag.Tag)
+            type(tag).is_present = mocker.PropertyMock(
+                side_effect=100 * [True] + [False])
+            presence.wait(tag)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert presence.checks == 4 * 101
+        assert presence.removals == 4
+
+
+class TestNdefCache(object):
+    @pytest.fixture()  # noqa: F811
+    def ndef_data(self, mocker):
+        read_ndef_data = mocker.patch("nfc.tag.Tag.NDEF._read_ndef_data")
+        read_ndef_data.return_value = HEX('D00000')
+        mocker.patch("nfc.tag.Tag.NDEF._write_ndef_data")
+        mocker.patch("nfc.tag.Tag.NDEF._cache_state", autospec=True,
+                     side_effect=lambda self: (
+                         bytes(self._data[0:1]), {'_data': self._data}))
+        return read_ndef_data
+
+    @pytest.fixture()  # noqa: F811
+    def probe(self, mocker):
+        return mocker.patch("nfc.tag.Tag.NDEF._probe_ndef_data")
+
+    def make_tag(self, clf, target, cache, nfcid=b'\x01\x02\x03\x04'):
+        tag = nfc.tag.Tag(clf, target)
+        tag.TYPE, tag._nfcid = "Type0Tag", bytearray(nfcid)
+        tag.ndef_cache = cache
+        return tag
+
+    def test_not_cached_by_default(self, tag, ndef_data):
+        assert tag.ndef_cache is None
+        assert tag.ndef.octets == HEX('D00000')
+
+    def test_cache_hit(self, clf, target, ndef_data, probe):
+        cache = nfc.tag.NdefCache()
+        tag = self.make_tag(clf, target, cache)
+        assert tag.ndef.octets == HEX('D00000')
+        assert cache.misses == 1 and len(cache) == 1
+        ndef_data.return_value = HEX('D50000')
+        probe.return_value = b'\xD0'
+        tag = self.make_tag(clf, target, cache)
+        assert tag.ndef.octets == HEX('D00000')
+        assert cache.hits == 1 and cache.hit_ratio == 0.5
+        assert str(cache) == "hits 1 misses 1 stale 0 evictions 0 " \
+            "entries 1/100"
+
+    def test_cache_stale(self, clf, target, ndef_data, probe):
+        cache = nfc.tag.NdefCache()
+        tag = self.make_tag(clf, target, cache)
+        assert tag.ndef.octets == HEX('D00000')
+        ndef_data.return_value = HEX('D50000')
+        probe.return_value = b'\xD5'
+        tag = self.make_tag(clf, target, cache)
+        assert tag.ndef.octets == HEX('D50000')
+        assert cache.hits == 0 and cache.misses == 2 and cache.stale == 1
+        assert len(cache) == 1
+
+    def test_cache_not_supported(self, mocker,  # noqa: F811
+                                 clf, target, ndef_data):
+        mocker.patch("nfc.tag.Tag.NDEF._cache_state").return_value = None
+        cache = nfc.tag.NdefCache()
+        tag = self.make_tag(clf, target, cache)
+        assert tag.ndef.octets == HEX('D00000')
+        assert len(cache) == 0
+
+    def test_cache_eviction(self, clf, target, ndef_data, probe):
+        cache = nfc.tag.NdefCache(size=2)
+        probe.return_value = b'\xD0'
+        for nfcid in (b'\x01', b'\x02', b'\x01', b'\x03'):
+            assert self.make_tag(clf, target, cache, nfcid).ndef is not None
+        assert len(cache) == 2 and cache.evictions == 1
+        assert self.make_tag(clf, target, cache, b'\x01').ndef is not None
+        assert self.make_tag(clf, target, cache, b'\x02').ndef is not None
+        assert cache.hits == 2 and cache.misses == 4 and cache.stale == 0
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_cache_write_and_no_ndef(self, clf, target, ndef_data, probe):
+        cache = nfc.tag.NdefCache()
+        tag = self.make_tag(clf, target, cache)
+        tag.ndef._writeable, tag.ndef._capacity = True, 10
+        tag.ndef.octets = HEX('D50000')
+        probe.return_value = b'\xD5'
+        assert self.make_tag(clf, target, cache).ndef.octets == HEX('D50000')
+        ndef_data.return_value = None
+        assert tag.ndef.has_changed is True
+        assert len(cache) == 0
+
+    def test_cache_authenticated(self, clf, target, ndef_data, probe):
+        cache = nfc.tag.NdefCache()
+        tag = self.make_tag(clf, target, cache)
+        tag._authenticated = True
+        assert tag.ndef.octets == HEX('D00000')
+        assert len(cache) == 0 and cache.misses == 0
+        assert probe.call_count == 0
+
+
+class TestProductCache(object):
+    def make_target(self, uid):
+        target = nfc.clf.RemoteTarget("106A")
+        target.sdd_res = HEX(uid)
+        return target
+
+    def test_lookup_and_store(self):
+        cache = nfc.tag.ProductCache()
+        target = self.make_target('04517CA1E1ED2580')
+        assert cache._lookup(target) is None
+        cache._store(target, nfc.tag.Tag)
+        assert cache._lookup(self.make_target('04517CA1E1ED2580')) \
+            is nfc.tag.Tag
+        assert cache.hits == 1 and cache.misses == 1
+        assert cache.hit_ratio == 0.5 and len(cache) == 1
+        assert str(cache) == "hits 1 misses 1 evictions 0 entries 1/100"
+
+    def test_eviction(self):
+        cache = nfc.tag.ProductCache(size=2)
+        for uid in ('0401', '0402', '0401', '0403'):
+            target = self.make_target(uid)
+            if cache._lookup(target) is None:
+                cache._store(target, nfc.tag.Tag)
+        assert cache.evictions == 1 and len(cache) == 2
+        assert cache._lookup(self.make_target('0402')) is None
+        assert cache._lookup(self.make_target('0401')) is nfc.tag.Tag
+        cache.clear()
+        assert len(cache) == 0
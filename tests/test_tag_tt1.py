@@ -167,10 +167,26 @@ class TestStaticMemoryTagNdef:
             mock.call(HEX('53 0f 00 01020304'), 0.1),
             mock.call(HEX('53 10 00 01020304'), 0.1),
             mock.call(HEX('53 11 fe 01020304'), 0.1),
-            mock.call(HEX('53 0d 03 01020304'), 0.1),
+            mock.call(HEX('1a 0d 03 01020304'), 0.1),
         ]
         assert tag.ndef.octets == HEX("D00000")
 
+    def test_write_single_byte_change(self, tag):
+        tag.clf.exchange.side_effect = [
+            tag.target.rid_res[:2] + HEX(
+                "01 02 03 04  05 06 07 00  e1 10 02 00  03 09 d1 01"
+                "05 54 02 65  6e 61 62 FE"
+            ),
+            HEX("16 63"),
+        ]
+        assert tag.ndef is not None
+        tag.ndef.octets = HEX('d1 01 05 54 02 65 6e') + b'ac'
+        assert tag.clf.exchange.mock_calls == [
+            mock.call(HEX('00 00 00 01020304'), 0.1),
+            mock.call(HEX('1a 16 63 01020304'), 0.1),
+        ]
+        assert tag.ndef._tag_memory.bytes_written == 1
+
     def test_write_without_terminator_tlv(self, tag):
         tag.clf.exchange.side_effect = [
             tag.target.rid_res[:2] + HEX(
@@ -190,7 +206,7 @@ class TestStaticMemoryTagNdef:
             mock.call(HEX('53 0d 00 01020304'), 0.1),
             mock.call(HEX('53 10 06 01020304'), 0.1),
             mock.call(HEX('53 17 63 01020304'), 0.1),
-            mock.call(HEX('53 0d 0a 01020304'), 0.1),
+            mock.call(HEX('1a 0d 0a 01020304'), 0.1),
         ]
 
 
@@ -241,7 +257,6 @@ class TestDynamicMemoryTagNdef:
         assert isinstance(tag, nfc.tag.tt1.Type1Tag)
         tag.clf.exchange.side_effect = [
             tag.target.rid_res[:2] + mmap[:120],  # RALL
-            HEX("0F") + mmap[120:128],  # READ8(15)
             HEX("10") + mmap[128:256],  # RSEG(1)
             HEX("20") + mmap[256:384],  # RSEG(2)
             HEX("30") + mmap[384:512],  # RSEG(3)
@@ -282,14 +297,13 @@ class TestDynamicMemoryTagNdef:
     def test_write_to_dynamic_memory(self, tag, mmap, ndef_octets):
         tag.clf.exchange.side_effect = [
             tag.target.rid_res[:2] + mmap[:23] + bytearray(489),
-            HEX("54 0000c101000001c6"),  # WRITE-E8
+            HEX("1b 01cdc101000001c6"),  # WRITE-NE8
         ] + [
-            HEX("54") + mmap[i*8:i*8+8] for i in range(4, 13)
+            HEX("1b") + mmap[i*8:i*8+8] for i in range(4, 13)
         ] + [
-            HEX("54") + mmap[i*8:i*8+8] for i in range(16, 64)
+            HEX("1b") + mmap[i*8:i*8+8] for i in range(16, 64)
         ] + [
-            HEX("54 330203f0020303ff"),  # WRITE-E8
-            HEX("54 01cdc101000001c6"),  # WRITE-E8
+            HEX("1b 330203f0020303ff"),  # WRITE-NE8
         ]
         assert tag.ndef is not None
         assert tag.ndef.is_readable is True
@@ -300,17 +314,17 @@ class TestDynamicMemoryTagNdef:
         tag.ndef.octets = ndef_octets
         assert tag.clf.exchange.mock_calls == [
             mock.call(HEX('00 00 00 01020304'), 0.1),
-            mock.call(HEX('54 03 0000c101000001c6 01020304'), 0.1),
+            mock.call(HEX('1b 03 01cdc101000001c6 01020304'), 0.1),
         ] + [
-            mock.call(bytearray([84, i]) + mmap[i*8:i*8+8] + b'\1\2\3\4', 0.1)
+            mock.call(bytearray([27, i]) + mmap[i*8:i*8+8] + b'\1\2\3\4', 0.1)
             for i in range(4, 13)
         ] + [
-            mock.call(bytearray([84, i]) + mmap[i*8:i*8+8] + b'\1\2\3\4', 0.1)
+            mock.call(bytearray([27, i]) + mmap[i*8:i*8+8] + b'\1\2\3\4', 0.1)
             for i in range(16, 64)
         ] + [
-            mock.call(HEX('54 02 330203f0020303ff 01020304'), 0.1),
-            mock.call(HEX('54 03 01cdc101000001c6 01020304'), 0.1),
+            mock.call(HEX('1b 02 330203f0020303ff 01020304'), 0.1),
         ]
+        assert tag.ndef._tag_memory.blocks_written == 59
 
     def test_write_terminator_after_skip(self, tag):
         assert tag.ndef is not None
@@ -328,7 +342,7 @@ class TestDynamicMemoryTagNdef:
             HEX("54 0000000000000000"),  # WRITE-E8(11)
             HEX("54 0000000000000000"),  # WRITE-E8(12)
             HEX("54 fe7475767778797a"),  # WRITE-E8(16)
-            HEX("54 330203f002030350"),  # WRITE-E8(2)
+            HEX("1b 330203f002030350"),  # WRITE-NE8(2)
         ]
         tag.ndef.octets = HEX('D5 00 4D') + bytearray(5+9*8)
         assert tag.clf.exchange.mock_calls == [
@@ -344,7 +358,7 @@ class TestDynamicMemoryTagNdef:
             mock.call(HEX('54 0b 0000000000000000 01020304'), 0.1),
             mock.call(HEX('54 0c 0000000000000000 01020304'), 0.1),
             mock.call(HEX('54 10 fe7475767778797a 01020304'), 0.1),
-            mock.call(HEX('54 02 330203f002030350 01020304'), 0.1),
+            mock.call(HEX('1b 02 330203f002030350 01020304'), 0.1),
         ]
 
 
@@ -657,7 +671,6 @@ class TestTagProcedures:
     def test_protect_default(self, tag):
         tag.clf.exchange.side_effect = [
             HEX("1200") + self.mmap[:120],   # RALL
-            HEX("0F") + self.mmap[120:128],  # READ8(15)
             HEX("10") + self.mmap[128:256],  # RSEG(1)
             HEX("20") + self.mmap[256:384],  # RSEG(2)
             HEX("30") + self.mmap[384:512],  # RSEG(3)
@@ -708,43 +721,55 @@ class TestMemoryReader:
     @pytest.mark.parametrize("offset", [0, 1, 120, 121, 128, 129, 255])
     def test_byte_access_at_offset(self, tag, offset):
         tag.clf.exchange.side_effect = [
-            HEX("1200") + self.mmap[:120],   # RALL
-            HEX("0F") + self.mmap[120:128],  # READ8(15)
-            HEX("10") + self.mmap[128:256],  # RSEG(1)
+            HEX("1200") + self.mmap[:120],                    # RALL
+            HEX("%02x" % (offset >> 3)) + self.mmap[offset & ~7:][:8],
         ]
         tag_memory = nfc.tag.tt1.Type1TagMemoryReader(tag)
         assert tag_memory[offset] == self.mmap[offset]
         assert tag.clf.exchange.mock_calls[0] == \
             mock.call(HEX('00 00 00 01020304'), 0.1)
         if offset >= 120:
-            read8 = HEX('02 0f 00000000 00000000 01020304')
-            assert tag.clf.exchange.mock_calls[1] == mock.call(read8, 0.1)
-        if offset >= 128:
-            rseg = HEX('10 10 00000000 00000000 01020304')
-            assert tag.clf.exchange.mock_calls[2] == mock.call(rseg, 0.1)
+            read8 = HEX('02 %02x 00000000 00000000 01020304' % (offset >> 3))
+            assert tag.clf.exchange.mock_calls[1:] == [mock.call(read8, 0.1)]
 
     @pytest.mark.parametrize("offset", [0, 1, 120, 121, 128, 129, 255])
     def test_slice_access_at_offset(self, tag, offset):
         tag.clf.exchange.side_effect = [
-            HEX("1200") + self.mmap[:120],   # RALL
-            HEX("0F") + self.mmap[120:128],  # READ8(15)
-            HEX("10") + self.mmap[128:256],  # RSEG(1)
+            HEX("1200") + self.mmap[:120],                    # RALL
+            HEX("%02x" % (offset >> 3)) + self.mmap[offset & ~7:][:8],
         ]
         tag_memory = nfc.tag.tt1.Type1TagMemoryReader(tag)
         assert tag_memory[offset:offset+1] == self.mmap[offset:offset+1]
         assert tag.clf.exchange.mock_calls[0] == \
             mock.call(HEX('00 00 00 01020304'), 0.1)
         if offset >= 120:
-            read8 = HEX('02 0f 00000000 00000000 01020304')
-            assert tag.clf.exchange.mock_calls[1] == mock.call(read8, 0.1)
-        if offset >= 128:
-            rseg = HEX('10 10 00000000 00000000 01020304')
-            assert tag.clf.exchange.mock_calls[2] == mock.call(rseg, 0.1)
+            read8 = HEX('02 %02x 00000000 00000000 01020304' % (offset >> 3))
+            assert tag.clf.exchange.mock_calls[1:] == [mock.call(read8, 0.1)]
+
+    def test_sparse_access_reads_segment_once(self, tag):
+        tag.clf.exchange.side_effect = [
+            HEX("1200") + self.mmap[:120],   # RALL
+            HEX("1F") + self.mmap[248:256],  # READ8(31)
+            HEX("10") + self.mmap[128:256],  # RSEG(1)
+            HEX("0F") + self.mmap[120:128],  # READ8(15)
+        ]
+        tag_memory = nfc.tag.tt1.Type1TagMemoryReader(tag)
+        assert tag_memory[255] == self.mmap[255]
+        assert len(tag_memory) == 256
+        assert tag_memory[130:140] == self.mmap[130:140]
+        assert tag_memory[128:256] == self.mmap[128:256]
+        assert tag_memory[120:136] == self.mmap[120:136]
+        assert tag.clf.exchange.mock_calls == [
+            mock.call(HEX('00 00 00 01020304'), 0.1),
+            mock.call(HEX('02 1f 00000000 00000000 01020304'), 0.1),
+            mock.call(HEX('10 10 00000000 00000000 01020304'), 0.1),
+            mock.call(HEX('02 0f 00000000 00000000 01020304'), 0.1),
+        ]
 
     def test_synchronize_with_small_tag(self, tag):
         tag.clf.exchange.side_effect = [
             b"\x11\x00" + self.mmap[:120],  # RALL
-            b"\x00" + b'\xA5',              # WRITE-E
+            b"\x00" + b'\xA5',              # WRITE-NE
             b"\x0F" + b'\x5A',              # WRITE-E
         ]
         tag_memory = nfc.tag.tt1.Type1TagMemoryReader(tag)
@@ -754,7 +779,7 @@ class TestMemoryReader:
         assert tag.clf.exchange.mock_calls[0] == \
             mock.call(HEX('00 00 00 01020304'), 0.1)
         assert tag.clf.exchange.mock_calls[1] == \
-            mock.call(HEX('53 00 A5 01020304'), 0.1)
+            mock.call(HEX('1A 00 A5 01020304'), 0.1)
         assert tag.clf.exchange.mock_calls[2] == \
             mock.call(HEX('53 0F 5A 01020304'), 0.1)
 
@@ -763,8 +788,8 @@ class TestMemoryReader:
             b"\x12\x00" + self.mmap[:120],           # RALL
             b"\x0F" + self.mmap[120:128],            # READ8(15)
             b"\x10" + self.mmap[128:256],            # RSEG(1)
-            b"\x54" + b'\xFF' + self.mmap[1:8],      # WRITE-E8
-            b"\x54" + b'\xFF' + self.mmap[129:136],  # WRITE-E8
+            b"\x1B" + b'\xFF' + self.mmap[1:8],      # WRITE-NE8
+            b"\x1B" + b'\xFF' + self.mmap[129:136],  # WRITE-NE8
         ]
         tag_memory = nfc.tag.tt1.Type1TagMemoryReader(tag)
         assert tag_memory[0:256] == self.mmap  # force read all memory
@@ -775,8 +800,8 @@ class TestMemoryReader:
             mock.call(HEX('00 00 00 01020304'), 0.1),
             mock.call(HEX('02 0f 00000000 00000000 01020304'), 0.1),
             mock.call(HEX('10 10 00000000 00000000 01020304'), 0.1),
-            mock.call(HEX('54 00 FF020304 05060700 01020304'), 0.1),
-            mock.call(HEX('54 10 FF000000 00000000 01020304'), 0.1),
+            mock.call(HEX('1B 00 FF020304 05060700 01020304'), 0.1),
+            mock.call(HEX('1B 10 FF000000 00000000 01020304'), 0.1),
         ])
 
     def test_byte_delete_raises_error(self, tag):
@@ -800,15 +825,15 @@ class TestMemoryReader:
         tag.clf.exchange.side_effect \
             = nfc.tag.tt1.Type1TagCommandError(nfc.tag.TIMEOUT_ERROR)
         tag_memory = nfc.tag.tt1.Type1TagMemoryReader(tag)
-        tag_memory._data_from_tag = self.mmap[:offset]
+        tag_memory._blocks = dict(
+            (i, self.mmap[i*8:i*8+8]) for i in range(offset >> 3))
         with pytest.raises(IndexError):
             tag_memory[offset]
 
     def test_write_raises_command_error(self, tag):
         tag.clf.exchange.side_effect = [
             b"\x12\x00" + self.mmap[:120],           # RALL
-            b"\x0F" + self.mmap[120:128],            # READ8(15)
-            b"\x10" + self.mmap[128:256],            # RSEG(1)
+            b"\x10" + self.mmap[128:136],            # READ8(16)
             b''
         ]
         tag_memory = nfc.tag.tt1.Type1TagMemoryReader(tag)
@@ -816,7 +841,6 @@ class TestMemoryReader:
         tag_memory.synchronize()
         tag.clf.exchange.assert_has_calls([
             mock.call(HEX('00 00 00 01020304'), 0.1),
-            mock.call(HEX('02 0f 00000000 00000000 01020304'), 0.1),
-            mock.call(HEX('10 10 00000000 00000000 01020304'), 0.1),
+            mock.call(HEX('02 10 00000000 00000000 01020304'), 0.1),
             mock.call(HEX('54 10 5A000000 00000000 01020304'), 0.1),
         ])
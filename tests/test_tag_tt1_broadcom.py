@@ -86,13 +86,13 @@ class TestTopaz:
     def test_format_with_version_one_dot_two(self, tag):
         tag.clf.exchange.side_effect = [
             tag.target.rid_res[:2] + self.mmap[:120],  # RALL
-            HEX("09 12"),  # WRITE-E
+            HEX("09 12"),  # WRITE-NE
             HEX("0d 00"),  # WRITE-E
         ]
         assert tag.format(version=0x12) is True
         assert tag.clf.exchange.mock_calls == [
             mock.call(HEX("00 00 00 01020304"), 0.1),
-            mock.call(HEX("53 09 12 01020304"), 0.1),
+            mock.call(HEX("1a 09 12 01020304"), 0.1),
             mock.call(HEX("53 0d 00 01020304"), 0.1),
         ]
 
@@ -237,7 +237,7 @@ class TestTopaz512:
     def test_format_with_version_one_dot_two(self, tag):
         tag.clf.exchange.side_effect = [
             tag.target.rid_res[:2] + self.mmap[:120],
-            HEX("54 e1123f000103f230"),
+            HEX("1b e1123f000103f230"),
             HEX("54 330203f002030300"),
             nfc.clf.TimeoutError, nfc.clf.TimeoutError, nfc.clf.TimeoutError
         ]
@@ -245,7 +245,7 @@ class TestTopaz512:
         print(tag.clf.exchange.mock_calls)
         assert tag.clf.exchange.mock_calls == [
             mock.call(HEX("00 00 00 01020304"), 0.1),
-            mock.call(HEX("54 01 e1123f000103f230 01020304"), 0.1),
+            mock.call(HEX("1b 01 e1123f000103f230 01020304"), 0.1),
             mock.call(HEX("54 02 330203f002030300 01020304"), 0.1),
         ]
 
@@ -258,7 +258,6 @@ class TestTopaz512:
     def test_format_with_wipe_all_zero(self, tag):
         tag.clf.exchange.side_effect = [               # Responses
             tag.target.rid_res[:2] + self.mmap[:120],  # RALL
-            HEX("0F") + self.mmap[120:128],        # READ8(15)
             HEX("10") + self.mmap[128:256],        # RSEG(1)
             HEX("20") + self.mmap[256:384],        # RSEG(2)
             HEX("30") + self.mmap[384:512],        # RSEG(3)
@@ -269,7 +268,6 @@ class TestTopaz512:
         assert tag.format(wipe=0) is True
         assert tag.clf.exchange.mock_calls == [
             mock.call(HEX("00 00 00 01020304"), 0.1),
-            mock.call(HEX("02 0f 0000000000000000 01020304"), 0.1),
             mock.call(HEX("10 10 0000000000000000 01020304"), 0.1),
             mock.call(HEX("10 20 0000000000000000 01020304"), 0.1),
             mock.call(HEX("10 30 0000000000000000 01020304"), 0.1),
@@ -285,7 +283,6 @@ class TestTopaz512:
     def test_protect_with_defaults(self, tag):
         tag.clf.exchange.side_effect = [               # Responses
             tag.target.rid_res[:2] + self.mmap[:120],  # RALL
-            HEX("0F") + self.mmap[120:128],        # READ8(15)
             HEX("10") + self.mmap[128:256],        # RSEG(1)
             HEX("20") + self.mmap[256:384],        # RSEG(2)
             HEX("0b 0f"),                          # WRITE-NE(11)
@@ -297,7 +294,6 @@ class TestTopaz512:
         assert tag.protect() is True
         assert tag.clf.exchange.mock_calls == [
             mock.call(HEX("00 00 00 01020304"), 0.1),
-            mock.call(HEX("02 0f 0000000000000000 01020304"), 0.1),
             mock.call(HEX("10 10 0000000000000000 01020304"), 0.1),
             mock.call(HEX("10 20 0000000000000000 01020304"), 0.1),
             mock.call(HEX("1a 0b 0f 01020304"), 0.1),
@@ -456,9 +456,6 @@ class TestTagProcedures:
             (HEX('30 00'), 0.005),
             (HEX('30 04'), 0.005),
             (HEX('a2 03 e110080f'), 0.1),
-            (HEX('30 08'), 0.005),
-            (HEX('30 0c'), 0.005),
-            (HEX('30 10'), 0.005),
             (HEX('30 14'), 0.005),
             (HEX('a2 02 0000ffff'), 0.1),
             (HEX('a2 14 03000000'), 0.1),
@@ -468,9 +465,6 @@ class TestTagProcedures:
             HEX("000300fe 00000000 00000000 00000000"),
             HEX("0a"),
             HEX("00000000 00000000 00000000 00000000"),
-            HEX("00000000 00000000 00000000 00000000"),
-            HEX("00000000 00000000 00000000 00000000"),
-            HEX("00000000 00000000 00000000 00000000"),
             HEX("0a"),
             HEX("0a"),
         ]
@@ -487,9 +481,6 @@ class TestTagProcedures:
             (HEX('30 00'), 0.005),
             (HEX('30 04'), 0.005),
             (HEX('a2 03 e110080f'), 0.1),
-            (HEX('30 08'), 0.005),
-            (HEX('30 0c'), 0.005),
-            (HEX('30 10'), 0.005),
             (HEX('30 14'), 0.005),
             (HEX('a2 02 0000ffff'), 0.1),
             (HEX('a2 14 ffff0000'), 0.1),
@@ -499,9 +490,6 @@ class TestTagProcedures:
             HEX("00000103 a0102300 0300fe00 00000000"),
             HEX("0a"),
             HEX("00000000 00000000 00000000 00000000"),
-            HEX("00000000 00000000 00000000 00000000"),
-            HEX("00000000 00000000 00000000 00000000"),
-            HEX("00000000 00000000 00000000 00000000"),
             HEX("0a"),
             HEX("0a"),
         ]
@@ -695,11 +683,43 @@ class TestNdef:
         tag.ndef.octets = HEX('d50003313233')
         assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
 
+    def test_write_single_page_change(self, tag):
+        commands = [
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+            (HEX('a2 05 023133fe'), 0.1),
+        ]
+        responses = [
+            HEX("01020304 05060708 00000000 E1100100"),
+            HEX("0305d500 023132fe 00000000 00000000"),
+            HEX("0a"),
+        ]
+        tag.clf.exchange.side_effect = responses
+        assert tag.ndef is not None
+        assert tag.ndef.octets == HEX('d500023132')
+        tag.ndef.octets = HEX('d500023133')
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+        assert tag.ndef._tag_memory.pages_written == 1
+
+    def test_write_unchanged_message(self, tag):
+        commands = [
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+        ]
+        responses = [
+            HEX("01020304 05060708 00000000 E1100100"),
+            HEX("0305d500 023132fe 00000000 00000000"),
+        ]
+        tag.clf.exchange.side_effect = responses
+        assert tag.ndef is not None
+        tag.ndef.octets = HEX('d500023132')
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+        assert tag.ndef._tag_memory.pages_written == 0
+
     def test_write_long_length_field(self, tag):
         commands = [
             (HEX('30 00'), 0.005),
             (HEX('30 04'), 0.005),
-            (HEX('a2 04 0300d000'), 0.1),
             (HEX('30 08'), 0.005),
             (HEX('30 0c'), 0.005),
             (HEX('30 10'), 0.005),
@@ -716,6 +736,7 @@ class TestNdef:
             (HEX('30 3c'), 0.005),
             (HEX('30 40'), 0.005),
             (HEX('30 44'), 0.005),
+            (HEX('a2 04 030000ff'), 0.1),
             (HEX('a2 05 d500fc00'), 0.1),
             (HEX('a2 44 000000fe'), 0.1),
             (HEX('a2 04 03ff00ff'), 0.1),
@@ -723,11 +744,10 @@ class TestNdef:
         responses = [
             HEX("01020304 05060708 00000000 E1102100"),
             HEX("0303d000 00000000 00000000 00000000"),
-            HEX("0a"),
         ] + 16 * [
             HEX("00000000 00000000 00000000 00000000"),
         ] + [
-            HEX("0a"), HEX("0a"), HEX("0a"),
+            HEX("0a"), HEX("0a"), HEX("0a"), HEX("0a"),
         ]
         tag.clf.exchange.side_effect = responses
         assert tag.ndef is not None
@@ -737,6 +757,114 @@ class TestNdef:
         tag.ndef.octets = HEX('d500fc') + bytearray(252)
         assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
 
+    def test_read_from_ndef_cache(self, tag):
+        responses = [
+            HEX("01020304 05060708 00000000 E1100600"),
+            HEX("0320d500 1d000000 00000000 00000000"),
+            HEX("00000000 00000000 00000000 00000000"),
+            HEX("0000fe00 00000000 00000000 00000000"),
+        ]
+        cache = tag.ndef_cache = nfc.tag.NdefCache()
+        tag.clf.exchange.side_effect = responses
+        assert tag.ndef.octets == HEX('d5001d') + bytearray(29)
+        assert tag.clf.exchange.call_count == 4
+        assert len(cache) == 1 and cache.misses == 1
+        commands = [
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+        ]
+        tag.clf.exchange.reset_mock()
+        tag.clf.exchange.side_effect = responses[0:2]
+        tag = nfc.tag.activate(tag.clf, tag.target)
+        tag.ndef_cache = cache
+        assert tag.ndef.octets == HEX('d5001d') + bytearray(29)
+        assert tag.ndef.capacity == 46
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+        assert cache.hits == 1 and cache.stale == 0
+
+    def test_read_stale_ndef_cache(self, tag):
+        responses = [
+            HEX("01020304 05060708 00000000 E1100600"),
+            HEX("0305d500 023132fe 00000000 00000000"),
+        ]
+        cache = tag.ndef_cache = nfc.tag.NdefCache()
+        tag.clf.exchange.side_effect = responses
+        assert tag.ndef.octets == HEX('d500023132')
+        responses[1] = HEX("0304d500 0131fe00 00000000 00000000")
+        tag.clf.exchange.reset_mock()
+        tag.clf.exchange.side_effect = 2 * responses
+        tag = nfc.tag.activate(tag.clf, tag.target)
+        tag.ndef_cache = cache
+        assert tag.ndef.octets == HEX('d5000131')
+        assert tag.clf.exchange.call_count == 4
+        assert cache.hits == 0 and cache.misses == 2 and cache.stale == 1
+        assert len(cache) == 1
+
+    def test_write_updates_ndef_cache(self, tag):
+        commands = [
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+            (HEX('a2 05 023133fe'), 0.1),
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+        ]
+        responses = [
+            HEX("01020304 05060708 00000000 E1100100"),
+            HEX("0305d500 023132fe 00000000 00000000"),
+            HEX("0a"),
+            HEX("01020304 05060708 00000000 E1100100"),
+            HEX("0305d500 023133fe 00000000 00000000"),
+        ]
+        cache = tag.ndef_cache = nfc.tag.NdefCache()
+        tag.clf.exchange.side_effect = responses
+        assert tag.ndef is not None
+        tag.ndef.octets = HEX('d500023133')
+        tag = nfc.tag.activate(tag.clf, tag.target)
+        tag.ndef_cache = cache
+        assert tag.ndef.octets == HEX('d500023133')
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+        assert cache.hits == 1
+
+    @pytest.fixture()
+    def memory(self):
+        # an URI record followed by a Text record with 40 byte text
+        return HEX("01020304 05060708 00000000 E1101200") \
+            + HEX("0333 91 01 03 55 01 61 62 51 01 28 54 02 65 6e") \
+            + bytearray(b'x' * 38) + HEX("fe") + bytearray(11)
+
+    def test_iter_ndef_records(self, tag, memory):
+        tag.clf.exchange.side_effect = lambda data, timeout: \
+            memory[bytearray(data)[1]*4:bytearray(data)[1]*4+16]
+        records = list(tag.iter_ndef_records())
+        assert [record.type for record in records] == \
+            ['urn:nfc:wkt:U', 'urn:nfc:wkt:T']
+        assert records[0].iri == 'http://www.ab'
+        assert tag.clf.exchange.call_count == 5
+        assert tag.ndef.octets == memory[18:69]
+        assert tag.ndef.capacity == 142
+        assert tag.clf.exchange.call_count == 5
+
+    def test_iter_ndef_records_stop_early(self, tag, memory):
+        commands = [
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+            (HEX('30 08'), 0.005),
+        ]
+        tag.clf.exchange.side_effect = lambda data, timeout: \
+            memory[bytearray(data)[1]*4:bytearray(data)[1]*4+16]
+        for record in tag.iter_ndef_records():
+            assert record.iri == 'http://www.ab'
+            break
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+
+    def test_iter_ndef_records_tag_removed(self, tag, memory):
+        tag.clf.exchange.side_effect = [
+            memory[0:16], memory[16:32], memory[32:48],
+        ] + 3 * [nfc.clf.TimeoutError]
+        records = list(tag.iter_ndef_records())
+        assert [record.type for record in records] == ['urn:nfc:wkt:U']
+        assert tag._ndef is None
+
 
 ###############################################################################
 #
@@ -746,12 +874,12 @@ class TestNdef:
 class TestMemoryReader:
     def test_getitem(self, tag):
         commands = [
-            (HEX('30 00'), 0.005),
             (HEX('30 04'), 0.005),
+            (HEX('30 00'), 0.005),
         ]
         responses = [
-            HEX("01020304 05060708 00000000 E1100200"),
             HEX("0303d000 00000000 00000000 00000000"),
+            HEX("01020304 05060708 00000000 E1100200"),
         ]
         tag.clf.exchange.side_effect = responses
         tag_memory = nfc.tag.tt2.Type2TagMemoryReader(tag)
@@ -760,16 +888,36 @@ class TestMemoryReader:
         assert tag_memory[18] == 0xd0
         assert tag_memory[19] == 0x00
         assert tag_memory[16:20] == HEX('0303d000')
+        assert len(tag_memory) == 32
+        assert tag_memory[12:20] == HEX('E1100200 0303d000')
+        assert tag_memory[0:4] == HEX('01020304')
         assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
 
+    def test_getitem_sparse(self, tag):
+        commands = [
+            (HEX('30 c8'), 0.005),
+            (HEX('30 04'), 0.005),
+            (HEX('30 08'), 0.005),
+        ]
+        responses = [
+            HEX("0a0b0c0d 00000000 00000000 00000000"),
+            HEX("0303d000 00000000 00000000 00000000"),
+            nfc.clf.TimeoutError, nfc.clf.TimeoutError, nfc.clf.TimeoutError,
+        ]
+        tag.clf.exchange.side_effect = responses
+        tag_memory = nfc.tag.tt2.Type2TagMemoryReader(tag)
+        assert tag_memory[802] == 0x0c
+        assert len(tag_memory) == 816
+        assert tag_memory[16:36] == HEX('0303d000') + bytearray(12)
+        calls = [mock.call(*_) for _ in commands]
+        assert tag.clf.exchange.mock_calls == calls[:-1] + 3 * calls[-1:]
+
     def test_setitem(self, tag):
         commands = [
-            (HEX('30 00'), 0.005),
             (HEX('30 04'), 0.005),
             (HEX('a2 04 fe03d000'), 0.1),
         ]
         responses = [
-            HEX("01020304 05060708 00000000 E1100200"),
             HEX("0303d000 00000000 00000000 00000000"),
             HEX("0a"),
         ]
@@ -806,13 +954,11 @@ class TestMemoryReader:
 
     def test_read_error(self, tag):
         commands = [
-            (HEX('30 00'), 0.005),
             (HEX('30 04'), 0.005),
             (HEX('30 04'), 0.005),
             (HEX('30 04'), 0.005),
         ]
         responses = [
-            HEX("01020304 05060708 00000000 E1100200"),
             nfc.clf.TimeoutError,
             nfc.clf.TimeoutError,
             nfc.clf.TimeoutError,
@@ -825,14 +971,12 @@ class TestMemoryReader:
 
     def test_write_error(self, tag):
         commands = [
-            (HEX('30 00'), 0.005),
             (HEX('30 04'), 0.005),
             (HEX('a2 04 fe03d000'), 0.1),
             (HEX('a2 04 fe03d000'), 0.1),
             (HEX('a2 04 fe03d000'), 0.1),
         ]
         responses = [
-            HEX("01020304 05060708 00000000 E1100200"),
             HEX("0303d000 00000000 00000000 00000000"),
             nfc.clf.TimeoutError,
             nfc.clf.TimeoutError,
@@ -876,6 +876,50 @@ class BaseNTAG21x:
         assert tag.ndef is None
         assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
 
+    def test_read_ndef_with_fast_read(self, mocker, tag):  # noqa: F811
+        mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                     new_callable=mock.PropertyMock, return_value=262)
+        ndef = HEX('D10124 54 02656e') + bytearray(range(33))
+        commands = [
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+            (HEX('3a 08 0e'), 0.0078),
+        ]
+        responses = [
+            HEX("04517CA1 E1ED2580 A9480000 E1100600"),
+            HEX("0328") + ndef[0:14],
+            ndef[14:40] + HEX("FE00"),
+        ]
+        tag.clf.exchange.side_effect = responses
+        assert tag.ndef is not None
+        assert tag.ndef.octets == ndef
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+
+    def test_read_ndef_fast_read_rejected(self, mocker, tag):  # noqa: F811
+        mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                     new_callable=mock.PropertyMock, return_value=262)
+        ndef = HEX('D10124 54 02656e') + bytearray(range(33))
+        commands = [
+            (HEX('30 00'), 0.005),
+            (HEX('30 04'), 0.005),
+            (HEX('3a 08 0e'), 0.0078),
+            (HEX('30 08'), 0.005),
+            (HEX('30 0c'), 0.005),
+        ]
+        responses = [
+            HEX("04517CA1 E1ED2580 A9480000 E1100600"),
+            HEX("0328") + ndef[0:14],
+            HEX("00"),
+            ndef[14:30],
+            ndef[30:40] + HEX("FE00 00000000"),
+        ]
+        tag.clf.exchange.side_effect = responses
+        tag.clf.sense.reset_mock()
+        assert tag.ndef is not None
+        assert tag.ndef.octets == ndef
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+        assert tag.clf.sense.call_count == 1
+
 
 ###############################################################################
 #
@@ -1335,6 +1379,67 @@ class TestNTAG216(BaseNTAG21x):
         assert tag.format() is True
         assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
 
+    def test_iter_ndef_records_with_fast_read(self, mocker, tag):  # noqa: F811
+        mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                     new_callable=mock.PropertyMock, return_value=262)
+        ndef = HEX('C1 01 00000355 54 02656e') + bytearray(b'x' * 850)
+        memory = HEX("04517CA1 E1ED2580 A9480000 E1106D00")
+        memory += HEX("03FF035C") + ndef + HEX("FE")
+        memory += bytearray(231 * 4 - len(memory))
+
+        def exchange(data, timeout):
+            data = bytearray(data)
+            if data[0] == 0x30:
+                return memory[data[1]*4:data[1]*4+16]
+            if data[0] == 0x3A:
+                return memory[data[1]*4:data[2]*4+4]
+
+        tag.clf.exchange.side_effect = exchange
+        records = list(tag.iter_ndef_records())
+        assert [record.type for record in records] == ['urn:nfc:wkt:T']
+        assert records[0].text == 850 * 'x'
+        assert [bytes(call[1][0]) for call in tag.clf.exchange.mock_calls] \
+            == [b'\x30\x00', b'\x30\x04', b'\x3A\x08\x45',
+                b'\x3A\x46\x86', b'\x3A\x87\xC7', b'\x3A\xC8\xDB']
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("reader, max_recv_data_size", [
+    ("pn533", 262), ("rcs380", 290),
+])
+def test_ntag216_read_benchmark(mocker, clf, target,  # noqa: F811
+                                reader, max_recv_data_size):
+    mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                 new_callable=mock.PropertyMock,
+                 return_value=max_recv_data_size)
+    ndef = HEX('C1 01 00000355 54 02656e') + bytearray(850)
+    memory = HEX("04517CA1 E1ED2580 A9480000 E1106D00")
+    memory += HEX("03FF035C") + ndef + HEX("FE")
+    memory += bytearray(231 * 4 - len(memory))
+
+    def exchange(data, timeout):
+        data = bytearray(data)
+        if data[0] == 0x30:
+            return (memory + memory[0:16])[data[1]*4:data[1]*4+16]
+        if data[0] == 0x3A:
+            return memory[data[1]*4:data[2]*4+4]
+        return HEX('00') if data[0] == 0x1A else HEX('0004040201001303')
+
+    def read_ndef():
+        clf.exchange.reset_mock()
+        tag = nfc.tag.activate(clf, target)
+        assert tag.ndef.octets == ndef
+        return clf.exchange.call_count - 2
+
+    clf.exchange.side_effect = exchange
+    fast_read_commands = read_ndef()
+    mocker.patch('nfc.tag.tt2_nxp.NTAG216._read_pages',
+                 nfc.tag.tt2.Type2Tag._read_pages.im_func)
+    read_commands = read_ndef()
+    logging.info("NTAG216 read with %s: %d commands, %d without FAST_READ",
+                 reader, fast_read_commands, read_commands)
+    assert fast_read_commands < read_commands // 5
+
 
 ###############################################################################
 #
@@ -1538,3 +1643,59 @@ class TestActivate:
             mock.call(HEX('1A00'), timeout=0.01),
             mock.call(HEX('60'), timeout=0.01),
         ]
+
+    def test_product_cache(self, clf, target):
+        cache = nfc.tag.ProductCache()
+        clf.exchange.side_effect = [
+            HEX('00'), HEX('0004040201001103'),
+        ]
+        tag = nfc.tag.activate(clf, target, product_cache=cache)
+        assert isinstance(tag, nfc.tag.tt2_nxp.NTAG215)
+        assert clf.exchange.call_count == 2 and clf.sense.call_count == 1
+        clf.exchange.reset_mock()
+        clf.sense.reset_mock()
+        tag = nfc.tag.activate(clf, target, product_cache=cache)
+        assert isinstance(tag, nfc.tag.tt2_nxp.NTAG215)
+        assert tag.product == "NXP NTAG215"
+        assert clf.exchange.call_count == 0 and clf.sense.call_count == 0
+        assert cache.hits == 1 and cache.misses == 1
+
+    def test_product_cache_ignores_type2tag(self, clf, target):
+        cache = nfc.tag.ProductCache()
+        clf.exchange.side_effect = [
+            HEX('00'), HEX('0004040502021303'),
+        ]
+        tag = nfc.tag.activate(clf, target, product_cache=cache)
+        assert type(tag) == nfc.tag.tt2.Type2Tag
+        assert len(cache) == 0
+
+
+@pytest.mark.benchmark
+def test_product_cache_benchmark(clf, target):
+    # Count the RF commands from a discovered target to the NDEF data
+    # of an NTAG215 without and with a product cache.
+    memory = HEX("04517CA1 E1ED2580 A9480000 E1103E00")
+    memory += HEX("0307 D1 01 03 55 01 61 62 FE") + bytearray(120)
+
+    def exchange(data, timeout):
+        data = bytearray(data)
+        if data[0] == 0x30:
+            return memory[data[1]*4:data[1]*4+16]
+        if data[0] == 0x3A:
+            return memory[data[1]*4:data[2]*4+4]
+        return HEX('00') if data[0] == 0x1A else HEX('0004040201001103')
+
+    def read_ndef(cache):
+        clf.exchange.reset_mock()
+        clf.sense.reset_mock()
+        tag = nfc.tag.activate(clf, target, product_cache=cache)
+        assert tag.ndef.octets == HEX('D1 01 03 55 01 61 62')
+        return clf.exchange.call_count + clf.sense.call_count
+
+    clf.exchange.side_effect = exchange
+    cache = nfc.tag.ProductCache()
+    probed_commands = read_ndef(cache)
+    cached_commands = read_ndef(cache)
+    logging.info("NTAG215 activate and read: %d commands, %d with cache",
+                 probed_commands, cached_commands)
+    assert cached_commands == probed_commands - 3
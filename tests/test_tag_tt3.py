@@ -24,6 +24,10 @@ def HEX(s):
 def clf(mocker):
     clf = nfc.ContactlessFrontend()
     mocker.patch.object(clf, 'exchange', autospec=True)
+    mocker.patch('nfc.ContactlessFrontend.max_send_data_size',
+                 new_callable=mock.PropertyMock).return_value = 290
+    mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                 new_callable=mock.PropertyMock).return_value = 290
     return clf
 
 
@@ -362,6 +366,44 @@ class TestType3Tag:
         assert tag.read_from_ndef_service(0, 1) is None
         assert tag.clf.exchange.called is False
 
+    def test_read_blocks(self, tag):
+        data = HEX(''.join(["%02x" % i * 16 for i in range(4)]))
+        tag.clf.exchange.side_effect = [
+            HEX('3d 07 0102030405060708 0000 03') + data[:48],
+            HEX('1d 07 0102030405060708 0000 01') + data[48:],
+        ]
+        sc1 = nfc.tag.tt3.ServiceCode(16, 0x09)
+        sc2 = nfc.tag.tt3.ServiceCode(80, 0x0B)
+        blocks = [(sc1, 5), (sc2, 0), (sc2, 1), (sc1, 256)]
+        result = tag.read_blocks(blocks, max_blocks=3)
+        assert list(result.keys()) == blocks
+        assert result[(sc2, 1)] == data[32:48]
+        assert result[(sc1, 256)] == data[48:64]
+        assert tag.clf.exchange.mock_calls == [
+            mock.call(HEX('16 06 0102030405060708 0209040b14'
+                          '03 8005 8100 8101'), 0.6187008),
+            mock.call(HEX('11 06 0102030405060708 010904 01 000001'),
+                      0.3093504),
+        ]
+
+    def test_read_blocks_limited_by_frame(self, mocker, tag):  # noqa: F811
+        mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                     new_callable=mock.PropertyMock).return_value = 100
+        tag.clf.exchange.side_effect = [
+            HEX('5d 07 0102030405060708 0000 05') + bytearray(80),
+            HEX('2d 07 0102030405060708 0000 02') + bytearray(32),
+        ]
+        sc = nfc.tag.tt3.ServiceCode(0, 0x0B)
+        result = tag.read_blocks([(sc, n) for n in range(7)])
+        assert len(result) == 7
+        assert tag.clf.exchange.mock_calls == [
+            mock.call(HEX('18 06 0102030405060708 010b00'
+                          '05 8000 8001 8002 8003 8004'), 0.9280512000000001),
+            mock.call(HEX('12 06 0102030405060708 010b00 02 8005 8006'),
+                      0.46402560000000004),
+        ]
+        assert tag.read_blocks([]) == {}
+
     def test_write_without_encryption(self, tag):
         data = HEX(
             "10 01 01 00  01 00 00 00  00 00 00 00  00 10 00 23"
@@ -408,6 +450,25 @@ class TestType3Tag:
         assert tag.write_to_ndef_service(data, 0, 1) is None
         assert tag.clf.exchange.called is False
 
+    def test_write_blocks(self, tag):
+        data = HEX(''.join(["%02x" % i * 16 for i in range(3)]))
+        tag.clf.exchange.side_effect = [
+            HEX('0c 09 0102030405060708 0000'),
+            HEX('0c 09 0102030405060708 0000'),
+        ]
+        sc = nfc.tag.tt3.ServiceCode(0, 0x09)
+        tag.write_blocks([((sc, n), data[(n-1)*16:n*16]) for n in (1, 2, 3)],
+                         max_blocks=2)
+        assert tag.clf.exchange.mock_calls == [
+            mock.call(HEX('32 08 0102030405060708 010900 02 8001 8002')
+                      + data[:32], 0.46402560000000004),
+            mock.call(HEX('20 08 0102030405060708 010900 01 8003')
+                      + data[32:], 0.3093504),
+        ]
+        with pytest.raises(ValueError) as excinfo:
+            tag.write_blocks({(sc, 1): bytearray(15)})
+        assert str(excinfo.value) == "block data must be 16 byte"
+
     def test_send_cmd_recv_rsp(self, tag):
         xxx = tag.clf.exchange
 
@@ -767,6 +828,75 @@ class TestType3Tag:
                     '1002020003000000000001000027003f'), 0.3093504),
         ])
 
+    def test_iter_ndef_records(self, tag):
+        data = HEX(
+            "10 01 01 00  03 00 00 00  00 00 00 00  00 1c 00 31"
+            "91 01 08 55  03 6e 66 63  2e 6f 72 67  51 01 0c 54"
+            "02 65 6e 4e  46 43 20 46  6f 72 75 6d  00 00 00 00"
+        )
+        responses = [
+            HEX('1d 07 0102030405060708 0000 01') + data[:16],
+            HEX('1d 07 0102030405060708 0000 01') + data[16:32],
+            HEX('1d 07 0102030405060708 0000 01') + data[32:48],
+        ]
+        tag.clf.exchange.side_effect = responses
+        for record in tag.iter_ndef_records():
+            assert record.iri == 'http://nfc.org'
+            break
+        assert tag.clf.exchange.call_count == 2
+        assert tag._ndef is None
+
+        tag.clf.exchange.reset_mock()
+        tag.clf.exchange.side_effect = responses
+        records = list(tag.iter_ndef_records())
+        assert [record.type for record in records] == \
+            ['urn:nfc:wkt:U', 'urn:nfc:wkt:T']
+        assert tag.clf.exchange.call_count == 3
+        assert tag.ndef.octets == data[16:44]
+
+    def test_ndef_read_from_cache(self, tag):
+        data = HEX(
+            "10 02 02 00  03 00 00 00  00 00 01 00  00 27 00 3f"
+            "d1 02 22 53  70 91 01 0e  55 03 6e 66  63 2d 66 6f"
+            "72 75 6d 2e  6f 72 67 51  01 0c 54 02  65 6e 4e 46"
+            "43 20 46 6f  72 75 6d 00  00 00 00 00  00 00 00 00"
+        )
+        cache = tag.ndef_cache = nfc.tag.NdefCache()
+        tag.clf.exchange.side_effect = [
+            HEX('1d 07 0102030405060708 0000 01') + data[:16],
+            HEX('2d 07 0102030405060708 0000 02') + data[16:48],
+            HEX('1d 07 0102030405060708 0000 01') + data[48:64],
+        ]
+        assert tag.ndef.octets == data[16:55]
+        assert len(cache) == 1
+
+        # the attribute block is unchanged
+        tag.clf.exchange.reset_mock()
+        tag.clf.exchange.side_effect = [
+            HEX('1d 07 0102030405060708 0000 01') + data[:16],
+        ]
+        tag = nfc.tag.activate(tag.clf, tag.target)
+        tag.ndef_cache = cache
+        assert tag.ndef.octets == data[16:55]
+        assert tag.ndef.capacity == 48
+        assert tag.clf.exchange.call_count == 1
+        assert cache.hits == 1
+
+        # the attribute block has changed
+        tag.clf.exchange.reset_mock()
+        tag.clf.exchange.side_effect = [
+            HEX('1d 07 0102030405060708 0000 01') +
+            HEX("10 02 02 00 03 00 00 00 00 00 00 00 00 00 00 17"),
+            HEX('1d 07 0102030405060708 0000 01') +
+            HEX("10 02 02 00 03 00 00 00 00 00 00 00 00 00 00 17"),
+        ]
+        tag = nfc.tag.activate(tag.clf, tag.target)
+        tag.ndef_cache = cache
+        assert tag.ndef.octets == b''
+        assert tag.ndef.is_writeable is False
+        assert tag.clf.exchange.call_count == 2
+        assert cache.hits == 1 and cache.stale == 1
+
 
 ###############################################################################
 #
@@ -25,6 +25,10 @@ def HEX(s):
 def clf(mocker):
     clf = nfc.ContactlessFrontend()
     mocker.patch.object(clf, 'exchange', autospec=True)
+    mocker.patch('nfc.ContactlessFrontend.max_send_data_size',
+                 new_callable=mock.PropertyMock).return_value = 290
+    mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                 new_callable=mock.PropertyMock).return_value = 290
     mocker.patch('os.urandom', new=lambda x: bytes(bytearray(range(x))))
     return clf
 
@@ -6,7 +6,9 @@ import nfc.tag
 import nfc.tag.tt4
 
 import mock
+import time
 import pytest
+from struct import pack, unpack
 from pytest_mock import mocker  # noqa: F401
 
 import logging
@@ -106,6 +108,94 @@ def test_init_wrong_technology():
     assert nfc.tag.tt4.activate(clf, target) is None
 
 
+@pytest.fixture()  # noqa: F811
+def iso_dep_clf(mocker):
+    clf = nfc.ContactlessFrontend()
+    mocker.patch.object(clf, 'exchange', autospec=True)
+    mocker.patch('nfc.ContactlessFrontend.max_send_data_size',
+                 new_callable=mock.PropertyMock).return_value = 256
+    mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                 new_callable=mock.PropertyMock).return_value = 256
+    return clf
+
+
+@pytest.mark.parametrize("ta, max_bitrate, pps, bitrate", [
+    ('77', 848, 'D0110F', 848),
+    ('77', 424, 'D0110A', 424),
+    ('33', 848, 'D0110A', 424),
+    ('71', 848, 'D01105', 212),
+    ('70', 848, None, 106),
+    ('77', 106, None, 106),
+])
+def test_init_T4A_bitrate(iso_dep_clf, ta, max_bitrate, pps, bitrate):
+    clf = iso_dep_clf
+    target = nfc.clf.RemoteTarget("106A")
+    target.sens_res = HEX("4403")
+    target.sel_res = HEX("20")
+    target.sdd_res = HEX("04832F9A272D80")
+    clf.exchange.side_effect = [HEX('0675' + ta + '8102'), HEX('D0')]
+    tag = nfc.tag.tt4.activate(clf, target, max_bitrate=max_bitrate)
+    assert clf.exchange.mock_calls[0] == mock.call(HEX('E080'), timeout=0.03)
+    if pps is None:
+        assert clf.exchange.call_count == 1
+    else:
+        assert clf.exchange.mock_calls[1][1][0] == HEX(pps)
+    assert tag.bitrate == bitrate and tag.fsd == 256 and tag.fsc == 64
+    assert target.brty == "{0}A".format(bitrate)
+
+
+def test_init_T4A_bitrate_pps_error(iso_dep_clf):
+    clf = iso_dep_clf
+    target = nfc.clf.RemoteTarget("106A")
+    target.sens_res = HEX("4403")
+    target.sel_res = HEX("20")
+    target.sdd_res = HEX("04832F9A272D80")
+    clf.exchange.side_effect = [HEX('0675778102'), nfc.clf.TimeoutError]
+    tag = nfc.tag.tt4.activate(clf, target, max_bitrate=848)
+    assert tag.bitrate == 106 and target.brty == "106A"
+    clf.exchange.side_effect = [HEX('0675778102'), HEX('D1')]
+    tag = nfc.tag.tt4.activate(clf, target, max_bitrate=848)
+    assert tag.bitrate == 106 and target.brty == "106A"
+
+
+@pytest.mark.parametrize("capability, max_bitrate, param2, bitrate", [
+    ('77', 848, 'F8', 848),
+    ('77', 424, 'A8', 424),
+    ('11', 848, '58', 212),
+    ('70', 848, '08', 106),
+])
+def test_init_T4B_bitrate(iso_dep_clf, capability, max_bitrate,
+                          param2, bitrate):
+    clf = iso_dep_clf
+    target = nfc.clf.RemoteTarget("106B")
+    target.sensb_res = HEX('5030702A1C00000011' + capability + '8185')
+    clf.exchange.return_value = HEX('00')
+    tag = nfc.tag.tt4.activate(clf, target, max_bitrate=max_bitrate)
+    attrib_cmd = HEX('1D30702A1C00' + param2 + '0100')
+    clf.exchange.assert_called_once_with(attrib_cmd, 0.03)
+    assert tag.bitrate == bitrate and tag.fsd == 256 and tag.fsc == 256
+    assert target.brty == "{0}B".format(bitrate)
+
+
+@pytest.mark.parametrize("max_recv, rats_cmd, fsd", [
+    (256, 'E080', 256), (200, 'E070', 128), (64, 'E050', 64),
+    (50, 'E040', 48), (16, 'E000', 16),
+])
+def test_init_T4A_frame_size(iso_dep_clf, mocker, max_recv,  # noqa: F811
+                             rats_cmd, fsd):
+    clf = iso_dep_clf
+    mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                 new_callable=mock.PropertyMock).return_value = max_recv
+    target = nfc.clf.RemoteTarget("106A")
+    target.sens_res = HEX("4403")
+    target.sel_res = HEX("20")
+    target.sdd_res = HEX("04832F9A272D80")
+    clf.exchange.return_value = HEX('0675778102')
+    tag = nfc.tag.tt4.activate(clf, target)
+    clf.exchange.assert_called_once_with(HEX(rats_cmd), 0.03)
+    assert tag.fsd == fsd and tag.bitrate == 106
+
+
 class TestType4Tag:
     @pytest.fixture()  # noqa: F811
     def clf(self, mocker):
@@ -484,6 +574,38 @@ class TestType4Tag:
         assert tag.ndef is None
         assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
 
+    def test_read_ndef_data_extended_length(self, tag):
+        ndef = HEX('C1 02 00000258 54') + bytearray(600)
+        simulator = Type4TagSimulator(ndef, mle=0x0400, mlc=0x0400)
+        tag.clf.exchange.side_effect = simulator.exchange
+        assert tag.ndef.octets == ndef
+        assert tag._extended_length_support is True
+        assert simulator.apdus[-2:] == [
+            HEX('00b00000 000002'), HEX('00b00002 00025f'),
+        ]
+        tag.ndef.octets = ndef[::-1]
+        assert simulator.apdus[-1] == \
+            HEX('00d60000 000261 025f') + ndef[::-1]
+        assert simulator.files[b'\xE1\x04'] == HEX('025f') + ndef[::-1]
+
+    def test_iter_ndef_records(self, tag):
+        ndef = HEX('91 01 08 55 03 6e 66 63 2e 6f 72 67') \
+            + HEX('51 01 c8 54 02 65 6e') + bytearray(b'x' * 198)
+        simulator = Type4TagSimulator(ndef, mle=0x0020, mlc=0x0020)
+        tag.clf.exchange.side_effect = simulator.exchange
+        for record in tag.iter_ndef_records():
+            assert record.iri == 'http://nfc.org'
+            break
+        assert simulator.apdus[-1] == HEX('00b00002 20')
+        assert tag._ndef is None
+        del simulator.apdus[:]
+        records = list(tag.iter_ndef_records())
+        assert [record.type for record in records] == \
+            ['urn:nfc:wkt:U', 'urn:nfc:wkt:T']
+        assert len(simulator.apdus) == 13
+        assert tag.ndef.octets == ndef
+        assert len(simulator.apdus) == 13
+
     def test_write_ndef_data_short(self, tag):
         commands = [
             (HEX('02 00a4040007 d2760000850101'), 0.08095339233038348),
@@ -543,6 +665,40 @@ class TestType4Tag:
         tag.ndef.octets = HEX('D5003B') + 59 * b'0'
         assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
 
+    def test_read_ndef_data_from_cache(self, tag):
+        commands = [
+            (HEX('02 00a4040007d2760000850101'), 0.08095339233038348),
+            (HEX('03 00a4000c02e104'), 0.08095339233038348),
+            (HEX('02 00b0000002'), 0.08095339233038348),
+        ]
+        responses = [
+            HEX('02 9000'),
+            HEX('03 9000'),
+            HEX('02 000f 9000'),
+            HEX('03 20 003b 0034 04 06 e104 0040 00 00 9000'),
+            HEX('02 9000'),
+            HEX('03 000e 9000'),
+            HEX('02 d1010a55 036e6663 70792e6f 7267 9000'),
+        ]
+        cache = tag.ndef_cache = nfc.tag.NdefCache()
+        tag.clf.exchange.side_effect = responses
+        assert tag.ndef.octets == HEX('d1010a55036e666370792e6f7267')
+        tag.clf.exchange.reset_mock()
+        tag.clf.exchange.side_effect = [
+            HEX('067577810280'),
+            HEX('02 9000'),
+            HEX('03 9000'),
+            HEX('02 000e 9000'),
+        ]
+        tag = nfc.tag.activate(tag.clf, tag.target)
+        tag.clf.exchange.assert_called_once_with(HEX('E0 80'), 0.03)
+        tag.clf.exchange.reset_mock()
+        tag.ndef_cache = cache
+        assert tag.ndef.octets == HEX('d1010a55036e666370792e6f7267')
+        assert tag.ndef.capacity == 62
+        assert tag.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+        assert cache.hits == 1 and cache.misses == 1
+
     def test_send_apdu_standard_length(self, tag):
         with pytest.raises(ValueError) as excinfo:
             tag.send_apdu(0, 0, 0, 0, 256 * b'\0')
@@ -904,3 +1060,183 @@ class TestIsoDepInitiator:
             dep.exchange(HEX('0102'), 1.0)
         assert excinfo.value.errno == nfc.tag.PROTOCOL_ERROR
         assert dep.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+
+    def test_recv_more_waiting_time_ext(self, dep):
+        commands = [
+            (HEX('02 0102'), 1.0),
+            (HEX('A3'), 1.0),
+            (HEX('F2 3B'), 4.949031),
+            (HEX('A2'), 1.0),
+        ]
+        responses = [
+            HEX('12 0102'),
+            HEX('F2 7B'),
+            HEX('13 0304'),
+            HEX('02 0506'),
+        ]
+        dep.max_fwt = 4.949031
+        dep.clf.exchange.side_effect = responses
+        assert dep.exchange(HEX('0102'), 1.0) == HEX('010203040506')
+        assert dep.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+
+    @pytest.mark.parametrize("wtx", ['F2', 'F2 00', 'F2 3C'])
+    def test_send_recv_invalid_waiting_time_ext(self, dep, wtx):
+        dep.clf.exchange.side_effect = [HEX(wtx)]
+        with pytest.raises(nfc.tag.tt4.Type4TagCommandError) as excinfo:
+            dep.exchange(HEX('0102'), 1.0)
+        assert excinfo.value.errno == nfc.tag.PROTOCOL_ERROR
+
+    def test_send_too_many_retransmit_requests(self, dep):
+        dep.clf.exchange.side_effect = [HEX('A3'), HEX('A3')]
+        with pytest.raises(nfc.tag.tt4.Type4TagCommandError) as excinfo:
+            dep.exchange(HEX('0102'), 1.0)
+        assert excinfo.value.errno == nfc.tag.PROTOCOL_ERROR
+        assert dep.clf.exchange.call_count == 2
+
+    def test_exchange_iter(self, dep):
+        commands = [
+            (HEX('12 01020304050607'), 1.0),
+            (HEX('03 08'), 1.0),
+            (HEX('A2'), 1.0),
+        ]
+        responses = [
+            HEX('A2'),
+            HEX('13 0102'),
+            HEX('02 0304'),
+        ]
+        dep.clf.exchange.side_effect = responses
+        chunks = dep.exchange_iter(HEX('0102030405060708'), 1.0)
+        assert dep.clf.exchange.call_count == 0
+        assert bytearray(next(chunks)) == HEX('0102')
+        assert dep.clf.exchange.call_count == 2
+        assert [bytearray(chunk) for chunk in chunks] == [HEX('0304')]
+        assert dep.clf.exchange.mock_calls == [mock.call(*_) for _ in commands]
+        assert dep.pni == 1
+
+
+class Type4TagSimulator(object):
+    # Simulates the ISO-DEP and NDEF application layer of a Type 4
+    # Tag with the *ndef* message and the MLe/MLc values of the
+    # capability container. Responses are chained to fit the
+    # reader's frame size *fsd*.
+    def __init__(self, ndef, mle, mlc, fsd=256):
+        self.files = {
+            b'\xE1\x03': HEX('000f 20') + pack('>HH', mle, mlc)
+            + HEX('04 06 e104') + pack('>H', 2 + len(ndef)) + HEX('00 00'),
+            b'\xE1\x04': pack('>H', len(ndef)) + ndef,
+        }
+        self.fsd, self.file, self.chain = fsd, None, []
+        self.commands = self.octets = 0
+        self.apdus, self.command = [], bytearray()
+
+    def exchange(self, data, timeout):
+        self.commands += 1
+        self.octets += len(data)
+        data = bytearray(data)
+        if data == HEX('E080'):
+            return HEX('067577810280')
+        if data[0] & 0xF6 == 0xA2:  # R(ACK)
+            return self.chain.pop(0)
+        self.command += data[1:]
+        if data[0] & 0x10:  # chaining
+            return bytearray([0xA2 | data[0] & 1])
+        response, self.command = self.process(self.command), bytearray()
+        pni, miu = data[0] & 1, self.fsd - 3
+        self.chain = []
+        for offset in range(0, len(response), miu):
+            more = len(response) - offset > miu
+            self.chain.append(bytearray([(0x02, 0x12)[more] | pni])
+                              + response[offset:offset+miu])
+            pni ^= 1
+        self.octets += sum(len(frame) for frame in self.chain)
+        return self.chain.pop(0)
+
+    def process(self, apdu):
+        self.apdus.append(apdu)
+        ins, p1p2, body = apdu[1], unpack('>H', apdu[2:4])[0], apdu[4:]
+        if len(body) == 1:
+            le, data = body[0] or 256, None
+        elif len(body) == 3 and body[0] == 0:
+            le, data = unpack('>H', body[1:3])[0] or 65536, None
+        elif body[0] != 0:
+            le, data = None, body[1:1+body[0]]
+        else:
+            le, data = None, body[3:3+unpack('>H', body[1:3])[0]]
+        if ins == 0xA4:
+            self.file = self.files.get(bytes(data), self.file)
+            return HEX('9000')
+        if ins == 0xB0:
+            return self.file[p1p2:p1p2+le] + HEX('9000')
+        if ins == 0xD6:
+            self.file[p1p2:p1p2+len(data)] = data
+            return HEX('9000')
+        return HEX('6d00')
+
+
+@pytest.mark.benchmark
+def test_read_ndef_benchmark(mocker):  # noqa: F811
+    clf = nfc.ContactlessFrontend()
+    mocker.patch.object(clf, 'exchange', autospec=True)
+    mocker.patch('nfc.ContactlessFrontend.max_send_data_size',
+                 new_callable=mock.PropertyMock).return_value = 256
+    mocker.patch('nfc.ContactlessFrontend.max_recv_data_size',
+                 new_callable=mock.PropertyMock).return_value = 256
+    target = nfc.clf.RemoteTarget("106A")
+    target.sens_res = HEX("4403")
+    target.sel_res = HEX("20")
+    target.sdd_res = HEX("04832F9A272D80")
+    ndef = HEX('C1 02 00001000 54') + bytearray(range(256)) * 16
+
+    def read_ndef(mle, mlc):
+        simulator = Type4TagSimulator(ndef, mle, mlc)
+        clf.exchange.side_effect = simulator.exchange
+        started = time.time()
+        tag = nfc.tag.activate(clf, target)
+        assert tag.ndef.octets == ndef
+        tag.ndef.octets = ndef[::-1]
+        assert simulator.files[b'\xE1\x04'][2:] == ndef[::-1]
+        elapsed = time.time() - started
+        logging.info("Type 4 Tag NDEF read/write with MLe %d MLc %d: "
+                     "%d apdus %d frames %d byte in %.1f ms (%.0f KB/s)",
+                     mle, mlc, len(simulator.apdus), simulator.commands,
+                     simulator.octets, 1E3 * elapsed,
+                     2 * len(ndef) / elapsed / 1024)
+        return len(simulator.apdus), simulator.commands
+
+    extended_apdus, extended_frames = read_ndef(0xFFFF, 0xFFFF)
+    short_apdus, short_frames = read_ndef(0x00FF, 0x00FF)
+    assert extended_apdus * 4 < short_apdus
+    assert extended_frames < short_frames
+
+
+@pytest.mark.benchmark
+def test_iso_dep_exchange_benchmark(mocker):  # noqa: F811
+    # Receive chained responses of 16 and 1024 frames from a stub clf
+    # and compare the time per frame, which must stay about the same
+    # when the response is collected into a single buffer.
+    class StubFrontend(object):
+        def __init__(self, frames):
+            self.frames = frames
+            self.frame = bytearray(range(254)) + bytearray(2)
+
+        def exchange(self, data, timeout):
+            self.frames -= 1
+            pni = bytearray(data)[0] & 1
+            self.frame[0] = (0x02, 0x12)[self.frames > 0] | pni
+            return bytearray(self.frame)
+
+    def run(frames):
+        clf = StubFrontend(frames)
+        dep = nfc.tag.tt4.IsoDepInitiator(clf, 256, 0.1)
+        started = time.time()
+        response = dep.exchange(HEX('00B0000000'))
+        elapsed = time.time() - started
+        assert len(response) == 255 * frames
+        return elapsed / frames
+
+    short = min(run(16) for _ in range(5))
+    chained = min(run(1024) for _ in range(5))
+    logging.info("ISO-DEP receive: %.1f us per frame for 16 frames, "
+                 "%.1f us per frame for 1024 frames", 1E6 * short,
+                 1E6 * chained)
+    assert chained < 1.5 * short